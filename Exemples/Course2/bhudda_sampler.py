@@ -0,0 +1,379 @@
+# Échantillonneur vectorisé de l'ensemble de Bhuddabrot
+#
+# Au lieu d'itérer les échantillons c un par un (avec une liste Python des points de l'orbite), on traite
+# des paquets de plusieurs milliers de c en deux passes numpy :
+#   1. on itère tous les c ensemble pour trouver ceux qui divergent (et en combien d'itérations) ; les
+#      points qui ont divergé sont retirés des tableaux au fur et à mesure ;
+#   2. on rejoue les orbites des seuls c qui divergent, toutes ensemble, triées par longueur décroissante :
+#      à l'itération k, les orbites encore en cours sont exactement les m_k premières, et les pixels visités
+#      sont accumulés dans l'histogramme par np.bincount.
+# Les points de la cardioïde principale et du disque de période 2 ne divergent jamais : ils sont écartés
+# sans itérer (ils ne contribuent pas à l'image).
+#
+# Fenêtre (window = (xmin, xmax, ymin, ymax)) : l'image peut ne couvrir qu'une partie du plan (zoom), les
+# points d'orbite hors de la fenêtre ne comptent pas. Par défaut FULL_VIEW, le carré [-2, 2]².
+#
+# Échantillonnage préférentiel (MetropolisChains) : dans une fenêtre zoomée, la plupart des orbites d'un
+# tirage uniforme n'y déposent aucun point. Des chaînes de Metropolis-Hastings tirent c avec une densité
+# proportionnelle à w(c) q(c), où q est la densité du tirage uniforme (random_samples) et w(c) le nombre de
+# points de l'orbite de c qui tombent dans l'image (0 si c ne diverge pas). Chaque état d'une chaîne
+# dépose 1/w(c) par point d'orbite et l'image est multipliée par nbSamples E_q[w] / (nombre d'états),
+# E_q[w] étant estimé sur les tirages uniformes des chaînes : l'image a la même espérance qu'avec
+# nbSamples tirages uniformes (metropolis_estimate). Les chaînes d'un processus durent toute la passe :
+# chaque paquet traité leur apporte PACK_SIZE propositions, et elles avancent toutes d'un pas dès que
+# nbChains propositions sont disponibles, quelle que soit la tâche. Le mode ne paie que pour un zoom
+# étroit : sur l'image entière, le tirage uniforme (avec le rejet de la cardioïde) reste bien meilleur.
+#
+# Passe unique pour plusieurs canaux (bhuddabrot_channels) : au lieu d'une passe par canal (avec ses
+# propres tirages et sa propre limite d'itérations), chaque échantillon est itéré une fois jusqu'à la plus
+# grande limite des canaux qui l'utilisent et son orbite, rejouée une fois, est comptée dans chacun de ces
+# canaux où elle diverge avant la limite du canal.
+#
+# Même convention que bhuddabort_task : l'orbite de c est z_1 = c, z_2 = z_1² + c, ... jusqu'au dernier
+# point avant la divergence, et un point de l'orbite (x, y) tombe dans le pixel
+# (int(width/4*(x+2)), int(height/4*(y+2))) de l'image (width, height). Chaque passage dans un pixel
+# est compté (un pixel visité plusieurs fois par une même orbite compte plusieurs fois).
+import numpy as np
+from math import pi
+
+twoPi = 2.*pi
+
+# Nombre de points d'orbite accumulés avant un appel à np.bincount
+FLUSH_SIZE = 1 << 22
+# Image entière : orbites dans le carré [-2, 2]² (xmin, xmax, ymin, ymax)
+FULL_VIEW = (-2., 2., -2., 2.)
+# Taille des paquets d'échantillons : un flot aléatoire par paquet (voir rng_streams.py), et des paquets
+# assez gros pour que l'échantillonneur amortisse ses boucles numpy
+PACK_SIZE = 4096
+# Nombre d'états de chaînes de Metropolis-Hastings accumulés avant de rejouer leurs orbites
+EMIT_SIZE = 1 << 16
+
+
+def window_from_argv(argv, default=FULL_VIEW):
+    """Option --window=xmin,xmax,ymin,ymax de la ligne de commande"""
+    for a in argv:
+        if a.startswith('--window='):
+            window = tuple(float(x) for x in a.split('=', 1)[1].split(','))
+            if len(window) != 4 or window[0] >= window[1] or window[2] >= window[3]:
+                raise ValueError(f"Fenêtre invalide : {a} (attendu --window=xmin,xmax,ymin,ymax)")
+            return window
+    return default
+
+
+def escape_counts(c, max_iterations, escape_radius=2.):
+    """
+    Nombre d'itérations de chaque c avant divergence, au sens de MandelbrotSet.count_iterations :
+    l'itération iter calcule z_{iter+2} = z_{iter+1}² + c et la divergence est |z_{iter+2}| > escape_radius.
+    Vaut max_iterations si c ne diverge pas. L'orbite de c compte alors iter+1 points.
+    """
+    return _escape(c, max_iterations, escape_radius)[0]
+
+
+def escape_hits(c, max_iterations, shape, window=FULL_VIEW, escape_radius=2.):
+    """
+    escape_counts et, pour chaque c, le nombre de points de son orbite qui tombent dans l'image de
+    dimension shape couvrant window (0 si c ne diverge pas), comptés pendant les mêmes itérations
+    """
+    return _escape(c, max_iterations, escape_radius, shape, window)
+
+
+def _escape(c, max_iterations, escape_radius, shape=None, window=None):
+    c = np.asarray(c, dtype=np.complex128).ravel()
+    counts = np.full(c.size, max_iterations, dtype=np.int64)
+    hits = None if window is None else np.zeros(c.size, dtype=np.int64)
+    cr = c.real
+    ci = c.imag
+    # Cardioïde principale et disque de période 2 : pas d'itération
+    q = (cr - 0.25)**2 + ci*ci
+    inside = (q*(q + (cr - 0.25)) <= 0.25*ci*ci) | ((cr + 1.)**2 + ci*ci <= 0.0625)
+    index = np.flatnonzero(~inside)
+    cr = cr[index]
+    ci = ci[index]
+    zr = cr.copy()
+    zi = ci.copy()
+    if window is not None:
+        # Nombre de points de l'orbite (z_1 à z_{iter+1}) déjà dans l'image
+        h = _in_window(zr, zi, shape, window).astype(np.int64)
+    radius2 = escape_radius*escape_radius
+    for it in range(max_iterations):
+        if index.size == 0:
+            break
+        zr2 = zr*zr
+        zi2 = zi*zi
+        zi = 2.*zr*zi + ci
+        zr = zr2 - zi2 + cr
+        escaped = zr*zr + zi*zi > radius2
+        if escaped.any():
+            counts[index[escaped]] = it
+            keep = ~escaped
+            if window is not None:
+                hits[index[escaped]] = h[escaped]
+                h = h[keep]
+            index, cr, ci, zr, zi = index[keep], cr[keep], ci[keep], zr[keep], zi[keep]
+        if window is not None:
+            h += _in_window(zr, zi, shape, window)
+    return counts, hits
+
+
+def _in_window(zr, zi, shape, window):
+    """Masque des points zr + i zi qui tombent dans l'image (même test que _orbit_points)"""
+    width, height = shape
+    xmin, xmax, ymin, ymax = window
+    u = width/(xmax - xmin)*(zr - xmin)
+    v = height/(ymax - ymin)*(zi - ymin)
+    return (u >= 0.) & (u < width) & (v >= 0.) & (v < height)
+
+
+def _orbit_points(cr, ci, lengths, shape, window=FULL_VIEW):
+    """
+    Rejoue les orbites des c = cr + i ci, triés par longueur décroissante. À l'itération k, produit
+    (m, inside, pixels) : les m orbites d'au moins k+1 points, le masque (taille m) de celles dont le
+    k+1-ème point tombe dans window et l'indice de ce pixel dans l'image aplatie de dimension shape
+    """
+    width, height = shape
+    xmin, xmax, ymin, ymax = window
+    scaleX = width/(xmax - xmin)
+    scaleY = height/(ymax - ymin)
+    zr = cr.copy()
+    zi = ci.copy()
+    # active[k] : nombre d'orbites d'au moins k+1 points (les lengths sont décroissantes)
+    active = np.searchsorted(-lengths, -np.arange(1, lengths[0] + 1), side='right') if lengths.size else []
+    for k, m in enumerate(active):
+        if k > 0:
+            # Point suivant des m orbites encore en cours
+            zr2 = zr[:m]*zr[:m]
+            zi2 = zi[:m]*zi[:m]
+            zi = 2.*zr[:m]*zi[:m] + ci[:m]
+            zr = zr2 - zi2 + cr[:m]
+        u = scaleX*(zr - xmin)
+        v = scaleY*(zi - ymin)
+        inside = (u >= 0.) & (u < width) & (v >= 0.) & (v < height)
+        yield m, inside, u.astype(np.int64)*height + v.astype(np.int64)
+
+
+def accumulate_orbits(c, lengths, image, weights=None, groups=None, window=FULL_VIEW):
+    """
+    Ajoute à image (tableau (width, height) couvrant window) les lengths[i] premiers points de l'orbite de
+    chaque c[i], chaque point valant weights[i] (1 si weights est None ; sinon image doit être en
+    flottants). Avec groups, image est un tableau (nbGroups, width, height) et l'orbite de c[i] va dans
+    image[groups[i]]
+    """
+    width, height = image.shape[-2:]
+    order = np.argsort(-lengths, kind='stable')
+    lengths = lengths[order]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.double)[order]
+    # Décalage de chaque orbite dans l'histogramme (image aplatie)
+    offset = 0 if groups is None else np.asarray(groups, dtype=np.int64)[order]*(width*height)
+    histogram = np.zeros(image.size, dtype=np.int64 if weights is None else np.double)
+    pending = []
+    pending_weights = []
+    pending_size = 0
+    nb_steps = lengths[0] if lengths.size else 0
+    for k, (m, inside, pixels) in enumerate(_orbit_points(c.real[order], c.imag[order], lengths,
+                                                          (width, height), window)):
+        if groups is not None:
+            pixels += offset[:m]
+        pending.append(pixels[inside])
+        if weights is not None:
+            pending_weights.append(weights[:m][inside])
+        pending_size += pending[-1].size
+        if pending_size >= FLUSH_SIZE or k == nb_steps - 1:
+            pixels = np.concatenate(pending)
+            if weights is None:
+                histogram += np.bincount(pixels, minlength=image.size)
+            else:
+                histogram += np.bincount(pixels, np.concatenate(pending_weights), minlength=image.size)
+            pending = []
+            pending_weights = []
+            pending_size = 0
+    image += histogram.reshape(image.shape).astype(image.dtype, copy=False)
+    return image
+
+
+def random_samples(nbSamples, rng=np.random):
+    """
+    nbSamples points c tirés comme dans bhuddabort_task : rayon uniforme dans [0, 2), angle uniforme.
+    La densité correspondante dans le plan est proportionnelle à 1/|c|.
+    """
+    radius = 2*rng.random(nbSamples)
+    angle = twoPi*rng.random(nbSamples)
+    return radius*(np.cos(angle) + np.sin(angle)*1j)
+
+
+def pack_samples(streams, stream, first_pack, nb_packs, packSize=PACK_SIZE):
+    """
+    Échantillons des paquets first_pack à first_pack+nb_packs-1 de la passe stream, chaque paquet étant
+    tiré avec son propre flot (stream, numéro du paquet) de streams (RandomStreams)
+    """
+    return np.concatenate([random_samples(packSize, streams.generator(stream, iPack))
+                           for iPack in range(first_pack, first_pack + nb_packs)])
+
+
+def bhuddabrot_samples(c, maxIter, image, escape_radius=2., window=FULL_VIEW):
+    """Ajoute à image les orbites des points de c qui divergent en moins de maxIter itérations"""
+    counts = escape_counts(c, maxIter, escape_radius)
+    escaping = counts < maxIter
+    if escaping.any():
+        accumulate_orbits(np.asarray(c).ravel()[escaping], counts[escaping] + 1, image, window=window)
+    return image
+
+
+def channel_limits(channels, first_pack, nb_packs, packSize=PACK_SIZE):
+    """
+    Limites d'itérations (nbChannels, nb_packs*packSize) des échantillons des paquets first_pack à
+    first_pack+nb_packs-1 d'une passe unique pour plusieurs canaux : channels est la liste des
+    (nbSamples, maxIter) de chaque canal, le canal k utilise les ceil(nbSamples_k/packSize) premiers
+    paquets (comme une passe séparée) et sa limite est 0 pour les échantillons des autres paquets
+    """
+    packs = np.repeat(np.arange(first_pack, first_pack + nb_packs), packSize)
+    return np.array([np.where(packs < -(-nbSamples//packSize), maxIter, 0) for nbSamples, maxIter in channels],
+                    dtype=np.int64)
+
+
+def bhuddabrot_channels(c, limits, image, escape_radius=2., window=FULL_VIEW):
+    """
+    Ajoute à image (tableau (nbChannels, width, height)) l'orbite de chaque c[i] dans chaque canal k où
+    elle diverge en moins de limits[k, i] itérations (limits donné par channel_limits). Chaque c n'est
+    itéré que jusqu'à la plus grande de ses limites et chaque orbite n'est rejouée qu'une fois : les
+    orbites sont regroupées selon l'ensemble des canaux où elles comptent et les canaux sont reconstitués
+    à partir des histogrammes des groupes.
+    """
+    c = np.asarray(c, dtype=np.complex128).ravel()
+    limits = np.asarray(limits, dtype=np.int64)
+    sample_limit = limits.max(axis=0)
+    counts = np.zeros(c.size, dtype=np.int64)
+    for limit in np.unique(sample_limit[sample_limit > 0]):
+        selected = sample_limit == limit
+        counts[selected] = escape_counts(c[selected], limit, escape_radius)
+    credited = counts < limits
+    # Code binaire des canaux de chaque orbite (bit k pour le canal k)
+    code = (credited.astype(np.int64) << np.arange(limits.shape[0])[:, np.newaxis]).sum(axis=0)
+    escaping = np.flatnonzero(code)
+    if escaping.size == 0:
+        return image
+    codes, groups = np.unique(code[escaping], return_inverse=True)
+    histograms = np.zeros((codes.size,) + image.shape[1:], dtype=image.dtype)
+    accumulate_orbits(c[escaping], counts[escaping] + 1, histograms, groups=groups, window=window)
+    for g, bits in enumerate(codes):
+        for k in range(image.shape[0]):
+            if bits >> k & 1:
+                image[k] += histograms[g]
+    return image
+
+
+def metropolis_estimate(chain_image, nbStates, total, nbUniform, nbSamples):
+    """
+    Image de nbSamples tirages uniformes estimée à partir de l'image chain_image de nbStates états de
+    chaînes (1/w par point d'orbite) : nbSamples tirages uniformes déposent en moyenne nbSamples E_q[w]
+    points, E_q[w] étant estimé par total/nbUniform (somme des w de nbUniform tirages uniformes)
+    """
+    if nbStates == 0 or total == 0:
+        return np.zeros_like(chain_image)
+    return nbSamples*(total/nbUniform)/nbStates*chain_image
+
+
+class MetropolisChains:
+    """
+    nbChains chaînes de Metropolis-Hastings de densité w(c) q(c), qui durent d'un appel de run au suivant.
+    L'image (self.image, en flottants, de dimension shape et couvrant window) reçoit 1/w(c) par point
+    d'orbite de chaque état ; self.nbStates, self.total et self.nbUniform donnent la normalisation
+    (metropolis_estimate). Une proposition est, avec la probabilité independent, un nouveau tirage
+    uniforme, sinon l'état courant décalé dans une direction au hasard d'une distance de loi log-uniforme
+    entre steps[0] et steps[1] (par défaut 1/10000 et 1/10 de la largeur de la fenêtre). Une chaîne ne
+    démarre qu'au premier de ses tirages uniformes qui touche l'image, et tous ses états comptent alors
+    w(c0) fois (c0 son premier état) : les départs suivent ainsi la densité w q et l'image n'est pas
+    biaisée par la période de chauffe. Toutes les chaînes avancent ensemble (un pas coûte autant de
+    boucles numpy que la plus longue orbite, d'où un nombre de chaînes de plusieurs paquets).
+    """
+    def __init__(self, maxIter, shape, window=FULL_VIEW, rng=np.random, nbChains=4*PACK_SIZE, steps=None,
+                 independent=0.25, escape_radius=2.):
+        self.maxIter = maxIter
+        self.shape = shape
+        self.window = window
+        self.rng = rng
+        self.nbChains = nbChains
+        span = window[1] - window[0]
+        self.steps = (1e-4*span, 0.1*span) if steps is None else steps
+        self.independent = independent
+        self.escape_radius = escape_radius
+        self.image = np.zeros(shape, dtype=np.double)
+        self.nbStates = 0
+        self.total = 0
+        self.nbUniform = 0
+        self.credit = 0
+        # État des chaînes (poids nul tant que la chaîne n'a pas démarré), longueur et poids w de son
+        # orbite, nombre de pas passés dans cet état
+        self.state = np.zeros(nbChains, dtype=np.complex128)
+        self.length = np.zeros(nbChains, dtype=np.int64)
+        self.weight = np.zeros(nbChains, dtype=np.int64)
+        self.held = np.zeros(nbChains)
+        # Poids de chaque chaîne : w de son premier état
+        self.origin = np.zeros(nbChains)
+        self.emitted = []
+
+    def weights(self, c):
+        """Poids w(c) (nombre de points d'orbite dans l'image) et longueur de l'orbite de chaque c"""
+        counts, w = escape_hits(c, self.maxIter, self.shape, self.window, self.escape_radius)
+        w[np.abs(c) >= 2.] = 0
+        return w, counts + 1
+
+    def run(self, nbProposals):
+        """
+        Fait avancer les chaînes de nbProposals propositions : un pas de toutes les chaînes chaque fois que
+        nbChains propositions sont disponibles, le reste est reporté à l'appel suivant (ou à flush)
+        """
+        self.credit += nbProposals
+        while self.credit >= self.nbChains:
+            self._step(self.nbChains)
+            self.credit -= self.nbChains
+
+    def _step(self, n):
+        """Un pas des n premières chaînes (les tableaux ci-dessous sont des vues sur leur état)"""
+        state, length, weight = self.state[:n], self.length[:n], self.weight[:n]
+        held, origin = self.held[:n], self.origin[:n]
+        started = weight > 0
+        jump = (self.rng.random(n) < self.independent) | ~started
+        radius = self.steps[0]*(self.steps[1]/self.steps[0])**self.rng.random(n)
+        proposal = state + radius*np.exp(twoPi*1j*self.rng.random(n))
+        proposal[jump] = random_samples(np.count_nonzero(jump), self.rng)
+        w, lengths = self.weights(proposal)
+        self.total += int(w[jump].sum())
+        self.nbUniform += np.count_nonzero(jump)
+        # Rapport d'acceptation : w(c')/w(c) pour un tirage uniforme, w(c')q(c')/(w(c)q(c)) pour un pas
+        # (symétrique), avec q(c) proportionnel à 1/|c|. Une chaîne qui n'a pas démarré accepte le
+        # premier tirage qui touche l'image
+        ratio = np.divide(w, weight, out=np.where(w > 0, np.inf, 0.), where=started)
+        walk = ~jump
+        ratio[walk] *= np.abs(state[walk])/np.maximum(np.abs(proposal[walk]), 1e-300)
+        accepted = (self.rng.random(n) < ratio) & (w > 0)
+        self._emit(np.flatnonzero(accepted & started))
+        state[accepted] = proposal[accepted]
+        length[accepted] = lengths[accepted]
+        weight[accepted] = w[accepted]
+        held[accepted] = 0.
+        origin[accepted & ~started] = w[accepted & ~started]
+        started |= accepted
+        held[started] += 1.
+        self.nbStates += origin[started].sum()
+
+    def _emit(self, selected, flush=False):
+        """Dépose (par paquets) les orbites des états quittés, avec le poids held/w par point"""
+        if selected.size:
+            self.emitted.append((self.state[selected], self.length[selected],
+                                 self.held[selected]*self.origin[selected]/self.weight[selected]))
+        if self.emitted and (flush or sum(e[0].size for e in self.emitted) >= EMIT_SIZE):
+            c, lengths, weights = (np.concatenate(e) for e in zip(*self.emitted))
+            accumulate_orbits(c, lengths, self.image, weights, window=self.window)
+            self.emitted.clear()
+
+    def flush(self):
+        """
+        Fin de passe : les propositions restantes font avancer d'un pas autant de chaînes, puis les états
+        courants sont déposés et self.image est complète
+        """
+        if self.credit > 0:
+            self._step(self.credit)
+            self.credit = 0
+        self._emit(np.flatnonzero(self.held > 0), flush=True)
+        self.held[:] = 0.
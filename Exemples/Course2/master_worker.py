@@ -0,0 +1,167 @@
+# Ordonnanceur maître-esclave générique (MPI)
+#
+# Le travail est une suite de nb_items éléments (lignes d'une image, paquets d'échantillons, blocs d'une
+# matrice...), distribués par tranches [first, last) :
+#   - taille guidée : une tranche couvre une fraction des éléments restants (divisés par le nombre de
+#     tranches en cours possibles), arrondie à un multiple de min_chunk : grosses tranches au début, petites
+#     à la fin pour équilibrer la charge ;
+#   - préchargement : chaque esclave a jusqu'à prefetch tranches en attente, il enchaîne sans attendre le
+#     maître ;
+#   - le maître calcule aussi (de petites tranches) quand aucun résultat n'est arrivé ;
+#   - sans pickle : les tranches sont envoyées comme deux entiers int64 et les résultats, s'il y en a, sont
+#     reçus par Irecv directement dans le tableau du maître (result_buffer). Un esclave traite ses tranches
+#     dans l'ordre et les messages d'une même source avec la même tag ne se doublent pas : le maître sait
+#     quelle tranche est le prochain résultat de chaque esclave.
+#
+# Exemple (image de height lignes, calculées par bandes de 16 lignes au moins) :
+#     run_tasks(comm, height, lambda y0, y1: compute_rows(y0, y1),
+#               result_buffer=lambda y0, y1: image[y0:y1], min_chunk=16)
+#
+# reduce_counts somme sur root des histogrammes d'entiers positifs avec le plus petit type non signé qui
+# ne peut pas déborder (uint8, uint16, uint32 ou uint64) au lieu d'int64.
+from collections import deque
+import numpy as np
+from mpi4py import MPI
+
+TAG_WORK = 1
+TAG_RESULT = 2
+TAG_DIE = 3
+
+
+def guided_chunk(remaining, slots, min_chunk=1, max_chunk=None):
+    """
+    Taille de la prochaine tranche : remaining/slots arrondi au multiple de min_chunk supérieur, au plus
+    max_chunk
+    """
+    size = -(-remaining // max(1, slots))
+    size = -(-size // min_chunk)*min_chunk
+    if max_chunk is not None:
+        size = min(size, max(min_chunk, max_chunk))
+    return min(remaining, size)
+
+
+def run_tasks(comm, nb_items, compute, result_buffer=None, prefetch=2, min_chunk=1, max_chunk=None,
+              master_computes=True, root=0):
+    """
+    Exécute compute(first, last) sur toutes les tranches de [0, nb_items), réparties dynamiquement entre
+    les processus de comm (tous appellent run_tasks).
+        - result_buffer : sur root, result_buffer(first, last) est le tableau contigu où ranger le résultat
+          de compute(first, last) (même type et même taille) ; None si compute ne renvoie rien à root
+          (chaque processus accumule alors ses résultats localement, par exemple avant une réduction)
+        - prefetch : nombre de tranches en attente par esclave
+        - min_chunk : taille minimale (et granularité) des tranches
+        - max_chunk : taille maximale des tranches (par exemple 1 pour des éléments de coûts très inégaux
+          distribués un par un, du plus cher au moins cher)
+        - master_computes : root calcule aussi des tranches entre deux réceptions
+    Retourne sur root le nombre d'éléments traités par chaque processus, None sur les autres.
+    """
+    rank = comm.Get_rank()
+    size = comm.Get_size()
+    if rank != root:
+        _worker(comm, compute, result_buffer is not None, root)
+        return None
+
+    workers = [r for r in range(size) if r != root]
+    slots = prefetch*len(workers) + (1 if master_computes else 0)
+    if not workers and not master_computes:
+        raise ValueError("Aucun processus pour calculer : master_computes=False demande au moins un esclave")
+    processed = np.zeros(size, dtype=np.int64)
+    pending = {w: deque() for w in workers}               # tranches envoyées à chaque esclave, en ordre
+    requests = [MPI.REQUEST_NULL for _ in workers]        # Irecv du prochain résultat de chaque esclave
+    ack = np.empty(0, dtype=np.uint8)
+    next_item = 0
+
+    def assign(worker):
+        """Envoie la prochaine tranche à worker, ou TAG_DIE s'il n'y a plus rien à faire"""
+        nonlocal next_item
+        if next_item < nb_items:
+            chunk = guided_chunk(nb_items - next_item, slots, min_chunk, max_chunk)
+            task = np.array([next_item, next_item + chunk], dtype=np.int64)
+            comm.Send(task, dest=worker, tag=TAG_WORK)
+            pending[worker].append((next_item, next_item + chunk))
+            next_item += chunk
+            return True
+        comm.Send(np.zeros(2, dtype=np.int64), dest=worker, tag=TAG_DIE)
+        return False
+
+    def post_receive(i):
+        """Irecv du résultat de la plus ancienne tranche de l'esclave workers[i]"""
+        worker = workers[i]
+        if pending[worker]:
+            first, last = pending[worker][0]
+            buffer = ack if result_buffer is None else result_buffer(first, last)
+            requests[i] = comm.Irecv(buffer, source=worker, tag=TAG_RESULT)
+
+    # Distribution initiale : prefetch tranches par esclave, à tour de rôle
+    alive = set()
+    for _ in range(prefetch):
+        for worker in workers:
+            if next_item < nb_items:
+                assign(worker)
+                alive.add(worker)
+    for i, worker in enumerate(workers):
+        if worker in alive:
+            post_receive(i)
+        else:
+            assign(worker)   # rien à faire : TAG_DIE
+
+    while True:
+        if master_computes and next_item < nb_items:
+            i, done = MPI.Request.Testany(requests)
+            if not done or i == MPI.UNDEFINED:
+                # Aucun résultat (ou aucun esclave) : le maître calcule une petite tranche (les esclaves
+                # ont leurs tranches préchargées et ne l'attendent pas)
+                chunk = guided_chunk(nb_items - next_item, slots*max(1, prefetch), min_chunk, max_chunk)
+                first, last = next_item, next_item + chunk
+                next_item = last
+                result = compute(first, last)
+                if result_buffer is not None:
+                    result_buffer(first, last)[...] = result
+                processed[root] += last - first
+                continue
+        else:
+            i = MPI.Request.Waitany(requests)
+        if i == MPI.UNDEFINED:
+            break
+        worker = workers[i]
+        first, last = pending[worker].popleft()
+        processed[worker] += last - first
+        if not pending[worker] and next_item >= nb_items:
+            assign(worker)   # TAG_DIE
+            continue
+        if next_item < nb_items:
+            assign(worker)
+        post_receive(i)
+    return processed
+
+
+def _worker(comm, compute, send_result, root):
+    task = np.empty(2, dtype=np.int64)
+    status = MPI.Status()
+    ack = np.empty(0, dtype=np.uint8)
+    while True:
+        # Prochaine tranche (déjà en attente grâce au préchargement)
+        comm.Recv(task, source=root, tag=MPI.ANY_TAG, status=status)
+        if status.Get_tag() == TAG_DIE:
+            break
+        result = compute(int(task[0]), int(task[1]))
+        if send_result:
+            comm.Send(np.ascontiguousarray(result), dest=root, tag=TAG_RESULT)
+        else:
+            comm.Send(ack, dest=root, tag=TAG_RESULT)
+
+
+def reduce_counts(comm, counts, root=0):
+    """
+    Somme sur root des tableaux d'entiers positifs counts de tous les processus (None sur les autres).
+    La réduction se fait dans le plus petit type non signé qui contient la somme des maxima locaux (une
+    borne de chaque élément de la somme) : 4 fois moins de données qu'en int64 pour des comptes < 2^32.
+    """
+    bound = comm.allreduce(int(counts.max(initial=0)), op=MPI.SUM)
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if bound <= np.iinfo(dtype).max:
+            break
+    local = counts.astype(dtype)
+    total = np.empty_like(local) if comm.Get_rank() == root else None
+    comm.Reduce(local, total, op=MPI.SUM, root=root)
+    return total.astype(counts.dtype) if total is not None else None
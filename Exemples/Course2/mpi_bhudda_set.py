@@ -1,99 +1,82 @@
 # Calcul de l'ensemble de Mandelbrot en python
 import numpy as np
-from dataclasses import dataclass
 from PIL import Image
-from math import pi
 from time import time
-import matplotlib.cm
 from mpi4py import MPI
+import sys
+from bhudda_sampler import (PACK_SIZE, pack_samples, bhuddabrot_samples, channel_limits, bhuddabrot_channels,
+                            window_from_argv, MetropolisChains, metropolis_estimate)
+from rng_streams import RandomStreams, seed_from_argv
+from master_worker import run_tasks, reduce_counts
 
-twoPi = 2.*pi
+# Un flot aléatoire par passe et par paquet, dérivé de --seed=N (voir rng_streams.py) : les tirages d'un
+# paquet ne dépendent pas du processus qui le traite, l'image est la même pour tout nombre de processus
+streams = RandomStreams(seed_from_argv(sys.argv))
+# Option --window=xmin,xmax,ymin,ymax : l'image ne couvre que cette partie du plan (zoom)
+window = window_from_argv(sys.argv)
+# Option --metropolis : échantillonnage préférentiel par des chaînes de Metropolis-Hastings, une série de
+# chaînes par processus qui dure toute la passe (image en flottants, même normalisation que le tirage
+# uniforme). L'image dépend alors du nombre de processus (mais pas son espérance)
+metropolis = '--metropolis' in sys.argv
+# Option --single-pass : les trois composantes en une seule passe (une seule distribution des tâches et une
+# seule réduction, voir bhuddabrot_channels)
+singlePass = '--single-pass' in sys.argv
 
-@dataclass
-class MandelbrotSet:
-    max_iterations: int
-    escape_radius : float = 2.0
-
-    def __contains__(self, c: complex) -> bool:
-        return self.stability(c) == 1
-
-    def convergence(self, c:complex, clamp=True) -> float:
-        value = self.count_iterations(c)[0]/self.max_iterations
-        return max(0.0, min(value, 1.0)) if clamp else value
-
-    def count_iterations(self, c: complex) :
-        iter : int
-        z = []
-        z.append(c)
-        for iter in range(self.max_iterations):
-            z.append(z[-1]*z[-1] + c)
-            if abs(z[-1]) > self.escape_radius:
-                return iter, np.array(z[:-1],dtype=np.complex128)
-        return self.max_iterations,np.array([],dtype=np.complex128)
-
-# Definition d'une tâche prenant un sous paquet de samples à traiter :
-def bhuddabort_task(nbSamples : int, maxIter : int, width : int, height : int ):
-    radius = 2*np.random.rand(nbSamples)
-    angle  = twoPi*np.random.rand(nbSamples)
-    scaleX = 0.25*width
-    scaleY = 0.25*height
-    image = np.zeros((width, height),dtype=np.int64)
-    cArr = radius*(np.cos(angle)+np.sin(angle)*1j)
-    mandelbrot_set = MandelbrotSet(max_iterations=maxIter)
-    for c in cArr:
-        niter, orbit = mandelbrot_set.count_iterations(c)
-        if niter < maxIter:
-            x = np.asarray(scaleX*(orbit.real+2.),dtype=np.int32)
-            y = np.asarray(scaleY*(orbit.imag+2.),dtype=np.int32)
-            mask = np.logical_and(x<width, y<height)
-            xfiltre = x[np.where(mask)]
-            yfiltre = y[np.where(mask)]
-            image[xfiltre,yfiltre] += 1
+# Definition d'une tâche prenant les paquets d'échantillons first à last-1 à traiter :
+# les orbites sont ajoutées directement à l'image locale du processus (échantillonneur vectorisé,
+# voir bhudda_sampler.py)
+def bhuddabort_task(first : int, last : int, stream : int, maxIter : int, image ):
+    cArr = pack_samples(streams, stream, first, last-first)
+    bhuddabrot_samples(cArr, maxIter, image, window=window)
     return image
 
+# Passe --metropolis : chaque paquet attribué au processus apporte PACK_SIZE propositions à ses chaînes.
+# Les images des chaînes et les compteurs de normalisation sont sommés sur le processus 0
+def bhuddabrot_metropolis ( nbSamples : int, maxIter : int, width : int, height : int, comm : MPI.Comm,
+                            stream : int ):
+    nbPacks = (nbSamples+PACK_SIZE-1)//PACK_SIZE
+    # Flot des chaînes du processus : après ceux des paquets de la passe
+    chains = MetropolisChains(maxIter, (width, height), window,
+                              rng=streams.generator(stream, nbPacks+comm.rank))
+    run_tasks(comm, nbPacks, lambda first, last: chains.run((last-first)*PACK_SIZE), prefetch=2)
+    chains.flush()
+    image = np.empty_like(chains.image) if comm.rank == 0 else None
+    comm.Reduce([chains.image, MPI.DOUBLE], [image, MPI.DOUBLE] if image is not None else None,
+                op=MPI.SUM, root=0)
+    counts = np.array([chains.nbStates, chains.total, chains.nbUniform], dtype=np.double)
+    sums = np.empty_like(counts) if comm.rank == 0 else None
+    comm.Reduce([counts, MPI.DOUBLE], [sums, MPI.DOUBLE] if sums is not None else None, op=MPI.SUM, root=0)
+    if comm.rank != 0:
+        return None
+    return metropolis_estimate(image, *sums, nbSamples)
+
 # Bhuddabrot to test the chronometer
-def bhuddabrot ( nbSamples : int, maxIter : int, width : int, height : int, comm : MPI.Comm ):
-    packSize = 64
-    nbp      = comm.size
-    rank     = comm.rank
+def bhuddabrot ( nbSamples : int, maxIter : int, width : int, height : int, comm : MPI.Comm, stream : int ):
+    if metropolis:
+        return bhuddabrot_metropolis(nbSamples, maxIter, width, height, comm, stream)
+    nbPacks = (nbSamples+PACK_SIZE-1)//PACK_SIZE
+    image = np.zeros((width, height),dtype=np.int64)
+    # Algorithme maître-esclave (voir master_worker.py) : les paquets sont distribués par tranches de
+    # taille guidée, préchargées chez les esclaves, et le processus 0 calcule aussi. Chaque processus
+    # accumule ses orbites dans son image locale
+    run_tasks(comm, nbPacks, lambda first, last: bhuddabort_task(first, last, stream, maxIter, image),
+              prefetch=2)
+    # Somme des images sur le processus 0 dans le plus petit type entier non signé qui ne déborde pas
+    return reduce_counts(comm, image)
 
-    nbPacks = (nbSamples+packSize-1)//packSize
-    image     = np.zeros((width, height),dtype=np.int64)
-    image_loc = np.zeros((width, height),dtype=np.int64)
-    # Algorithme maître-escalve :
-    if rank==0: # Algorithme maître distribuant les tâches
+# Passe unique : channels est la liste des (nbSamples, maxIter) de chaque composante. Les échantillons sont
+# ceux de la passe 0 ; chaque orbite n'est calculée qu'une fois et comptée dans toutes les composantes
+# dont elle respecte la limite d'itérations, puis les composantes sont sommées en une seule réduction
+def bhuddabrot_single_pass ( channels, width : int, height : int, comm : MPI.Comm ):
+    nbPacks = max((nbSamples+PACK_SIZE-1)//PACK_SIZE for nbSamples, _ in channels)
+    image = np.zeros((len(channels), width, height),dtype=np.int64)
 
-        iPack : int = 0
-        for iProc in range(1,nbp):
-            comm.send(iPack, iProc)
-            iPack += 1
-        stat : MPI.Status = MPI.Status()
-        while iPack < nbPacks:
-            done = comm.recv(status=stat)# On reçoit du premier process à envoyer un message
-            slaveRk = stat.source
-            comm.send(iPack, dest=slaveRk)
-            iPack += 1
-        iPack = -1 # iPack vaut maintenant -1 pour signaler aux autres procs qu'il n'y a plus de tâches à exécuter
-        for iProc in range(1,nbp):
-            status = MPI.Status()
-            done = comm.recv(status=status)# On reçoit du premier process à envoyer un message
-            slaveRk : int = status.source
-            comm.send(iPack, dest=slaveRk)
-        comm.Reduce([image_loc,MPI.INT64_T], [image,MPI.INT64_T], op=MPI.SUM, root=0)
-    else:
-        status : MPI.Status = MPI.Status()
-        iPack : int
-        res   : int = 1
+    def task(first : int, last : int):
+        cArr = pack_samples(streams, 0, first, last-first)
+        bhuddabrot_channels(cArr, channel_limits(channels, first, last-first), image, window=window)
 
-        iPack = comm.recv(source=0) # On reçoit un n° de tâche à effectuer
-        while iPack != -1:          # Tant qu'il y a une tâche à faire
-            image_loc = bhuddabort_task(packSize, maxIter, width, height )
-            req : MPI.Request = comm.isend(res,0)
-            image += image_loc
-            iPack = comm.recv(source=0) # On reçoit un n° de tâche à effectuer
-            req.wait()
-        comm.Reduce([image,MPI.INT64_T], None, op=MPI.SUM, root=0)
-    return image
+    run_tasks(comm, nbPacks, task, prefetch=2)
+    return reduce_counts(comm, image)
 
 globCom = MPI.COMM_WORLD.Dup()
 nbp     = globCom.size
@@ -110,13 +93,20 @@ width, height = 1024, 1024
 s1 = 1500_000 #150_000
 s2 =  500_000 # 50_000
 s3 =    30000 # 3_000
+if singlePass and metropolis:
+    sys.exit("--single-pass ne s'applique qu'au tirage uniforme (sans --metropolis)")
 deb = time()
-out.write("red\n")
-redOrbit   = bhuddabrot( s1,  2_000, width, height, globCom)
-out.write("green\n")
-greenOrbit = bhuddabrot(  s2, 10_000, width, height, globCom)
-out.write("blue\n")
-blueOrbit  = bhuddabrot(   s3, 10_000, width, height, globCom)
+if singlePass:
+    out.write("red, green, blue\n")
+    channels = bhuddabrot_single_pass([(s1, 2_000), (s2, 10_000), (s3, 10_000)], width, height, globCom)
+    redOrbit, greenOrbit, blueOrbit = channels if channels is not None else (None, None, None)
+else:
+    out.write("red\n")
+    redOrbit   = bhuddabrot( s1,  2_000, width, height, globCom, 0)
+    out.write("green\n")
+    greenOrbit = bhuddabrot(  s2, 10_000, width, height, globCom, 1)
+    out.write("blue\n")
+    blueOrbit  = bhuddabrot(   s3, 10_000, width, height, globCom, 2)
 fin = time()
 out.write(f"Temps du calcul de l'ensemble de Bhuddabrot : {fin-deb} secondes\n")
 
@@ -130,10 +120,11 @@ if rank==0:
     scal1 : float = 16.*stride/b1
     scal2 : float = 16.*stride/b2
     scal3 : float = 16.*stride/b3
-    red   = np.array(np.clip((scal1*redOrbit).astype(np.uint8),0,255))
-    green = np.array(np.clip((scal2*greenOrbit).astype(np.uint8),0,255))
-    blue  = np.array(np.clip((scal3*blueOrbit).astype(np.uint8),0,255))
-    pixels = np.stack((red,green,blue),axis=-1)
+    # Les trois composantes sont écrites directement dans l'image uint8 préallouée
+    pixels = np.empty((width, height, 3), dtype=np.uint8)
+    pixels[:,:,0] = (scal1*redOrbit).astype(np.uint8)
+    pixels[:,:,1] = (scal2*greenOrbit).astype(np.uint8)
+    pixels[:,:,2] = (scal3*blueOrbit).astype(np.uint8)
     image = Image.fromarray(pixels, 'RGB')
     fin = time()
     out.write(f"Temps de constitution de l'image : {fin-deb} secondes\n")
@@ -1,7 +1,9 @@
 from math import pi, sin, cos
 import numpy as np
 import time
+import sys
 from mpi4py import MPI
+from master_worker import run_tasks
 
 twoPi : float = 2*pi
 
@@ -79,33 +81,62 @@ begRows[0] = 0
 for i in range(1,nbBlocks):
     begRows[i] = begRows[i-1] + dimensions[i]
 
-# Distributions des blocs pour optimiser l'équilibrage :
-indexLocalBlocks = distribBlocks( dimensions, nbp, rank )
-out.write(f"Distribution : {indexLocalBlocks}\n")
-
-out.write(f"Nombre de blocs locaux : {len(indexLocalBlocks)}\n")
-# Initialisation des blocs diagonaux locaux de A et B
-# ---------------------------------------------------
-# A_ii est sous la forme U_{a}.V_{a}^{T} (produit tensoriel de deux vecteurs)
-# B_ii est sous la forme U_{b}.V_{b}^{T} (produit tensoriel de deux vecteurs)
-#
-debut = time.time()
-nbBlocksLoc = len(indexLocalBlocks)
-A = []
-B = []
-for index in indexLocalBlocks:
-    A.append(generateDiagonalBlock(dimensions[index], freq1, begRows[index]))
-    B.append(generateDiagonalBlock(dimensions[index], freq2, begRows[index]))
-fin = time.time()
-out.write(f"Temps d'assemblage des blocs : {fin-debut} secondes\n")
-out.write(f"Nombre blocs stockés local : {len(A)} \n")
-# Calcul des blocs diagonaux de C = A.B
-debut = time.time()
-C = []
-for iBlock in range(nbBlocksLoc):
-    C.append(A[iBlock].dot(B[iBlock]))
-fin   = time.time()
-out.write(f"Temps produit des blocs diagonaux : {fin-debut} secondes\n")
+# Option --dynamic : les blocs sont distribués pendant le calcul par l'ordonnanceur maître-esclave
+# (master_worker.py), un par un du plus grand au plus petit, à mesure que les processus se libèrent (le
+# processus 0 calcule aussi). Sans l'option, distribution statique gloutonne selon dim³ (distribBlocks)
+dynamic = '--dynamic' in sys.argv
+if dynamic:
+    sort_index = np.flip(np.argsort(dimensions))
+    indexLocalBlocks = []
+    A = []
+    B = []
+    C = []
+
+    def blocksTask(first : int, last : int):
+        # Assemblage des blocs diagonaux de A et B puis produit C_ii = A_ii.B_ii
+        for index in sort_index[first:last]:
+            indexLocalBlocks.append(index)
+            A.append(generateDiagonalBlock(dimensions[index], freq1, begRows[index]))
+            B.append(generateDiagonalBlock(dimensions[index], freq2, begRows[index]))
+            C.append(A[-1].dot(B[-1]))
+
+    debut = time.time()
+    processed = run_tasks(comGlobal, nbBlocks, blocksTask, max_chunk=1)
+    fin = time.time()
+    nbBlocksLoc = len(indexLocalBlocks)
+    out.write(f"Distribution : {indexLocalBlocks}\n")
+    out.write(f"Nombre de blocs locaux : {nbBlocksLoc}\n")
+    if processed is not None:
+        out.write(f"Blocs traités par processus : {processed.tolist()}\n")
+    out.write(f"Temps d'assemblage et produit des blocs diagonaux : {fin-debut} secondes\n")
+else:
+    # Distributions des blocs pour optimiser l'équilibrage :
+    indexLocalBlocks = distribBlocks( dimensions, nbp, rank )
+    out.write(f"Distribution : {indexLocalBlocks}\n")
+
+    out.write(f"Nombre de blocs locaux : {len(indexLocalBlocks)}\n")
+    # Initialisation des blocs diagonaux locaux de A et B
+    # ---------------------------------------------------
+    # A_ii est sous la forme U_{a}.V_{a}^{T} (produit tensoriel de deux vecteurs)
+    # B_ii est sous la forme U_{b}.V_{b}^{T} (produit tensoriel de deux vecteurs)
+    #
+    debut = time.time()
+    nbBlocksLoc = len(indexLocalBlocks)
+    A = []
+    B = []
+    for index in indexLocalBlocks:
+        A.append(generateDiagonalBlock(dimensions[index], freq1, begRows[index]))
+        B.append(generateDiagonalBlock(dimensions[index], freq2, begRows[index]))
+    fin = time.time()
+    out.write(f"Temps d'assemblage des blocs : {fin-debut} secondes\n")
+    out.write(f"Nombre blocs stockés local : {len(A)} \n")
+    # Calcul des blocs diagonaux de C = A.B
+    debut = time.time()
+    C = []
+    for iBlock in range(nbBlocksLoc):
+        C.append(A[iBlock].dot(B[iBlock]))
+    fin   = time.time()
+    out.write(f"Temps produit des blocs diagonaux : {fin-debut} secondes\n")
 
 # Vérification des blocs diagonaux calculés pour C :
 # -------------------------------------------------
@@ -0,0 +1,57 @@
+# Flots de nombres aléatoires indépendants et reproductibles pour les calculs de Monte-Carlo
+#
+# Tous les flots dérivent d'une graine unique par np.random.SeedSequence : le flot de clé (k0, k1, ...)
+# est celui de SeedSequence(seed, spawn_key=(k0, k1, ...)), c'est-à-dire l'enfant k1 de l'enfant k0 de
+# SeedSequence(seed) obtenu par spawn. Les flots de clés différentes sont statistiquement indépendants.
+#
+# On associe un flot à chaque tâche (par exemple (passe, numéro de paquet)) et non à chaque processus :
+# les tirages d'une tâche ne dépendent ni du nombre de processus ni du processus qui l'exécute ni de
+# l'ordre d'exécution, et le résultat est identique bit à bit pour tout nombre de processus (tant que la
+# combinaison des résultats est exacte, par exemple une somme d'entiers).
+#
+# Exemple :
+#     streams = RandomStreams(seed=2026)
+#     rng = streams.generator(passe, iPack)        # np.random.Generator (PCG64DXSM par défaut)
+#     x = np.empty(n); rng.random(out=x)           # tirage dans un tableau préalloué
+import numpy as np
+
+# Graine par défaut des scripts (option --seed=N pour la changer)
+DEFAULT_SEED = 2026
+
+BIT_GENERATORS = {
+    'pcg64dxsm': np.random.PCG64DXSM,
+    'pcg64': np.random.PCG64,
+    'philox': np.random.Philox,
+}
+
+
+class RandomStreams:
+    """
+    Fabrique de générateurs indépendants identifiés par une clé d'entiers.
+    bit_generator : 'pcg64dxsm' (par défaut), 'pcg64' ou 'philox'.
+    """
+    def __init__(self, seed=DEFAULT_SEED, bit_generator='pcg64dxsm'):
+        if bit_generator not in BIT_GENERATORS:
+            raise ValueError(f"Générateur inconnu : {bit_generator} ({', '.join(BIT_GENERATORS)})")
+        self.seed = seed
+        self.bit_generator = BIT_GENERATORS[bit_generator]
+
+    def seed_sequence(self, *key) -> np.random.SeedSequence:
+        """SeedSequence du flot key (identique à l'enfant obtenu par spawn successifs)"""
+        return np.random.SeedSequence(self.seed, spawn_key=tuple(int(k) for k in key))
+
+    def generator(self, *key) -> np.random.Generator:
+        """Générateur du flot key"""
+        return np.random.Generator(self.bit_generator(self.seed_sequence(*key)))
+
+    def spawn(self, nb_streams, *key):
+        """Générateurs des nb_streams premiers flots fils de key (par exemple un par processus)"""
+        return [np.random.Generator(self.bit_generator(s)) for s in self.seed_sequence(*key).spawn(nb_streams)]
+
+
+def seed_from_argv(argv, default=DEFAULT_SEED) -> int:
+    """Option --seed=N de la ligne de commande"""
+    for a in argv:
+        if a.startswith('--seed='):
+            return int(a.split('=', 1)[1])
+    return default
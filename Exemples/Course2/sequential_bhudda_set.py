@@ -1,53 +1,51 @@
 # Calcul de l'ensemble de Mandelbrot en python
 import numpy as np
-from dataclasses import dataclass
 from PIL import Image
-from math import pi
 from time import time
-import matplotlib.cm
+import sys
+from bhudda_sampler import (PACK_SIZE, pack_samples, bhuddabrot_samples, channel_limits, bhuddabrot_channels,
+                            window_from_argv, MetropolisChains, metropolis_estimate)
+from rng_streams import RandomStreams, seed_from_argv
 
-twoPi = 2.*pi
-
-@dataclass
-class MandelbrotSet:
-    max_iterations: int
-    escape_radius : float = 2.0
-
-    def __contains__(self, c: complex) -> bool:
-        return self.stability(c) == 1
-
-    def convergence(self, c:complex, clamp=True) -> float:
-        value = self.count_iterations(c)[0]/self.max_iterations
-        return max(0.0, min(value, 1.0)) if clamp else value
-
-    def count_iterations(self, c: complex) :
-        iter : int
-        z = []
-        z.append(c)
-        for iter in range(self.max_iterations):
-            z.append(z[-1]*z[-1] + c)
-            if abs(z[-1]) > self.escape_radius:
-                return iter, np.array(z[:-1],dtype=np.complex128)
-        return self.max_iterations,np.array([],dtype=np.complex128)
+# Nombre de paquets d'échantillons traités ensemble par l'échantillonneur vectorisé
+packsPerBatch = 16
+# Un flot aléatoire par passe et par paquet, dérivé de --seed=N : mêmes tirages (et même image) que
+# mpi_bhudda_set.py, quel que soit le nombre de processus
+streams = RandomStreams(seed_from_argv(sys.argv))
+# Option --window=xmin,xmax,ymin,ymax : l'image ne couvre que cette partie du plan (zoom)
+window = window_from_argv(sys.argv)
+# Option --metropolis : échantillonnage préférentiel par des chaînes de Metropolis-Hastings (image en
+# flottants, même normalisation que le tirage uniforme), utile pour un zoom étroit
+metropolis = '--metropolis' in sys.argv
+# Option --single-pass : les trois composantes en une seule passe (voir bhuddabrot_channels)
+singlePass = '--single-pass' in sys.argv
 
 # Bhuddabrot to test the chronometer
-def bhuddabrot ( nbSamples : int, maxIter : int, width : int, height : int ):
-    radius = 2*np.random.rand(nbSamples)
-    angle  = twoPi*np.random.rand(nbSamples)
-    scaleX = 0.25*width
-    scaleY = 0.25*height
+def bhuddabrot ( nbSamples : int, maxIter : int, width : int, height : int, stream : int ):
+    nbPacks = (nbSamples+PACK_SIZE-1)//PACK_SIZE
+    if metropolis:
+        # Mêmes chaînes (flot nbPacks de la passe) que le processus 0 de mpi_bhudda_set.py
+        chains = MetropolisChains(maxIter, (width, height), window, rng=streams.generator(stream, nbPacks))
+        chains.run(nbPacks*PACK_SIZE)
+        chains.flush()
+        return metropolis_estimate(chains.image, chains.nbStates, chains.total, chains.nbUniform, nbSamples)
     image = np.zeros((width, height),dtype=np.int64)
-    cArr = radius*(np.cos(angle)+np.sin(angle)*1j)
-    mandelbrot_set = MandelbrotSet(max_iterations=maxIter)
-    for c in cArr:
-        niter, orbit = mandelbrot_set.count_iterations(c)
-        if niter < maxIter:
-            x = np.asarray(scaleX*(orbit.real+2.),dtype=np.int32)
-            y = np.asarray(scaleY*(orbit.imag+2.),dtype=np.int32)
-            mask = np.logical_and(x<width, y<height)
-            xfiltre = x[np.where(mask)]
-            yfiltre = y[np.where(mask)]
-            image[xfiltre,yfiltre] += 1
+    # Les échantillons sont tirés et itérés par paquets (voir bhudda_sampler.py)
+    for first in range(0, nbPacks, packsPerBatch):
+        cArr = pack_samples(streams, stream, first, min(packsPerBatch, nbPacks-first))
+        bhuddabrot_samples(cArr, maxIter, image, window=window)
+    return image
+
+# Passe unique : channels est la liste des (nbSamples, maxIter) de chaque composante. Les échantillons sont
+# ceux de la passe 0 ; chaque orbite n'est calculée qu'une fois et comptée dans toutes les composantes
+# dont elle respecte la limite d'itérations
+def bhuddabrot_single_pass ( channels, width : int, height : int ):
+    image = np.zeros((len(channels), width, height),dtype=np.int64)
+    nbPacks = max((nbSamples+PACK_SIZE-1)//PACK_SIZE for nbSamples, _ in channels)
+    for first in range(0, nbPacks, packsPerBatch):
+        nb = min(packsPerBatch, nbPacks-first)
+        bhuddabrot_channels(pack_samples(streams, 0, first, nb), channel_limits(channels, first, nb), image,
+                            window=window)
     return image
 
 # On peut changer les paramètres des deux prochaines lignes
@@ -57,13 +55,20 @@ width, height = 1024, 1024
 s1 = 1500_000 #150_000
 s2 =  500_000 # 50_000
 s3 =    30000 # 3_000
+if singlePass and metropolis:
+    sys.exit("--single-pass ne s'applique qu'au tirage uniforme (sans --metropolis)")
 deb = time()
-print("red")
-redOrbit   = bhuddabrot( s1,  2_000, width, height)
-print("green")
-greenOrbit = bhuddabrot(  s2, 10_000, width, height)
-print("blue")
-blueOrbit  = bhuddabrot(   s3, 10_000, width, height)
+if singlePass:
+    print("red, green, blue")
+    redOrbit, greenOrbit, blueOrbit = bhuddabrot_single_pass([(s1, 2_000), (s2, 10_000), (s3, 10_000)],
+                                                             width, height)
+else:
+    print("red")
+    redOrbit   = bhuddabrot( s1,  2_000, width, height, 0)
+    print("green")
+    greenOrbit = bhuddabrot(  s2, 10_000, width, height, 1)
+    print("blue")
+    blueOrbit  = bhuddabrot(   s3, 10_000, width, height, 2)
 fin = time()
 print(f"Temps du calcul de l'ensemble de Bhuddabrot : {fin-deb}")
 
@@ -77,10 +82,11 @@ stride : int = width*height
 scal1 : float = 16.*stride/b1
 scal2 : float = 16.*stride/b2
 scal3 : float = 16.*stride/b3
-red   = np.array(np.clip((scal1*redOrbit).astype(np.uint8),0,255))
-green = np.array(np.clip((scal2*greenOrbit).astype(np.uint8),0,255))
-blue  = np.array(np.clip((scal3*blueOrbit).astype(np.uint8),0,255))
-pixels = np.stack((red,green,blue),axis=-1)
+# Les trois composantes sont écrites directement dans l'image uint8 préallouée
+pixels = np.empty((width, height, 3), dtype=np.uint8)
+pixels[:,:,0] = (scal1*redOrbit).astype(np.uint8)
+pixels[:,:,1] = (scal2*greenOrbit).astype(np.uint8)
+pixels[:,:,2] = (scal3*blueOrbit).astype(np.uint8)
 image = Image.fromarray(pixels, 'RGB')
 fin = time()
 print(f"Temps de constitution de l'image : {fin-deb}")
@@ -1,18 +1,36 @@
 # Calcul pi par une méthode stochastique (convergence très lente !)
 import time
+import sys
 import numpy as np
 
 # Nombre d'échantillons :
 nb_samples = 40_000_000
+# Graine (option --seed=N) : le résultat est reproductible
+seed = 2026
+for a in sys.argv:
+    if a.startswith('--seed='): seed = int(a.split('=')[1])
+# Les points sont tirés par paquets de pack_size, chaque paquet avec son propre flot aléatoire
+# (SeedSequence(seed).spawn, générateur PCG64DXSM) : on peut répartir les paquets entre processus sans
+# changer le résultat, et seul un paquet est en mémoire
+pack_size = 1_000_000
 
 beg = time.time()
-# Tirage des points (x,y) tirés dans un carré [-1;1] x [-1; 1]
-x = 2.*np.random.random_sample((nb_samples,))-1.
-y = 2.*np.random.random_sample((nb_samples,))-1.
-# Création masque pour les points dans le cercle unité
-filtre = np.array(x*x + y*y < 1.)
-# Compte le nombre de points dans le cercle unité
-sum = np.add.reduce(filtre, 0)
+nb_packs = (nb_samples + pack_size - 1)//pack_size
+x = np.empty(pack_size)
+y = np.empty(pack_size)
+sum = 0
+for i_pack, seq in enumerate(np.random.SeedSequence(seed).spawn(nb_packs)):
+    n = min(pack_size, nb_samples - i_pack*pack_size)
+    rng = np.random.Generator(np.random.PCG64DXSM(seq))
+    # Tirage des points (x,y) tirés dans un carré [-1;1] x [-1; 1], dans les tableaux préalloués
+    xs, ys = x[:n], y[:n]
+    rng.random(out=xs)
+    rng.random(out=ys)
+    xs *= 2.; xs -= 1.
+    ys *= 2.; ys -= 1.
+    # Compte le nombre de points dans le cercle unité
+    xs *= xs; ys *= ys; xs += ys
+    sum += np.count_nonzero(xs < 1.)
 
 approx_pi = 4.*sum/nb_samples
 end = time.time()
@@ -0,0 +1,170 @@
+# Mise en couleurs et écriture des images calculées
+#
+# Palette : les valeurs de convergence (dans [0, 1]) sont converties en couleurs par une table de
+# correspondance uint8 (LUT) de 256 ou 4096 entrées, indexée par des entiers. Le résultat est écrit
+# directement dans un tableau uint8 (lignes, colonnes, 3) préalloué, sans tableau RGBA intermédiaire en
+# float64 ni copie transposée. La palette plasma est incluse dans ce module : matplotlib n'est importé que
+# pour les autres palettes.
+#
+# PNGWriter écrit un PNG bande de lignes par bande de lignes : chaque bande est compressée (zlib) et écrite
+# dans le fichier dès qu'elle arrive, sans jamais construire l'image complète en mémoire. On peut ainsi
+# produire des images plus grandes que la mémoire disponible (le format limite seulement la taille à
+# 2^31-1 pixels de côté).
+#
+# write_png met en couleurs et écrit une image par bandes de lignes (mémoire : une bande en uint8).
+#
+# Exemple :
+#     with PNGWriter("image.png", width, height) as png:
+#         for rows in bandes:          # tableaux uint8 (lignes, width, 3), de haut en bas
+#             png.write_rows(rows)
+#     write_png("mandelbrot.png", convergence)      # convergence : tableau (height, width) de [0, 1]
+import numpy as np
+import struct
+import zlib
+
+# Palette plasma de matplotlib (256 couleurs RGB, octets en hexadécimal)
+_PLASMA = (
+    "0c078610078713068915068a18068b1b068c1d068d1f058e21058f2305902505912705922905932b05942d04942f0495"
+    "3104963304973404983604983804993a049a3b039a3d039b3f039c40039c42039d44039e45039e47029f49029f4a02a0"
+    "4c02a14e02a14f02a25101a25201a35401a35601a35701a45901a45a00a55c00a55e00a55f00a66100a66200a66400a7"
+    "6500a76700a76800a76a00a76c00a86d00a86f00a87000a87200a87300a87500a87601a87801a87901a87b02a87c02a7"
+    "7e03a77f03a78104a78204a78405a68506a68607a68807a58908a58b09a48c0aa48e0ca48f0da3900ea3920fa29310a1"
+    "9511a19612a09713a099149f9a159e9b179e9d189d9e199c9f1a9ba01b9ba21c9aa31d99a41e98a51f97a72197a82296"
+    "a92395aa2494ac2593ad2692ae2791af2890b02a8fb12b8fb22c8eb42d8db52e8cb62f8bb7308ab83289b93388ba3487"
+    "bb3586bc3685bd3784be3883bf3982c03b81c13c80c23d80c33e7fc43f7ec5407dc6417cc7427bc8447ac94579ca4678"
+    "cb4777cc4876cd4975ce4a75cf4b74d04d73d14e72d14f71d25070d3516fd4526ed5536dd6556dd7566cd7576bd8586a"
+    "d95969da5a68db5b67dc5d66dc5e66dd5f65de6064df6163df6262e06461e16560e26660e3675fe3685ee46a5de56b5c"
+    "e56c5be66d5ae76e5ae87059e87158e97257ea7356ea7455eb7654ec7754ec7853ed7952ed7b51ee7c50ef7d4fef7e4e"
+    "f0804df0814df1824cf2844bf2854af38649f38748f48947f48a47f58b46f58d45f68e44f68f43f69142f79241f79341"
+    "f89540f8963ff8983ef9993df99a3cfa9c3bfa9d3afa9f3afaa039fba238fba337fba436fca635fca735fca934fcaa33"
+    "fcac32fcad31fdaf31fdb030fdb22ffdb32efdb52dfdb62dfdb82cfdb92bfdbb2bfdbc2afdbe29fdc029fdc128fdc328"
+    "fdc427fdc626fcc726fcc926fccb25fccc25fcce25fbd024fbd124fbd324fad524fad624fad824f9d924f9db24f8dd24"
+    "f8df24f7e024f7e225f6e425f6e525f5e726f5e926f4ea26f3ec26f3ee26f2f026f2f126f1f326f0f525f0f623eff821"
+)
+_luts = {}
+
+# Types de couleur PNG selon le nombre de canaux (gris, RGB, RGBA)
+_COLOR_TYPES = {1: 0, 3: 2, 4: 6}
+
+
+def colormap_lut(name='plasma', size=256) -> np.ndarray:
+    """
+    Table (size, 3) uint8 de la palette name. Avec size=256, les couleurs sont celles de matplotlib
+    (matplotlib.cm.plasma(x, bytes=True)) ; avec plus d'entrées (4096), elles sont interpolées
+    linéairement, pour des dégradés sans paliers avec la coloration continue (smooth).
+    """
+    key = (name, size)
+    if key not in _luts:
+        if name == 'plasma':
+            base = np.frombuffer(bytes.fromhex(''.join(_PLASMA)), dtype=np.uint8).reshape(256, 3)
+        else:
+            import matplotlib
+            base = matplotlib.colormaps[name](np.arange(256), bytes=True)[:, :3]
+        if size == len(base):
+            lut = base.copy()
+        else:
+            position = np.linspace(0., len(base) - 1, size)
+            lut = np.empty((size, 3), dtype=np.uint8)
+            for channel in range(3):
+                lut[:, channel] = np.rint(np.interp(position, np.arange(len(base)), base[:, channel]))
+        lut.setflags(write=False)
+        _luts[key] = lut
+    return _luts[key]
+
+
+def apply_colormap(values, lut=None, out=None) -> np.ndarray:
+    """
+    Couleurs (forme de values + (3,), uint8) des valeurs de [0, 1] selon la table lut (plasma par défaut),
+    écrites dans out s'il est fourni. Même indexation que matplotlib : l'entrée int(x*size), 1 donnant la
+    dernière entrée. values peut être une vue transposée : seul out est parcouru dans l'ordre des lignes.
+    """
+    lut = colormap_lut() if lut is None else lut
+    size = len(lut)
+    index = np.multiply(values, size).astype(np.intp)
+    np.clip(index, 0, size - 1, out=index)
+    if out is None:
+        out = np.empty(index.shape + (lut.shape[1],), dtype=np.uint8)
+    return np.take(lut, index, axis=0, out=out)
+
+
+def write_png(path, values, lut=None, rows=256):
+    """
+    Écrit l'image des valeurs values (tableau (height, width) de [0, 1], éventuellement np.memmap) en PNG,
+    par bandes de rows lignes : seule une bande de couleurs est en mémoire.
+    """
+    lut = colormap_lut() if lut is None else lut
+    height, width = values.shape
+    buffer = np.empty((rows, width, lut.shape[1]), dtype=np.uint8)
+    with PNGWriter(path, width, height, channels=lut.shape[1]) as png:
+        for y in range(0, height, rows):
+            band = values[y:y + rows]
+            png.write_rows(apply_colormap(band, lut, out=buffer[:len(band)]))
+
+
+class PNGWriter:
+    """
+    PNG 8 bits de width x height pixels à channels canaux (1, 3 ou 4), écrit par bandes de lignes avec
+    write_rows. Les données compressées sont écrites par blocs IDAT d'au plus chunk_size octets.
+    """
+    def __init__(self, path, width, height, channels=3, level=6, chunk_size=1 << 20):
+        if channels not in _COLOR_TYPES:
+            raise ValueError(f"Nombre de canaux non supporté : {channels} (1, 3 ou 4)")
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.rows_written = 0
+        self.chunk_size = chunk_size
+        self._compressor = zlib.compressobj(level)
+        self._pending = []
+        self._pending_size = 0
+        self._file = open(path, 'wb')
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, _COLOR_TYPES[channels], 0, 0, 0))
+
+    def _chunk(self, tag, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(tag)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(tag))))
+
+    def _flush(self, force=False):
+        if self._pending and (force or self._pending_size >= self.chunk_size):
+            self._chunk(b'IDAT', b''.join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+
+    def write_rows(self, rows):
+        """Ajoute les lignes suivantes de l'image (tableau uint8 (lignes, width) ou (lignes, width, canaux))"""
+        rows = np.asarray(rows, dtype=np.uint8).reshape(-1, self.width*self.channels)
+        if self.rows_written + len(rows) > self.height:
+            raise ValueError(f"Trop de lignes : {self.rows_written + len(rows)} > {self.height}")
+        # Chaque ligne est précédée de son type de filtre (0 : aucun)
+        scanlines = np.zeros((len(rows), 1 + rows.shape[1]), dtype=np.uint8)
+        scanlines[:, 1:] = rows
+        data = self._compressor.compress(scanlines.tobytes())
+        if data:
+            self._pending.append(data)
+            self._pending_size += len(data)
+        self.rows_written += len(rows)
+        self._flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.rows_written != self.height:
+            self._file.close()
+            raise ValueError(f"Image incomplète : {self.rows_written} lignes écrites sur {self.height}")
+        self._pending.append(self._compressor.flush())
+        self._flush(force=True)
+        self._chunk(b'IEND', b'')
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+        return False
@@ -0,0 +1,64 @@
+# Répartition statique des lignes de l'image selon un modèle de coût
+#
+# Le coût d'une ligne est estimé par une passe à basse résolution (une ligne et une colonne sur step) :
+# un pixel coûte pixel_cost itérations (appels, tests de la cardioïde et du disque de période 2 : environ
+# 13 itérations pour la version scalaire de mandelbrot_block.py, mesuré) plus son nombre
+# d'itérations, sauf s'il est dans la cardioïde ou le disque, éliminés sans itérer. Le coût des autres
+# lignes est interpolé. L'image est ensuite découpée en bandes de lignes contiguës de coûts estimés égaux :
+# chaque processus calcule une bande et les bandes sont rassemblées par un seul Gatherv.
+#
+# Exemple :
+#     costs = row_costs(mandelbrot_set, x, y)          # x, y : abscisses des colonnes, ordonnées des lignes
+#     bounds = balanced_bands(costs, size)             # le processus r calcule les lignes bounds[r]:bounds[r+1]
+import numpy as np
+from mandelbrot_tiled import MandelbrotSet
+
+
+def row_costs(mandelbrot_set, x, y, step=8, pixel_cost=13.) -> np.ndarray:
+    """
+    Coût estimé (en itérations) de chaque ligne d'ordonnée y[i] de l'image dont les colonnes ont pour
+    abscisses x, à partir d'une ligne et d'une colonne sur step
+    """
+    x = np.asarray(x, dtype=np.double)
+    y = np.asarray(y, dtype=np.double)
+    rows = np.unique(np.append(np.arange(0, len(y), step), len(y) - 1)) if len(y) else np.arange(0)
+    cr = x[::step][np.newaxis, :]
+    ci = y[rows][:, np.newaxis]
+    sampler = MandelbrotSet(mandelbrot_set.max_iterations, mandelbrot_set.escape_radius)
+    iterations = sampler.count_iterations(cr + 1j*ci)
+    # Points éliminés par les tests de la cardioïde principale et du disque de période 2
+    q = (cr - 0.25)**2 + ci*ci
+    inside = (q*(q + (cr - 0.25)) <= 0.25*ci*ci) | ((cr + 1.)**2 + ci*ci <= 0.0625)
+    cost = pixel_cost + np.where(inside, 0., iterations)
+    sampled = cost.sum(axis=1)*len(x)/max(1, cr.size)
+    return np.interp(np.arange(len(y)), rows, sampled) if len(rows) else np.zeros(0)
+
+
+def balanced_bands(costs, parts) -> np.ndarray:
+    """
+    Bornes (parts+1 entiers croissants, de 0 à len(costs)) de parts bandes contiguës de coûts aussi proches
+    que possible : chaque coupure est la frontière de ligne la plus proche du multiple de total/parts
+    """
+    cumulative = np.concatenate(([0.], np.cumsum(costs, dtype=np.double)))
+    targets = cumulative[-1]*np.arange(1, parts)/parts
+    cuts = np.searchsorted(cumulative, targets)
+    cuts = np.minimum(cuts, len(costs))
+    # Frontière la plus proche de la cible (celle trouvée ou la précédente)
+    previous = np.maximum(cuts - 1, 0)
+    closer = np.abs(cumulative[previous] - targets) < np.abs(cumulative[cuts] - targets)
+    cuts = np.where(closer, previous, cuts)
+    cuts = np.maximum.accumulate(cuts) if len(cuts) else cuts
+    return np.concatenate(([0], cuts, [len(costs)])).astype(np.int64)
+
+
+def band_costs(costs, bounds) -> np.ndarray:
+    """Coût estimé de chaque bande bounds[r]:bounds[r+1]"""
+    cumulative = np.concatenate(([0.], np.cumsum(costs, dtype=np.double)))
+    return np.diff(cumulative[bounds])
+
+
+def imbalance(loads) -> float:
+    """Déséquilibre de charge : charge maximale / charge moyenne (1 si parfaitement équilibré)"""
+    loads = np.asarray(loads, dtype=np.double)
+    mean = loads.mean() if loads.size else 0.
+    return float(loads.max()/mean) if mean > 0. else 1.
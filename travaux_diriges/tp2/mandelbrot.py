@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from PIL import Image
 from math import log
 from time import time
-import matplotlib.cm
+from image_output import apply_colormap
 
 
 @dataclass
@@ -65,7 +65,7 @@ print(f"Temps du calcul de l'ensemble de Mandelbrot : {fin-deb}")
 
 # Constitution de l'image résultante :
 deb = time()
-image = Image.fromarray(np.uint8(matplotlib.cm.plasma(convergence.T)*255))
+image = Image.fromarray(apply_colormap(convergence.T))
 fin = time()
 print(f"Temps de constitution de l'image : {fin-deb}")
 image.show()
@@ -1,10 +1,11 @@
 from mpi4py import MPI
 import numpy as np
 from dataclasses import dataclass
-from PIL import Image
 from math import log
-from time import time
-import matplotlib.cm
+from time import time, process_time
+from image_output import write_png
+from load_balance import row_costs, balanced_bands, band_costs, imbalance
+import sys
 
 # --- CLASSE MANDELBROT ORIGINAL ---
 @dataclass
@@ -50,39 +51,58 @@ scaleX = 3./width
 scaleY = 2.25/height
 
 # 1. Divisão do Trabalho (Blocos de linhas)
-lines_per_process = height // size
-remainder = height % size
-
-if rank < remainder:
-    my_lines = lines_per_process + 1
-    start_y = rank * my_lines
+# Custo estimado de cada linha por uma passagem em baixa resolução (ver load_balance.py): todos os
+# processos fazem o mesmo cálculo, determinístico, e conhecem assim as faixas de todos
+deb_model = time()
+costs = row_costs(mandelbrot_set, -2. + scaleX*np.arange(width), -1.125 + scaleY*np.arange(height))
+t_model = time() - deb_model
+
+if '--balance' in sys.argv:
+    # Opção --balance: faixas contíguas de alturas variáveis e de custos estimados iguais
+    bounds = balanced_bands(costs, size)
 else:
-    my_lines = lines_per_process
-    start_y = rank * my_lines + remainder
+    # Faixas de mesma altura (as primeiras remainder faixas têm uma linha a mais)
+    lines_per_process = height // size
+    remainder = height % size
+    bounds = np.concatenate(([0], np.cumsum([lines_per_process + (r < remainder) for r in range(size)])))
 
-end_y = start_y + my_lines
+start_y = int(bounds[rank])
+end_y = int(bounds[rank + 1])
+my_lines = end_y - start_y
 
 # 2. Cálculo Local
 # Matriz local: (width, my_lines)
 local_convergence = np.empty((width, my_lines), dtype=np.double)
 
 deb = time()
-for y in range(my_lines):
-    global_y = start_y + y
-    for x in range(width):
-        c = complex(-2. + scaleX*x, -1.125 + scaleY * global_y)
-        local_convergence[x, y] = mandelbrot_set.convergence(c, smooth=True)
+deb_cpu = process_time()
+if '--subdivide' in sys.argv:
+    # Opção --subdivide: o bloco de linhas é calculado de uma vez, de forma vetorizada e por
+    # subdivisão de Mariani-Silver (ver mandelbrot_tiled.py), com os mesmos parâmetros
+    from mandelbrot_tiled import MandelbrotSet as TiledMandelbrotSet
+    tiled_set = TiledMandelbrotSet(mandelbrot_set.max_iterations, mandelbrot_set.escape_radius)
+    c = (-2. + scaleX*np.arange(width))[np.newaxis, :] + 1j*(-1.125 + scaleY*np.arange(start_y, end_y))[:, np.newaxis]
+    local_convergence[:, :] = tiled_set.convergence(c, smooth=True, subdivide=True).T
+else:
+    for y in range(my_lines):
+        global_y = start_y + y
+        for x in range(width):
+            c = complex(-2. + scaleX*x, -1.125 + scaleY * global_y)
+            local_convergence[x, y] = mandelbrot_set.convergence(c, smooth=True)
 fin = time()
+# Carga medida em tempo de CPU: não depende dos outros processos que compartilham o mesmo núcleo
+cpu_time = process_time() - deb_cpu
 
 print(f"Processo {rank}: Calculou linhas {start_y} a {end_y} em {fin-deb:.4f}s")
+times = comm.gather(cpu_time, root=0)
 
 # 3. Rassemblement (Gather) CORRIGIDO
 # Primeiro, transpomos localmente para ficar (linhas, colunas) e achatamos.
 # Isso garante que enviamos blocos contíguos de linhas.
 local_data = local_convergence.T.flatten()
 
-# O mestre precisa saber quantos elementos vêm de cada um
-sendcounts = np.array(comm.gather(len(local_data), root=0))
+# O mestre já conhece quantos elementos vêm de cada um (faixas calculadas por todos)
+sendcounts = np.diff(bounds)*width
 
 if rank == 0:
     # Buffer plano para receber tudo
@@ -99,13 +119,20 @@ comm.Gatherv(sendbuf=local_data,
 if rank == 0:
     total_time = time() - deb
     print(f"Tempo Total: {total_time:.4f}s")
+
+    # Desequilíbrio previsto (modelo de custo) e medido (tempo de CPU), por processo (carga / carga média)
+    predicted = band_costs(costs, bounds)
+    print(f"Modelo de custo calculado em {t_model:.4f}s")
+    print(f"{'processo':>8} {'linhas':>11} {'previsto':>9} {'medido':>8}")
+    for r in range(size):
+        print(f"{r:>8} {f'{bounds[r]}-{bounds[r + 1]}':>11} {predicted[r]/predicted.mean():>9.3f} {times[r]/np.mean(times):>8.3f}")
+    print(f"Desequilíbrio (máximo/média): previsto {imbalance(predicted):.3f}, medido {imbalance(times):.3f}")
     
     # O global_data contém as linhas empilhadas (Transposta da original)
     # Então fazemos reshape para (height, width)
     convergence_T = global_data.reshape((height, width))
     
     # Criação da imagem
-    # Como já temos a transposta (linhas x colunas), passamos direto
-    image = Image.fromarray(np.uint8(matplotlib.cm.plasma(convergence_T)*255))
-    image.save("mandelbrot_block.png")
+    # Como já temos a transposta (linhas x colunas), passamos direto (cores por tabela, PNG por faixas)
+    write_png("mandelbrot_block.png", convergence_T)
     print("Imagem salva com sucesso!")
\ No newline at end of file
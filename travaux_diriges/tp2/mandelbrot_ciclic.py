@@ -1,94 +1,125 @@
 # Calcul de l'ensemble de Mandelbrot en python (Parallélisé avec MPI)
+#
+# Distribution cyclique des lignes : le processus rank calcule les lignes rank, rank+size, ...
+# L'image est calculée et écrite par bandes : à chaque étape, chaque processus calcule --rows=16 de ses
+# lignes, les bandes sont rassemblées sur le rang 0 par un Igather (le type dérivé de réception range
+# directement chaque ligne à sa place dans la bande entrelacée) et le rang 0 écrit la bande dans le PNG
+# (écriture progressive, voir image_output.py) et éventuellement dans un fichier .npy en mémoire projetée
+# (--raw=fichier.npy). Aucun processus n'alloue l'image complète : on peut calculer des images plus
+# grandes que la mémoire, par exemple mpiexec -n 8 python mandelbrot_ciclic.py 40000 30000
 import numpy as np
-from dataclasses import dataclass
-from PIL import Image
-from math import log
 from time import time
-import matplotlib.cm
 from mpi4py import MPI  # Importação do MPI
+import sys
+from image_output import PNGWriter, apply_colormap
 
-@dataclass
-class MandelbrotSet:
-    max_iterations: int
-    escape_radius:  float = 2.0
-
-    def __contains__(self, c: complex) -> bool:
-        return self.stability(c) == 1
-
-    def convergence(self, c: np.ndarray, smooth=False, clamp=True) -> np.ndarray:
-        value = self.count_iterations(c, smooth)/self.max_iterations
-        return np.maximum(0.0, np.minimum(value, 1.0)) if clamp else value
-
-    def count_iterations(self, c: np.ndarray,  smooth=False) -> np.ndarray:
-        z:    np.ndarray
-        iter: np.ndarray
-
-        # On vérifie dans un premier temps si le complexe
-        # n'appartient pas à une zone de convergence connue :
-        iter = self.max_iterations * np.ones(c.shape, dtype=np.double)
-        mask = (np.abs(c) >= 0.25) | (np.abs(c+1.) >= 0.25)
-
-        # Sinon on itère
-        z = np.zeros(c.shape, dtype=np.complex128)
-        for it in range(self.max_iterations):
-            z[mask] = z[mask]*z[mask] + c[mask]
-            has_diverged = np.abs(z) > self.escape_radius
-            if has_diverged.size > 0:
-                iter[has_diverged] = np.minimum(iter[has_diverged], it)
-                mask = mask & ~has_diverged
-            if np.any(mask) == False : break
-        
-        has_diverged = np.abs(z) > 2
-        if smooth:
-            iter[has_diverged] += 1 - np.log(np.log(np.abs(z[has_diverged])))/log(2)
-        return iter
+# Itérations sur les seuls points actifs, test sur |z|² (voir mandelbrot_tiled.py)
+from mandelbrot_tiled import MandelbrotSet
 
 # --- Configuração MPI ---
 comm = MPI.COMM_WORLD
 rank = comm.Get_rank()
 size = comm.Get_size()
 
-# Parâmetros
+# Parâmetros: largura e altura na linha de comando, --rows=K linhas por processo em cada faixa,
+# --output=arquivo.png, --raw=arquivo.npy (valores de convergência em float64), --subdivide
 mandelbrot_set = MandelbrotSet(max_iterations=200, escape_radius=2.)
 width, height = 1024, 1024
+rows_per_stripe = 16
+output = "mandelbrot_ciclic.png"
+raw_output = None
+subdivide = '--subdivide' in sys.argv
+for a in sys.argv:
+    if a.startswith('--rows='): rows_per_stripe = int(a.split('=')[1])
+    if a.startswith('--output='): output = a.split('=', 1)[1]
+    if a.startswith('--raw='): raw_output = a.split('=', 1)[1]
+args = [a for a in sys.argv if not a.startswith('--')]
+if len(args) > 2:
+    width, height = int(args[1]), int(args[2])
 
 scaleX = 3./width
 scaleY = 2.25/height
 
-# Inicialização da matriz local com ZEROS (importante para o Reduce funcionar)
-convergence_local = np.zeros((width, height), dtype=np.double)
+# Uma faixa contém rows_per_stripe linhas de cada processo, ou seja rows_per_stripe*size linhas
+# consecutivas da imagem: a linha local j do processo r é a linha j*size + r da faixa
+stripe_height = rows_per_stripe*size
+nb_stripes = -(-height // stripe_height)
+
+# Buffers duplos: o Igather de uma faixa corre enquanto a faixa seguinte é calculada
+local_rows = np.zeros((2, rows_per_stripe, width), dtype=np.double)
+stripe = None
+if rank == 0:
+    stripe = np.empty((2, stripe_height, width), dtype=np.double)
+    # Tipo de recepção: rows_per_stripe linhas espaçadas de size linhas, com extensão de uma linha
+    # para que o bloco do processo r comece na linha r da faixa
+    cyclic_rows = MPI.DOUBLE.Create_vector(rows_per_stripe, width, size*width)
+    cyclic_type = cyclic_rows.Create_resized(0, width*MPI.DOUBLE.Get_extent()[1]).Commit()
+    cyclic_rows.Free()
+    png = PNGWriter(output, width, height)
+    colors = np.empty((stripe_height, width, 3), dtype=np.uint8)
+    raw = np.lib.format.open_memmap(raw_output, mode='w+', dtype=np.double, shape=(height, width)) \
+        if raw_output else None
+
+t_compute = t_output = 0.
+
+
+def write_stripe(index):
+    """Processo 0: escreve as linhas válidas da faixa index no PNG (e no arquivo .npy)"""
+    y0 = index*stripe_height
+    y1 = min(height, y0 + stripe_height)
+    rows = stripe[index % 2, :y1 - y0]
+    if raw is not None:
+        raw[y0:y1] = rows
+    png.write_rows(apply_colormap(rows, out=colors[:y1 - y0]))
+
 
 # Sincronização antes de começar o tempo
 comm.Barrier()
 deb = time()
 
-# --- Loop com Distribuição Cíclica (Statique Entrelacée) ---
-# Cada processo começa em 'rank' e pula de 'size' em 'size'
-for y in range(rank, height, size):
-    c = np.array([complex(-2. + scaleX*x, -1.125 + scaleY * y) for x in range(width)])
-    convergence_local[:, y] = mandelbrot_set.convergence(c, smooth=True)
+# --- Loop com Distribuição Cíclica (Statique Entrelacée) por faixas ---
+previous = None
+for index in range(nb_stripes):
+    t0 = time()
+    # Linhas globais do processo nesta faixa (as que passam de height ficam como preenchimento)
+    y = index*stripe_height + rank + size*np.arange(rows_per_stripe)
+    y = y[y < height]
+    buffer = local_rows[index % 2]
+    if len(y):
+        c = (-2. + scaleX*np.arange(width))[np.newaxis, :] + 1j*(-1.125 + scaleY*y)[:, np.newaxis]
+        # Opção --subdivide: as linhas do processo formam uma grade regular (passo size*scaleY),
+        # calculada por subdivisão de Mariani-Silver (ver mandelbrot_tiled.py)
+        buffer[:len(y)] = mandelbrot_set.convergence(c, smooth=True, subdivide=subdivide)
+    t1 = time()
+    t_compute += t1 - t0
+
+    request = comm.Igather(buffer, [stripe[index % 2], 1, cyclic_type] if rank == 0 else None, root=0)
+    # Enquanto a faixa atual é transferida, o processo 0 escreve a anterior
+    if previous is not None:
+        previous.Wait()
+        if rank == 0:
+            write_stripe(index - 1)
+    previous = request
+    t_output += time() - t1
+
+t1 = time()
+if previous is not None:
+    previous.Wait()
+    if rank == 0:
+        write_stripe(nb_stripes - 1)
+if rank == 0:
+    png.close()
+    if raw is not None:
+        raw.flush()
+    cyclic_type.Free()
+t_output += time() - t1
 
 # Sincronização e cálculo do tempo de processamento
 comm.Barrier()
 fin = time()
 
+t_compute_max = comm.reduce(t_compute, op=MPI.MAX, root=0)
 if rank == 0:
-    print(f"Temps du calcul (com {size} processos): {fin-deb:.4f} s")
-
-# --- Reconstituição da Imagem (Apenas no Rank 0) ---
-# Prepara a matriz global
-convergence_global = None
-if rank == 0:
-    convergence_global = np.empty((width, height), dtype=np.double)
-
-# Combina (Soma) todas as matrizes locais na global.
-# Como as linhas não calculadas são 0.0, a soma reconstrói a imagem perfeitamente.
-comm.Reduce(convergence_local, convergence_global, op=MPI.SUM, root=0)
-
-if rank == 0:
-    deb_img = time()
-    image = Image.fromarray(np.uint8(matplotlib.cm.plasma(convergence_global.T)*255))
-    fin_img = time()
-    print(f"Temps de constitution de l'image : {fin_img-deb_img:.4f} s")
-    image.show()
-    # image.save("mandelbrot.png") # Use save se estiver num servidor sem tela
\ No newline at end of file
+    print(f"Temps du calcul (com {size} processos): {t_compute_max:.4f} s")
+    print(f"Temps de constitution de l'image (rang 0) : {t_output:.4f} s")
+    print(f"Temps total : {fin-deb:.4f} s, image {width}x{height} écrite dans {output}")
@@ -0,0 +1,208 @@
+# Zoom profond sur l'ensemble de Mandelbrot par la méthode des perturbations
+#
+# Au-delà d'un grossissement d'environ 1e13, deux pixels voisins ne sont plus distinguables en complex128.
+# On calcule alors une seule orbite de référence Z_n en haute précision (entiers Python en virgule fixe),
+# au centre C de l'image, et chaque pixel c = C + dc est itéré en double précision sous la forme d'un
+# écart à cette orbite : z_n = Z_n + d_n avec
+#       d_{n+1} = 2 Z_n d_n + d_n² + dc
+# Les écarts dc et d_n sont petits mais représentables en double (jusqu'à environ 1e-300).
+#
+#   - Approximation par série : d_n ≈ A_n dc + B_n dc² + C_n dc³ (coefficients calculés une fois le long de
+#     l'orbite de référence). Tant que le terme d'ordre 3 est négligeable, les premières itérations de tous
+#     les pixels sont sautées.
+#   - Détection des erreurs (« glitches ») : si |Z_n + d_n| < tau |Z_n|, l'écart a perdu sa précision
+#     relative. Les pixels concernés, ainsi que ceux encore actifs quand l'orbite de référence diverge, sont
+#     recalculés avec une nouvelle référence choisie parmi eux.
+#
+# Exemple : python mandelbrot_deep.py 400 300 --span=1e-30 --iterations=50000
+import numpy as np
+from fractions import Fraction
+from math import log, ceil, log2
+from time import time
+import sys
+
+# Seuil de détection des erreurs de précision (critère de Pauldelbrot)
+GLITCH_TOLERANCE = 1e-3
+# Erreur relative admise pour l'approximation par série
+SERIES_TOLERANCE = 1e-12
+
+
+def to_fraction(value) -> Fraction:
+    """Valeur exacte d'un nombre donné en chaîne décimale (« -0.7436438870371587047521915 »), Fraction ou float"""
+    return value if isinstance(value, Fraction) else Fraction(value)
+
+
+def precision_bits(dc) -> int:
+    """
+    Nombre de bits de virgule fixe de l'orbite de référence : ceux de la taille de la vue (plus grand écart
+    au centre) et 64 bits de plus pour distinguer les pixels
+    """
+    scale = float(np.max(np.abs(dc), initial=0.))
+    return 64 + max(0, ceil(-log2(scale))) if scale > 0. else 64
+
+
+def reference_orbit(center, max_iterations, escape_radius, precision):
+    """
+    Orbite Z_0 = 0, Z_1, ... du centre (parties réelle et imaginaire exactes) calculée en virgule fixe sur
+    precision bits, arrondie en complex128. L'orbite s'arrête au premier Z_n qui dépasse escape_radius
+    (inclus : les pixels proches divergent avec la référence), ou après max_iterations itérations.
+    """
+    one = 1 << precision
+    cr = int(to_fraction(center[0])*one)
+    ci = int(to_fraction(center[1])*one)
+    radius2 = int(escape_radius*escape_radius*one)
+    orbit = [0j]
+    zr = zi = 0
+    for _ in range(max_iterations):
+        zr2 = (zr*zr) >> precision
+        zi2 = (zi*zi) >> precision
+        zi = ((zr*zi) >> (precision - 1)) + ci
+        zr = zr2 - zi2 + cr
+        orbit.append(complex(zr/one, zi/one))
+        if ((zr*zr + zi*zi) >> precision) > radius2:
+            break
+    return np.array(orbit)
+
+
+def series_skip(orbit, dc_max):
+    """
+    Coefficients (A, B, C) de l'approximation par série d_n ≈ A dc + B dc² + C dc³ et nombre n d'itérations
+    sautées : le dernier n pour lequel |C_n| dc_max² reste négligeable devant |A_n|.
+    """
+    A = B = C = 0j
+    skip = 0
+    # On garde au moins une itération avec l'orbite de référence (test de divergence et d'erreur)
+    for n in range(len(orbit) - 2):
+        Z = orbit[n]
+        A, B, C = 2*Z*A + 1, 2*Z*B + A*A, 2*Z*C + 2*A*B
+        if not (abs(C)*dc_max*dc_max <= SERIES_TOLERANCE*abs(A)):
+            break
+        skip = n + 1
+        coefficients = (A, B, C)
+    if skip == 0:
+        return 0, (0j, 0j, 0j)
+    return skip, coefficients
+
+
+def perturbation_pass(orbit, dc, max_iterations, escape_radius, smooth):
+    """
+    Itère les pixels d'écarts dc autour de l'orbite de référence.
+    Retourne (nombre d'itérations, masque des pixels à recalculer, |z|/|Z| au moment de l'erreur).
+    """
+    iters = np.full(dc.size, float(max_iterations))
+    glitched = np.zeros(dc.size, dtype=bool)
+    glitch_depth = np.full(dc.size, np.inf)
+
+    skip, (A, B, C) = series_skip(orbit, float(np.max(np.abs(dc), initial=0.)))
+    delta = ((C*dc + B)*dc + A)*dc
+    index = np.arange(dc.size)
+    radius2 = escape_radius*escape_radius
+    tau2 = GLITCH_TOLERANCE*GLITCH_TOLERANCE
+    orbit_mod2 = orbit.real**2 + orbit.imag**2
+    last = len(orbit) - 1
+    for n in range(skip, max_iterations):
+        if index.size == 0:
+            break
+        if n >= last:
+            # L'orbite de référence a divergé : les pixels encore actifs doivent changer de référence
+            z = orbit[n] + delta
+            glitched[index] = True
+            glitch_depth[index] = np.sqrt((z.real*z.real + z.imag*z.imag)/orbit_mod2[n])
+            break
+        delta = (2*orbit[n] + delta)*delta + dc
+        z = orbit[n + 1] + delta
+        mod2 = z.real*z.real + z.imag*z.imag
+        escaped = mod2 > radius2
+        glitch = ~escaped & (mod2 < tau2*orbit_mod2[n + 1])
+        if not (escaped.any() or glitch.any()):
+            continue
+        done = index[escaped]
+        iters[done] = n
+        if smooth:
+            iters[done] += 1 - np.log(0.5*np.log(mod2[escaped]))/log(2)
+        bad = index[glitch]
+        glitched[bad] = True
+        glitch_depth[bad] = np.sqrt(mod2[glitch]/orbit_mod2[n + 1])
+        keep = ~(escaped | glitch)
+        index, delta, dc = index[keep], delta[keep], dc[keep]
+    return iters, glitched, glitch_depth
+
+
+def perturbation_iterations(mandelbrot_set, center, dc, smooth=False, max_references=32):
+    """
+    Nombre d'itérations des pixels c = center + dc (center : couple de valeurs exactes, voir to_fraction ;
+    dc : tableau complex128 d'écarts) par la méthode des perturbations, avec nouvelles références pour les
+    pixels en erreur (au plus max_references orbites de référence).
+    """
+    dc = np.asarray(dc, dtype=np.complex128)
+    shape = dc.shape
+    dc = dc.ravel()
+    precision = precision_bits(dc)
+    center = (to_fraction(center[0]), to_fraction(center[1]))
+    iters = np.full(dc.size, float(mandelbrot_set.max_iterations))
+
+    todo = np.arange(dc.size)   # pixels à calculer avec la référence courante
+    offset = 0j                  # position de la référence courante par rapport au centre
+    for _ in range(max_references):
+        orbit = reference_orbit((center[0] + Fraction(offset.real), center[1] + Fraction(offset.imag)),
+                                mandelbrot_set.max_iterations, mandelbrot_set.escape_radius, precision)
+        values, glitched, depth = perturbation_pass(orbit, dc[todo] - offset, mandelbrot_set.max_iterations,
+                                                    mandelbrot_set.escape_radius, smooth)
+        iters[todo] = values
+        if not glitched.any():
+            break
+        # Nouvelle référence : le pixel en erreur le plus profond (le plus proche d'un centre de mini-ensemble).
+        # Son écart à la référence est nul : il est calculé exactement au passage suivant.
+        offset = dc[todo[np.argmin(depth)]]
+        todo = todo[glitched]
+    return iters.reshape(shape)
+
+
+class DeepFrame:
+    """
+    Image de width x height pixels carrés centrée en (center_re, center_im) (chaînes décimales exactes),
+    de largeur span dans le plan complexe
+    """
+    def __init__(self, width, height, center_re, center_im, span):
+        self.width = width
+        self.height = height
+        self.center = (to_fraction(center_re), to_fraction(center_im))
+        self.span = span
+
+    def offsets(self, y0=0, y1=None, x0=0, x1=None) -> np.ndarray:
+        """Écarts dc au centre des pixels des lignes y0..y1-1 et colonnes x0..x1-1"""
+        y1 = self.height if y1 is None else y1
+        x1 = self.width if x1 is None else x1
+        step = self.span/self.width
+        x = step*(np.arange(x0, x1) - self.width/2)
+        y = step*(np.arange(y0, y1) - self.height/2)
+        return x[np.newaxis, :] + 1j*y[:, np.newaxis]
+
+
+if __name__ == '__main__':
+    from image_output import write_png
+    from mandelbrot_tiled import MandelbrotSet
+
+    # Options : largeur et hauteur, --center=RE,IM (décimales exactes), --span=largeur de la vue,
+    # --iterations=N, --output=fichier.png
+    center = ("-0.743643887037158704752191506114774", "0.131825904205311970493132056385139")
+    span = 1e-30
+    max_iterations = 50000
+    output = "mandelbrot_deep.png"
+    for a in sys.argv:
+        if a.startswith('--center='): center = tuple(a.split('=', 1)[1].split(','))
+        if a.startswith('--span='): span = float(a.split('=')[1])
+        if a.startswith('--iterations='): max_iterations = int(a.split('=')[1])
+        if a.startswith('--output='): output = a.split('=', 1)[1]
+    args = [a for a in sys.argv if not a.startswith('--')]
+    width, height = 800, 600
+    if len(args) > 2:
+        width, height = int(args[1]), int(args[2])
+
+    mandelbrot_set = MandelbrotSet(max_iterations=max_iterations, escape_radius=2.)
+    frame = DeepFrame(width, height, *center, span)
+    deb = time()
+    convergence = mandelbrot_set.convergence(frame.offsets(), smooth=True, center=frame.center)
+    fin = time()
+    print(f"Temps du calcul ({width}x{height}, largeur {span:g}, {max_iterations} itérations) : {fin-deb:.4f} s")
+    write_png(output, convergence)
@@ -0,0 +1,282 @@
+# Calcul de l'ensemble de Mandelbrot en python, par tuiles
+#
+# L'image est découpée en tuiles carrées (--tile=256 par défaut) distribuées dynamiquement :
+#   - sur un pool de processus (multiprocessing, --workers=N) : python mandelbrot_tiled.py 8192 8192 --workers=8
+#   - ou avec MPI (le rang 0 distribue les tuiles, les autres calculent) : mpiexec -n 8 python mandelbrot_tiled.py --mpi
+# Un processus qui a fini sa tuile en reçoit aussitôt une autre : les tuiles coûteuses (intérieur de
+# l'ensemble) ne bloquent pas les autres processus.
+#
+# Dans une tuile, seuls les points qui n'ont pas encore divergé sont itérés : ils sont rangés dans des
+# tableaux denses (parties réelle et imaginaire séparées) qui sont compactés au fur et à mesure que les
+# points divergent. La divergence est testée sur le carré du module (zr² + zi² > R²), sans racine carrée,
+# et zr², zi² servent aussi au calcul de l'itération suivante.
+import numpy as np
+from dataclasses import dataclass
+from math import log
+from time import time
+from image_output import write_png
+import sys
+
+
+@dataclass
+class MandelbrotSet:
+    max_iterations: int
+    escape_radius:  float = 2.0
+
+    def __contains__(self, c: complex) -> bool:
+        return self.count_iterations(np.array([c]))[0] == self.max_iterations
+
+    def convergence(self, c: np.ndarray, smooth=False, clamp=True, subdivide=False, center=None) -> np.ndarray:
+        """
+        Vitesse de divergence normalisée de chaque point de c.
+        subdivide : c est une grille régulière 2D (lignes, colonnes) calculée par subdivision de
+        Mariani-Silver (voir count_iterations_subdivided) ; ignoré si c n'est pas 2D.
+        center : zoom profond, c contient les écarts au point center (couple de valeurs exactes, chaînes
+        décimales ou Fraction) et le calcul se fait par perturbation (voir mandelbrot_deep.py).
+        """
+        if center is not None:
+            from mandelbrot_deep import perturbation_iterations
+            value = perturbation_iterations(self, center, c, smooth)/self.max_iterations
+        elif subdivide and np.ndim(c) == 2:
+            value = self.count_iterations_subdivided(c, smooth)/self.max_iterations
+        else:
+            value = self.count_iterations(c, smooth)/self.max_iterations
+        return np.maximum(0.0, np.minimum(value, 1.0)) if clamp else value
+
+    def count_iterations(self, c: np.ndarray, smooth=False) -> np.ndarray:
+        """
+        Nombre d'itérations avant divergence de chaque point de c (max_iterations si le point ne diverge pas).
+        Même résultat que la version vectorisée de mandelbrot_vec.py, mais chaque itération ne calcule
+        que les points encore actifs.
+        """
+        c = np.asarray(c, dtype=np.complex128)
+        cr = c.real.ravel().copy()
+        ci = c.imag.ravel().copy()
+        iters = np.full(cr.size, float(self.max_iterations))
+
+        # Zones de convergence connues : cardioïde principale et disque de période 2
+        q = (cr - 0.25)**2 + ci*ci
+        inside = (q*(q + (cr - 0.25)) <= 0.25*ci*ci) | ((cr + 1.)**2 + ci*ci <= 0.0625)
+        index = np.flatnonzero(~inside)   # indices (dans c) des points encore actifs
+        cr = cr[index]
+        ci = ci[index]
+
+        zr = np.zeros(index.size)
+        zi = np.zeros(index.size)
+        zr2 = np.zeros(index.size)
+        zi2 = np.zeros(index.size)
+        mod2 = np.empty(index.size)
+        radius2 = self.escape_radius*self.escape_radius
+        nb_parked = 0
+        for it in range(self.max_iterations):
+            if index.size == nb_parked:
+                break
+            # z <- z² + c, avec zr² et zi² de l'itération précédente
+            zi *= zr
+            zi *= 2.
+            zi += ci
+            np.subtract(zr2, zi2, out=zr)
+            zr += cr
+            np.multiply(zr, zr, out=zr2)
+            np.multiply(zi, zi, out=zi2)
+            np.add(zr2, zi2, out=mod2)
+            escaped = mod2 > radius2
+            nb_escaped = np.count_nonzero(escaped)
+            if nb_escaped == 0:
+                continue
+            done = index[escaped]
+            iters[done] = it
+            if smooth:
+                # log|z| = log(|z|²)/2
+                iters[done] += 1 - np.log(0.5*np.log(mod2[escaped]))/log(2)
+            # Les points qui viennent de diverger sont « garés » en z = c = 0 (point fixe, ne diverge plus),
+            # et les tableaux ne sont compactés que lorsqu'un quart des points actifs est garé
+            nb_parked += nb_escaped
+            if 4*nb_parked >= index.size:
+                keep = ~escaped & ((cr != 0.) | (ci != 0.) | (zr != 0.) | (zi != 0.))
+                index, cr, ci, zr, zi, zr2, zi2 = (a[keep] for a in (index, cr, ci, zr, zi, zr2, zi2))
+                mod2 = np.empty(index.size)
+                nb_parked = 0
+            else:
+                for a in (cr, ci, zr, zi, zr2, zi2):
+                    a[escaped] = 0.
+        return iters.reshape(c.shape)
+
+    def count_iterations_subdivided(self, c: np.ndarray, smooth=False, min_size=8) -> np.ndarray:
+        """
+        Nombre d'itérations sur une grille régulière 2D c, par subdivision de Mariani-Silver : si tous
+        les points du bord d'un rectangle ont le même nombre d'itérations, l'intérieur du rectangle est
+        rempli sans être calculé (l'ensemble de Mandelbrot étant connexe) ; sinon le rectangle est coupé en
+        quatre. Les rectangles plus petits que min_size sont calculés entièrement.
+        Avec smooth, seuls les rectangles dont le bord est dans l'ensemble (max_iterations) sont remplis :
+        la couleur lissée varie à l'intérieur des autres.
+        C'est une approximation, avec ou sans smooth : un bord uniforme sur la grille ne garantit pas un
+        intérieur uniforme, un filament plus fin que le pas de la grille peut traverser le rectangle sans
+        toucher un point du bord. Quelques pixels peuvent donc différer du calcul direct (par exemple 1 à 4
+        pixels sur 400x400 pour des vues zoomées à 200 itérations).
+        Les rectangles d'un même niveau sont traités ensemble : les points de tous leurs bords sont
+        calculés en un seul appel à count_iterations.
+        """
+        c = np.asarray(c, dtype=np.complex128)
+        height, width = c.shape
+        iters = np.empty(c.shape)
+        known = np.zeros(c.shape, dtype=bool)
+
+        def compute(mask):
+            index = np.flatnonzero(mask & ~known)
+            iters.flat[index] = self.count_iterations(c.flat[index], smooth)
+            known.flat[index] = True
+
+        rectangles = [(0, height, 0, width)]
+        while rectangles:
+            small = [r for r in rectangles if r[1] - r[0] <= min_size or r[3] - r[2] <= min_size]
+            large = [r for r in rectangles if r[1] - r[0] > min_size and r[3] - r[2] > min_size]
+            mask = np.zeros(c.shape, dtype=bool)
+            for (y0, y1, x0, x1) in small:
+                mask[y0:y1, x0:x1] = True
+            for (y0, y1, x0, x1) in large:
+                mask[y0, x0:x1] = mask[y1-1, x0:x1] = True
+                mask[y0:y1, x0] = mask[y0:y1, x1-1] = True
+            compute(mask)
+
+            rectangles = []
+            for (y0, y1, x0, x1) in large:
+                border = np.concatenate((iters[y0, x0:x1], iters[y1-1, x0:x1], iters[y0:y1, x0], iters[y0:y1, x1-1]))
+                value = border[0]
+                if np.all(border == value) and (not smooth or value == self.max_iterations):
+                    iters[y0+1:y1-1, x0+1:x1-1] = value
+                    known[y0+1:y1-1, x0+1:x1-1] = True
+                else:
+                    ym = (y0 + y1)//2
+                    xm = (x0 + x1)//2
+                    rectangles += [(y0, ym, x0, xm), (y0, ym, xm, x1), (ym, y1, x0, xm), (ym, y1, xm, x1)]
+        return iters
+
+
+@dataclass
+class Frame:
+    """Image de width x height pixels du rectangle [x_min, x_min+x_span] x [y_min, y_min+y_span] du plan complexe"""
+    width: int
+    height: int
+    x_min: float = -2.
+    y_min: float = -1.125
+    x_span: float = 3.
+    y_span: float = 2.25
+
+    def tiles(self, tile: int):
+        """Tuiles (y0, y1, x0, x1) de taille au plus tile x tile, ligne par ligne"""
+        return [(y0, min(y0 + tile, self.height), x0, min(x0 + tile, self.width))
+                for y0 in range(0, self.height, tile) for x0 in range(0, self.width, tile)]
+
+    def points(self, y0, y1, x0, x1) -> np.ndarray:
+        """Valeurs complexes c des pixels de la tuile (lignes y0..y1-1, colonnes x0..x1-1)"""
+        x = self.x_min + (self.x_span/self.width)*np.arange(x0, x1)
+        y = self.y_min + (self.y_span/self.height)*np.arange(y0, y1)
+        return x[np.newaxis, :] + 1j*y[:, np.newaxis]
+
+
+def compute_tile(task):
+    """Convergence (lignes, colonnes) d'une tuile ; task = (mandelbrot_set, frame, tuile)"""
+    mandelbrot_set, frame, tile = task
+    return tile, mandelbrot_set.convergence(frame.points(*tile), smooth=True)
+
+
+def render_pool(mandelbrot_set, frame, tile, nb_workers):
+    """Calcule l'image (height, width) avec un pool de nb_workers processus, une tuile à la fois par processus"""
+    from multiprocessing import Pool
+    convergence = np.empty((frame.height, frame.width), dtype=np.double)
+    tasks = [(mandelbrot_set, frame, t) for t in frame.tiles(tile)]
+    if nb_workers <= 1:
+        results = map(compute_tile, tasks)
+        for (y0, y1, x0, x1), values in results:
+            convergence[y0:y1, x0:x1] = values
+        return convergence
+    with Pool(nb_workers) as pool:
+        for (y0, y1, x0, x1), values in pool.imap_unordered(compute_tile, tasks, chunksize=1):
+            convergence[y0:y1, x0:x1] = values
+    return convergence
+
+
+def render_mpi(mandelbrot_set, frame, tile):
+    """
+    Calcule l'image avec MPI : le rang 0 envoie un numéro de tuile à chaque processus libre et range les
+    résultats. Retourne l'image sur le rang 0, None sur les autres. Avec un seul processus, le rang 0
+    calcule toutes les tuiles.
+    """
+    from mpi4py import MPI
+    comm = MPI.COMM_WORLD
+    rank = comm.Get_rank()
+    size = comm.Get_size()
+    tiles = frame.tiles(tile)
+    TAG_WORK, TAG_RESULT, TAG_DIE = 1, 2, 3
+
+    if size == 1:
+        return render_pool(mandelbrot_set, frame, tile, 1)
+
+    if rank == 0:
+        convergence = np.empty((frame.height, frame.width), dtype=np.double)
+        status = MPI.Status()
+        next_tile = 0
+        active = 0
+        for worker in range(1, size):
+            if next_tile < len(tiles):
+                comm.send(next_tile, dest=worker, tag=TAG_WORK)
+                next_tile += 1
+                active += 1
+            else:
+                comm.send(None, dest=worker, tag=TAG_DIE)
+        while active > 0:
+            t, values = comm.recv(source=MPI.ANY_SOURCE, tag=TAG_RESULT, status=status)
+            y0, y1, x0, x1 = tiles[t]
+            convergence[y0:y1, x0:x1] = values
+            if next_tile < len(tiles):
+                comm.send(next_tile, dest=status.Get_source(), tag=TAG_WORK)
+                next_tile += 1
+            else:
+                comm.send(None, dest=status.Get_source(), tag=TAG_DIE)
+                active -= 1
+        return convergence
+
+    status = MPI.Status()
+    while True:
+        t = comm.recv(source=0, tag=MPI.ANY_TAG, status=status)
+        if status.Get_tag() == TAG_DIE:
+            return None
+        comm.send((t, compute_tile((mandelbrot_set, frame, tiles[t]))[1]), dest=0, tag=TAG_RESULT)
+
+
+if __name__ == '__main__':
+    # Options : largeur et hauteur de l'image, --tile=256 (taille des tuiles), --iterations=200,
+    # --workers=N (pool de processus) ou --mpi, --output=fichier.png
+    tile = 256
+    max_iterations = 200
+    nb_workers = 1
+    output = "mandelbrot_tiled.png"
+    use_mpi = '--mpi' in sys.argv
+    for a in sys.argv:
+        if a.startswith('--tile='): tile = int(a.split('=')[1])
+        if a.startswith('--iterations='): max_iterations = int(a.split('=')[1])
+        if a.startswith('--workers='): nb_workers = int(a.split('=')[1])
+        if a.startswith('--output='): output = a.split('=', 1)[1]
+    args = [a for a in sys.argv if not a.startswith('--')]
+    width, height = 1024, 1024
+    if len(args) > 2:
+        width, height = int(args[1]), int(args[2])
+
+    mandelbrot_set = MandelbrotSet(max_iterations=max_iterations, escape_radius=2.)
+    frame = Frame(width, height)
+
+    deb = time()
+    if use_mpi:
+        convergence = render_mpi(mandelbrot_set, frame, tile)
+    else:
+        convergence = render_pool(mandelbrot_set, frame, tile, nb_workers)
+    fin = time()
+    if convergence is not None:
+        print(f"Temps du calcul de l'ensemble de Mandelbrot ({width}x{height}, tuiles {tile}x{tile}) : {fin-deb:.4f} s")
+
+        # Constitution de l'image résultante (ligne y de l'image = partie imaginaire y_min + y*pas)
+        deb = time()
+        write_png(output, convergence)
+        fin = time()
+        print(f"Temps de constitution de l'image : {fin-deb:.4f} s")
@@ -0,0 +1,227 @@
+"""
+batch_life.py
+Jeu de la vie sur un lot de grilles
+###################################
+Pour étudier statistiquement l'évolution de grilles aléatoires (soupes), on simule N petites grilles
+toriques de même dimension en même temps : elles sont empilées dans un seul tableau 3D (N, ny, nx) et
+une génération de toutes les grilles est calculée en un seul appel vectorisé, sans boucle Python sur
+les grilles. Le coût par grille est alors limité par la bande passante mémoire et non par le surcoût
+d'un objet Grille par grille.
+
+Pour chaque grille, on suit la population et on détecte :
+    - l'extinction (population nulle) ;
+    - la périodicité : une empreinte de 64 bits de chaque génération (bitlife.fingerprint) est conservée
+      sur les max_period dernières générations ; si l'empreinte courante est égale à celle d'il y a p
+      générations, la grille courante est copiée et, p générations plus tard, comparée exactement à la
+      grille obtenue : si elles sont identiques, la grille est périodique de période p (p = 1 pour une
+      configuration stable).
+Les grilles terminées sont retirées du lot : les générations suivantes ne calculent que les grilles
+encore actives.
+"""
+import sys
+import time
+import numpy as np
+import bitlife
+from rules import CONWAY, rule_from_argv
+
+# État d'une grille du lot
+RUNNING = 0
+EXTINCT = 1
+PERIODIC = 2
+STATUS_NAMES = {RUNNING: "en cours", EXTINCT: "éteinte", PERIODIC: "périodique"}
+
+
+class BatchGrille:
+    """
+    Lot de nb_boards grilles toriques de dimension dim = (nombre lignes, nombre colonnes).
+        - cells est le tableau (nb_boards, ny, nx) de np.uint8 des grilles initiales (tirées au hasard si None)
+        - max_period est la plus grande période détectée
+        - rule est la règle de l'automate (rules.Rule, B3/S23 par défaut)
+    Résultats par grille (indicés par le numéro de la grille dans le lot initial) :
+        - status : RUNNING, EXTINCT ou PERIODIC
+        - period : période détectée (0 si aucune)
+        - end_generation : génération d'extinction, ou génération de début du cycle
+        - population : population à la dernière génération calculée pour la grille
+        - max_population : population maximale atteinte
+    """
+    def __init__(self, nb_boards, dim, cells=None, max_period=16, rule=CONWAY):
+        self.dimensions = dim
+        self.rule = rule
+        self.nb_boards = nb_boards
+        self.max_period = max_period
+        ny, nx = dim
+        # Grilles actives étendues d'une couronne de cellules fantômes (tore)
+        self.ext = np.zeros((nb_boards, ny + 2, nx + 2), dtype=np.uint8)
+        if cells is not None:
+            self.ext[:, 1:-1, 1:-1] = cells
+        else:
+            self.ext[:, 1:-1, 1:-1] = np.random.randint(2, size=(nb_boards, ny, nx), dtype=np.uint8)
+        self.next_ext = np.zeros_like(self.ext)
+        self.voisins = np.zeros((nb_boards, ny, nx), dtype=np.uint8)
+        # Numéro (dans le lot initial) de chaque grille active
+        self.ids = np.arange(nb_boards)
+        self.generation = 0
+
+        self.status = np.full(nb_boards, RUNNING, dtype=np.int8)
+        self.period = np.zeros(nb_boards, dtype=np.int64)
+        self.end_generation = np.full(nb_boards, -1, dtype=np.int64)
+        self.population = np.zeros(nb_boards, dtype=np.int64)
+        self.max_population = np.zeros(nb_boards, dtype=np.int64)
+
+        # Empreintes des max_period dernières générations (tampon circulaire, une colonne par grille active)
+        nb_words = (ny * nx + 63) // 64
+        self.keys = bitlife.position_keys(nb_words)
+        self.history = np.zeros((max_period, nb_boards), dtype=np.uint64)
+        # Cycles candidats en attente de vérification exacte :
+        # numéro de grille -> (mots de la grille copiée, période, génération de vérification)
+        self.candidates = {}
+        self._check()
+
+    @property
+    def cells(self):
+        """Grilles actives (vue sans les cellules fantômes)"""
+        return self.ext[:, 1:-1, 1:-1]
+
+    def active_count(self):
+        """Nombre de grilles encore en cours de calcul"""
+        return len(self.ids)
+
+    def _fingerprint(self):
+        """Grilles actives compressées en mots de 64 bits, empreinte de 64 bits et population de chacune"""
+        n = len(self.ids)
+        octets = np.packbits(self.cells.reshape(n, -1), axis=1, bitorder='little')
+        padded = np.zeros((n, 8 * len(self.keys)), dtype=np.uint8)
+        padded[:, :octets.shape[1]] = octets
+        words = padded.view('<u8')
+        hashes = bitlife.fingerprint(words, self.keys, axis=1)
+        if hasattr(np, "bitwise_count"):
+            population = np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+        else:
+            population = self.cells.sum(axis=(1, 2), dtype=np.int64)
+        return words, hashes, population
+
+    def _check(self):
+        """Met à jour les populations, détecte les grilles éteintes ou périodiques et les retire du lot"""
+        g = self.generation
+        M = self.max_period
+        words, hashes, population = self._fingerprint()
+        self.population[self.ids] = population
+        np.maximum.at(self.max_population, self.ids, population)
+
+        # eq[p-1, b] : la grille b est identique à ce qu'elle était p générations plus tôt
+        eq = self.history[(g - np.arange(1, M + 1)) % M] == hashes
+        if g < M:
+            eq[g:] = False
+        periodic = eq.any(axis=0)
+        period = eq.argmax(axis=0) + 1
+        self.history[g % M] = hashes
+
+        extinct = population == 0
+        periodic &= ~extinct
+        ids = self.ids
+
+        # Vérification exacte des candidats : la grille copiée doit se retrouver period générations plus tard
+        confirmed = np.zeros(len(ids), dtype=bool)
+        for b in list(self.candidates):
+            row = np.searchsorted(ids, b)
+            snapshot, p, confirm_at = self.candidates[b]
+            if extinct[row]:
+                del self.candidates[b]
+            elif g == confirm_at:
+                del self.candidates[b]
+                if np.array_equal(words[row], snapshot):
+                    confirmed[row] = True
+                    period[row] = p
+        # Nouveaux candidats (empreintes égales)
+        for row in np.flatnonzero(periodic & ~confirmed):
+            if ids[row] not in self.candidates:
+                self.candidates[ids[row]] = (words[row].copy(), period[row], g + period[row])
+
+        done = extinct | confirmed
+        if not done.any():
+            return
+        self.status[ids[extinct]] = EXTINCT
+        self.end_generation[ids[extinct]] = g
+        self.status[ids[confirmed]] = PERIODIC
+        self.period[ids[confirmed]] = period[confirmed]
+        # Début du cycle : génération dont l'empreinte était égale à celle de la copie (g - 2 période)
+        self.end_generation[ids[confirmed]] = g - 2 * period[confirmed]
+
+        # Retrait des grilles terminées
+        keep = ~done
+        self.ids = ids[keep]
+        self.ext = self.ext[keep]
+        self.next_ext = self.next_ext[keep]
+        self.voisins = self.voisins[keep]
+        self.history = self.history[:, keep]
+
+    def compute_next_iteration(self):
+        """Calcule la génération suivante de toutes les grilles actives"""
+        if len(self.ids) == 0:
+            return
+        ext = self.ext
+        # Cellules fantômes : lignes puis colonnes (les coins suivent)
+        ext[:, 0, 1:-1] = ext[:, -2, 1:-1]
+        ext[:, -1, 1:-1] = ext[:, 1, 1:-1]
+        ext[:, :, 0] = ext[:, :, -2]
+        ext[:, :, -1] = ext[:, :, 1]
+
+        voisins = self.voisins
+        np.add(ext[:, :-2, :-2], ext[:, :-2, 1:-1], out=voisins)
+        for (i, j) in ((0, 2), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2)):
+            voisins += ext[:, i:i + voisins.shape[1], j:j + voisins.shape[2]]
+        self.next_ext[:, 1:-1, 1:-1] = self.rule.apply(ext[:, 1:-1, 1:-1], voisins)
+        self.ext, self.next_ext = self.next_ext, self.ext
+        self.generation += 1
+        self._check()
+
+    def run(self, nb_generations):
+        """Avance le lot d'au plus nb_generations générations (arrêt dès que toutes les grilles sont terminées)"""
+        for _ in range(nb_generations):
+            if len(self.ids) == 0:
+                break
+            self.compute_next_iteration()
+
+    def summary(self):
+        """Statistiques du lot : nombre de grilles par état, histogramme des périodes, durées de vie"""
+        counts = {STATUS_NAMES[s]: int(np.count_nonzero(self.status == s)) for s in STATUS_NAMES}
+        periods, nb = np.unique(self.period[self.status == PERIODIC], return_counts=True)
+        finished = self.status != RUNNING
+        lifetime = float(self.end_generation[finished].mean()) if finished.any() else float('nan')
+        return counts, dict(zip(periods.tolist(), nb.tolist())), lifetime
+
+
+if __name__ == '__main__':
+    nb_boards = 10000
+    dim = (100, 100)
+    nb_generations = 1000
+    max_period = 16
+    for a in sys.argv:
+        if a.startswith('--generations='): nb_generations = int(a.split('=')[1])
+        if a.startswith('--max-period='): max_period = int(a.split('=')[1])
+    # Option --rule=B36/S23 (ou nom de règle, voir rules.py) : règle de l'automate
+    rule = rule_from_argv(sys.argv)
+    args = [a for a in sys.argv if not a.startswith('--')]
+    if len(args) > 1:
+        nb_boards = int(args[1])
+    if len(args) > 3:
+        dim = (int(args[2]), int(args[3]))
+    print(f"{nb_boards} grilles {dim}, au plus {nb_generations} générations, périodes <= {max_period}")
+
+    deb = time.time()
+    batch = BatchGrille(nb_boards, dim, max_period=max_period, rule=rule)
+    nb_updates = 0
+    for g in range(nb_generations):
+        if batch.active_count() == 0:
+            break
+        nb_updates += batch.active_count()
+        batch.compute_next_iteration()
+        if g % 100 == 0:
+            print(f"Génération {g:6d} : {batch.active_count():6d} grilles actives\r", end='')
+    fin = time.time()
+
+    counts, periods, lifetime = batch.summary()
+    print(f"\nTemps : {fin-deb:.3f}s, {nb_updates*dim[0]*dim[1]/(fin-deb):.3e} cellules/s")
+    print("États :", counts)
+    print("Périodes :", periods)
+    print(f"Durée de vie moyenne des grilles terminées : {lifetime:.1f} générations")
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+bench_life.py
+Banc d'essai des différentes versions du jeu de la vie
+######################################################
+Sur le modèle de projet/tools/bench.py : chaque configuration (version, taille de grille, nombre de
+processus) est lancée plusieurs fois dans un processus séparé (mpirun pour les versions MPI). On
+rapporte la moyenne et l'écart type du temps par itération et de chaque phase, après quelques
+itérations de chauffe non mesurées. Les grilles initiales sont aléatoires, avec une graine fixée par
+rang, pour que les mesures soient reproductibles.
+
+Phases (chronométrées dans les grilles, voir timing.py) :
+    - halo : échange des lignes ou blocs fantômes (en mode recouvrement : attente restante seulement)
+    - stencil : comptage des voisins (convolution)
+    - rule : application de la règle (table de transition)
+    - step : comptage et règle fusionnés (version scalaire, versions compressées)
+    - interior / border : lignes intérieures et lignes de bord (mode recouvrement)
+    - diff : calcul des cellules modifiées
+    - gather : rassemblement de la grille (ou des changements) sur le rang 0
+    - draw : affichage sur le rang 0 (pilote vidéo SDL « dummy », sans fenêtre)
+Pour les versions MPI, chaque phase est le maximum sur les processus (le processus le plus lent
+fixe la durée de l'itération).
+
+Mise à l'échelle :
+    - forte : taille de grille fixe, on augmente le nombre de processus.
+      accélération S(p) = T(p_ref) / T(p), efficacité E(p) = S(p) * p_ref / p ;
+    - faible : chaque processus garde la même quantité de travail, la hauteur de grille est multipliée
+      par p. efficacité E(p) = T(p_ref) / T(p).
+p_ref est le plus petit nombre de processus mesuré (normalement 1).
+
+Les résultats s'écrivent en JSON (--json) ou en CSV (--csv), avec la version du dépôt (commit git),
+pour suivre les régressions d'une version à l'autre. --plot trace les courbes de mise à l'échelle.
+
+Exemples :
+    python bench_life.py --variants vect packed --sizes 512 1024
+    python bench_life.py --variants mpi mpi_overlap cart --ranks 1 2 4 8 --scaling both --json=bench.json
+    python bench_life.py --variants display display_diff --ranks 1 2 4 --csv=affichage.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import platform
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class Variant:
+    module: str
+    mpi: bool
+    slab: bool   # découpage en tranches : la hauteur doit être divisible par le nombre de processus
+    description: str
+
+
+VARIANTS = {
+    'scalar': Variant('game_of_life', False, False, "boucles Python (game_of_life.py)"),
+    'vect': Variant('game_of_life_vect', False, False, "convolution (game_of_life_vect.py)"),
+    'packed': Variant('game_of_life_vect', False, False, "64 cellules par mot (game_of_life_vect.py --packed)"),
+    'mpi': Variant('game_of_life_final', True, True, "tranches MPI (game_of_life_final.py)"),
+    'mpi_packed': Variant('game_of_life_final', True, True, "tranches MPI compressées (--packed)"),
+    'mpi_overlap': Variant('game_of_life_final', True, True, "tranches MPI avec recouvrement (--overlap)"),
+    'cart': Variant('game_of_life_cart', True, False, "blocs 2D MPI (game_of_life_cart.py)"),
+    'display': Variant('game_of_life_vect_final', True, True, "tranches MPI + Gather + affichage"),
+    'display_diff': Variant('game_of_life_vect_final', True, True, "tranches MPI + changements seuls + affichage (--diff)"),
+}
+
+BENCH_LINE = "BENCH "
+
+
+@dataclass
+class RunResult:
+    per_iter: Dict[str, float]
+    raw: str
+
+
+def parse_dim(text: str) -> Tuple[int, int]:
+    """Taille de grille « N » (grille carrée) ou « NYxNX »"""
+    parts = text.lower().split('x')
+    if len(parts) == 1:
+        return int(parts[0]), int(parts[0])
+    return int(parts[0]), int(parts[1])
+
+
+# ---------------------------------------------------------------------------------------------------
+# Processus de mesure (lancé par le pilote, éventuellement sous mpirun)
+# ---------------------------------------------------------------------------------------------------
+
+def make_grid(variant: str, dim, rule):
+    """Grille initiale aléatoire de la version variant (le générateur est initialisé par l'appelant)"""
+    if variant == 'scalar':
+        from game_of_life import Grille
+        return Grille(dim, rule=rule)
+    if variant in ('vect', 'packed'):
+        from game_of_life_vect import Grille
+        return Grille(dim, packed=variant == 'packed', rule=rule)
+    if variant in ('mpi', 'mpi_packed', 'mpi_overlap'):
+        from game_of_life_final import Grille
+        return Grille(dim, packed=variant == 'mpi_packed', overlap=variant == 'mpi_overlap', rule=rule)
+    if variant == 'cart':
+        from game_of_life_cart import Grille
+        return Grille(dim, rule=rule)
+    from game_of_life_vect_final import Grille
+    return Grille(dim, rule=rule, track_changes=variant == 'display_diff')
+
+
+def run_worker(args) -> None:
+    """Mesure une configuration et affiche sur le rang 0 une ligne BENCH {json des temps par itération}"""
+    from rules import Rule
+
+    comm = None
+    rank = 0
+    if VARIANTS[args.variant].mpi:
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+        rank = comm.Get_rank()
+    np.random.seed(args.seed + rank)
+    dim = parse_dim(args.dim)
+    grid = make_grid(args.variant, dim, Rule(args.rule))
+
+    renderer = None
+    if args.variant.startswith('display'):
+        grid.get_global_grid()
+        if rank == 0:
+            import pygame as pg
+            from renderer import GridRenderer
+            pg.init()
+            size_x = max(1, 800 // dim[1])
+            size_y = max(1, 800 // dim[0])
+            screen = pg.display.set_mode((dim[1] * size_x, dim[0] * size_y))
+            renderer = GridRenderer(screen, dim, size_x, size_y, grid.col_life, grid.col_dead)
+            renderer.draw(grid.global_cells)
+
+    def step():
+        diff = grid.compute_next_iteration()
+        if args.variant == 'display':
+            grid.get_global_grid()
+            diff = None
+        elif args.variant == 'display_diff':
+            diff = grid.gather_changes(diff)
+        else:
+            return
+        if renderer is not None:
+            grid.timer.start()
+            renderer.draw(grid.global_cells, diff)
+            grid.timer.lap('draw')
+
+    for _ in range(args.warmup):
+        step()
+    grid.timer.reset()
+    if comm is not None:
+        comm.Barrier()
+    t0 = time.perf_counter()
+    for _ in range(args.generations):
+        step()
+    if comm is not None:
+        comm.Barrier()
+    elapsed = time.perf_counter() - t0
+
+    phases = grid.timer.per_iteration(args.generations)
+    if args.variant == 'cart':
+        grid.free()
+    if comm is not None:
+        all_phases = comm.gather(phases, root=0)
+        if rank != 0:
+            return
+        names = sorted(set().union(*all_phases))
+        phases = {name: max(p.get(name, 0.) for p in all_phases) for name in names}
+    print(BENCH_LINE + json.dumps({'total': elapsed / args.generations, **phases}), flush=True)
+
+
+# ---------------------------------------------------------------------------------------------------
+# Pilote
+# ---------------------------------------------------------------------------------------------------
+
+def parse_bench_line(text: str) -> Dict[str, float]:
+    for line in text.splitlines():
+        if line.startswith(BENCH_LINE):
+            return json.loads(line[len(BENCH_LINE):])
+    raise ValueError("Could not find BENCH line")
+
+
+def run_cmd(cmd: List[str], env: Dict[str, str] | None = None) -> str:
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env, text=True, check=True)
+    return proc.stdout
+
+
+def summarize(results: List[RunResult]) -> Tuple[Dict[str, float], Dict[str, float]]:
+    keys = sorted({k for r in results for k in r.per_iter.keys()})
+    means: Dict[str, float] = {}
+    stds: Dict[str, float] = {}
+    for k in keys:
+        vals = [r.per_iter[k] for r in results if k in r.per_iter]
+        means[k] = statistics.mean(vals)
+        stds[k] = statistics.pstdev(vals) if len(vals) > 1 else 0.0
+    return means, stds
+
+
+def print_table(means: Dict[str, float], stds: Dict[str, float], title: str) -> None:
+    print(f"\n== {title} ==")
+    for k in sorted(means.keys()):
+        print(f"{k:20s}  mean={means[k]:.6e} s  std={stds[k]:.6e} s")
+
+
+def worker_command(args, variant: str, dim, nb_procs: int) -> List[str]:
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", f"--variant={variant}",
+           f"--dim={dim[0]}x{dim[1]}", f"--generations={args.generations}", f"--warmup={args.warmup}",
+           f"--seed={args.seed}", f"--rule={args.rule}"]
+    if VARIANTS[variant].mpi:
+        cmd = shlex.split(args.mpirun) + ["-n", str(nb_procs)] + cmd
+    return cmd
+
+
+def measure(args, variant: str, dim, nb_procs: int, env) -> Optional[Tuple[Dict[str, float], Dict[str, float]]]:
+    """Moyenne et écart type des temps par itération sur args.runs exécutions (None en cas d'échec)"""
+    results: List[RunResult] = []
+    for _ in range(args.runs):
+        try:
+            out = run_cmd(worker_command(args, variant, dim, nb_procs), env=env)
+            results.append(RunResult(per_iter=parse_bench_line(out), raw=out))
+        except (subprocess.CalledProcessError, ValueError) as e:
+            print(f"\n!! {variant} {dim[0]}x{dim[1]} p={nb_procs} : échec de la mesure")
+            print(getattr(e, 'output', None) or e)
+            return None
+    means, stds = summarize(results)
+    print_table(means, stds, f"{variant} grid={dim[0]}x{dim[1]} ranks={nb_procs} "
+                             f"generations={args.generations} runs={args.runs}")
+    return means, stds
+
+
+def run_benchmarks(args) -> List[dict]:
+    """Mesure toutes les configurations et calcule débit, accélération et efficacité"""
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    scalings = ['strong', 'weak'] if args.scaling == 'both' else [args.scaling]
+
+    cache = {}
+    records = []
+    for variant in args.variants:
+        v = VARIANTS[variant]
+        ranks = sorted(args.ranks) if v.mpi else [1]
+        for base_dim in args.sizes:
+            for scaling in scalings:
+                reference = None
+                for p in ranks:
+                    dim = base_dim if scaling == 'strong' else (base_dim[0] * p, base_dim[1])
+                    if v.slab and dim[0] % p != 0:
+                        print(f"\n-- {variant} {dim[0]}x{dim[1]} p={p} ignoré : hauteur non divisible par {p}")
+                        continue
+                    key = (variant, dim, p)
+                    if key not in cache:
+                        cache[key] = measure(args, variant, dim, p, env)
+                    if cache[key] is None:
+                        continue
+                    means, stds = cache[key]
+                    t = means['total']
+                    if reference is None:
+                        reference = (p, t)
+                    p_ref, t_ref = reference
+                    if scaling == 'strong':
+                        speedup = t_ref / t
+                        efficiency = speedup * p_ref / p
+                    else:
+                        speedup = t_ref * p / (t * p_ref)
+                        efficiency = t_ref / t
+                    records.append({
+                        'variant': variant, 'scaling': scaling, 'ranks': p, 'ny': dim[0], 'nx': dim[1],
+                        'time_mean': t, 'time_std': stds['total'],
+                        'cells_per_s': dim[0] * dim[1] / t,
+                        'speedup': speedup, 'efficiency': efficiency,
+                        'phases': {k: {'mean': means[k], 'std': stds[k]} for k in means if k != 'total'},
+                    })
+    return records
+
+
+def metadata(args) -> dict:
+    """Description de la machine, des versions et des paramètres de la campagne de mesures"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        'date': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'commit': commit,
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'generations': args.generations,
+        'warmup': args.warmup,
+        'runs': args.runs,
+        'seed': args.seed,
+        'rule': args.rule,
+    }
+
+
+def print_summary(records: List[dict]) -> None:
+    print("\n== Résumé ==")
+    print("version       | échelle | rangs | grille      | temps/it (s)      | cellules/s | accél. | effic.")
+    for r in records:
+        grid = f"{r['ny']}x{r['nx']}"
+        print(f"{r['variant']:13s} | {r['scaling']:7s} | {r['ranks']:5d} | {grid:11s} | "
+              f"{r['time_mean']:.3e}±{r['time_std']:.1e} | {r['cells_per_s']:.3e}  | {r['speedup']:6.2f} | {r['efficiency']:6.2f}")
+
+
+def write_json(path: str, meta: dict, records: List[dict]) -> None:
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'results': records}, f, indent=2)
+
+
+def write_csv(path: str, meta: dict, records: List[dict]) -> None:
+    phases = sorted({k for r in records for k in r['phases']})
+    columns = ['commit', 'date', 'variant', 'scaling', 'ranks', 'ny', 'nx', 'time_mean', 'time_std',
+               'cells_per_s', 'speedup', 'efficiency'] + [f"phase_{k}" for k in phases]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for r in records:
+            row = {k: r[k] for k in columns if k in r}
+            row['commit'] = meta['commit']
+            row['date'] = meta['date']
+            for k in phases:
+                row[f"phase_{k}"] = r['phases'][k]['mean'] if k in r['phases'] else ''
+            writer.writerow(row)
+
+
+def plot_scaling(path: str, records: List[dict]) -> None:
+    """Courbes d'accélération (mise à l'échelle forte) et d'efficacité (mise à l'échelle faible)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, (ax_strong, ax_weak) = plt.subplots(1, 2, figsize=(11, 4.5))
+    max_ranks = 1
+    for scaling, ax in (('strong', ax_strong), ('weak', ax_weak)):
+        curves = {}
+        for r in records:
+            if r['scaling'] == scaling:
+                curves.setdefault((r['variant'], r['ny'] if scaling == 'strong' else r['ny'] // r['ranks'], r['nx']), []).append(r)
+        for (variant, ny, nx), curve in curves.items():
+            if len(curve) < 2:
+                continue
+            ranks = [r['ranks'] for r in curve]
+            max_ranks = max(max_ranks, max(ranks))
+            values = [r['speedup'] if scaling == 'strong' else r['efficiency'] for r in curve]
+            ax.plot(ranks, values, 'o-', label=f"{variant} {ny}x{nx}")
+    ax_strong.plot([1, max_ranks], [1, max_ranks], 'k--', label="idéal")
+    ax_strong.set_title("Mise à l'échelle forte")
+    ax_strong.set_ylabel("Accélération")
+    ax_weak.axhline(1., color='k', linestyle='--', label="idéal")
+    ax_weak.set_title("Mise à l'échelle faible (grille par processus)")
+    ax_weak.set_ylabel("Efficacité")
+    for ax in (ax_strong, ax_weak):
+        ax.set_xlabel("Nombre de processus")
+        ax.legend(fontsize='small')
+        ax.grid(True, alpha=.3)
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Banc d'essai des versions du jeu de la vie")
+    ap.add_argument("--variants", nargs="*", default=['vect', 'packed', 'mpi', 'mpi_overlap', 'cart'],
+                    choices=list(VARIANTS))
+    ap.add_argument("--sizes", nargs="*", type=parse_dim, default=[(512, 512), (1024, 1024)],
+                    help="tailles de grille N ou NYxNX (par processus en mise à l'échelle faible)")
+    ap.add_argument("--ranks", type=int, nargs="*", default=[1, 2, 4])
+    ap.add_argument("--scaling", choices=['strong', 'weak', 'both'], default='strong')
+    ap.add_argument("--generations", type=int, default=50)
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=2024)
+    ap.add_argument("--rule", default="B3/S23")
+    ap.add_argument("--mpirun", default="mpirun", help="commande de lancement MPI (ex : 'mpirun --oversubscribe')")
+    ap.add_argument("--json", help="fichier de résultats JSON")
+    ap.add_argument("--csv", help="fichier de résultats CSV")
+    ap.add_argument("--plot", help="image des courbes de mise à l'échelle (matplotlib)")
+    # Processus de mesure d'une configuration (lancé par le pilote)
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--variant", choices=list(VARIANTS), help=argparse.SUPPRESS)
+    ap.add_argument("--dim", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    records = run_benchmarks(args)
+    meta = metadata(args)
+    print_summary(records)
+    if args.json:
+        write_json(args.json, meta, records)
+    if args.csv:
+        write_csv(args.csv, meta, records)
+    if args.plot:
+        plot_scaling(args.plot, records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+bitlife.py
+Moteur du jeu de la vie sur grille compressée (bit-packed)
+##########################################################
+Chaque ligne de la grille est stockée dans des mots np.uint64 : la cellule (i,j) correspond au bit j%64
+du mot j//64 de la ligne i. Une grille (ny,nx) occupe donc ny * ceil(nx/64) mots, soit huit fois moins
+de mémoire qu'avec un np.uint8 par cellule.
+
+La génération suivante est calculée avec des opérations bit à bit sur des mots entiers : les huit
+voisins d'une cellule sont obtenus par décalages de bits (gauche/droite) et par décalage de lignes
+(haut/bas), puis additionnés à l'aide d'additionneurs complets pour obtenir le nombre de voisins
+vivants codé sur 4 bits (un tableau de bits par chiffre binaire). Aucun tableau de flottants n'est alloué.
+
+Le tore est géré de la façon suivante :
+    - horizontalement, le bit de la dernière colonne est réinjecté en colonne 0 (et inversement)
+      lors des décalages ;
+    - verticalement, la grille est étendue d'une ligne fantôme en haut et en bas (ligne opposée du
+      tore en séquentiel, ligne reçue du voisin en MPI).
+Les bits de bourrage du dernier mot (quand nx n'est pas multiple de 64) sont toujours remis à zéro.
+
+Règles autres que B3/S23 (voir rules.py) : l'état suivant est l'union, sur les nombres de voisins n de
+B (cellules mortes) et de S (cellules vivantes), des masques « nombre de voisins == n » obtenus à
+partir des quatre tableaux de bits du compteur.
+"""
+import numpy as np
+
+WORD_BITS = 64
+
+
+def nb_words(width: int) -> int:
+    """Nombre de mots de 64 bits nécessaires pour stocker une ligne de width cellules"""
+    return (width + WORD_BITS - 1) // WORD_BITS
+
+
+def padding_mask(width: int) -> np.uint64:
+    """Masque des bits utiles du dernier mot d'une ligne"""
+    rem = width % WORD_BITS
+    if rem == 0:
+        return np.uint64(0xFFFFFFFFFFFFFFFF)
+    return np.uint64((1 << rem) - 1)
+
+
+def pack(cells: np.ndarray) -> np.ndarray:
+    """
+    Compresse une grille de np.uint8 (0 ou 1) de dimension (ny,nx) en une grille de np.uint64
+    de dimension (ny, nb_words(nx))
+    """
+    ny, nx = cells.shape
+    nw = nb_words(nx)
+    padded = np.zeros((ny, nw * WORD_BITS), dtype=np.uint8)
+    padded[:, :nx] = cells
+    octets = np.packbits(padded, axis=1, bitorder='little')
+    return octets.view('<u8').astype(np.uint64, copy=False)
+
+
+def unpack(bits: np.ndarray, width: int) -> np.ndarray:
+    """Opération inverse de pack : retourne une grille (ny,width) de np.uint8"""
+    octets = np.ascontiguousarray(bits.astype('<u8', copy=False)).view(np.uint8)
+    return np.unpackbits(octets, axis=1, count=width, bitorder='little')
+
+
+def from_pattern(dim, init_pattern) -> np.ndarray:
+    """Construit directement la grille compressée à partir d'une liste de cellules vivantes"""
+    bits = np.zeros((dim[0], nb_words(dim[1])), dtype=np.uint64)
+    if len(init_pattern) > 0:
+        indices_i = np.array([v[0] for v in init_pattern], dtype=np.int64)
+        indices_j = np.array([v[1] for v in init_pattern], dtype=np.int64)
+        words = indices_j // WORD_BITS
+        masks = np.left_shift(np.uint64(1), (indices_j % WORD_BITS).astype(np.uint64))
+        np.bitwise_or.at(bits, (indices_i, words), masks)
+    return bits
+
+
+def random_bits(dim) -> np.ndarray:
+    """Grille compressée aléatoire (chaque cellule vivante avec une probabilité 1/2)"""
+    bits = np.random.randint(0, 1 << WORD_BITS, size=(dim[0], nb_words(dim[1])), dtype=np.uint64)
+    bits[:, -1] &= padding_mask(dim[1])
+    return bits
+
+
+def population(bits: np.ndarray) -> int:
+    """Nombre de cellules vivantes d'une grille compressée (bits de bourrage nuls)"""
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+    octets = np.ascontiguousarray(bits).view(np.uint8)
+    return int(np.unpackbits(octets).sum(dtype=np.int64))
+
+
+def mix64(x: np.ndarray) -> np.ndarray:
+    """Fonction de mélange de splitmix64 appliquée à chaque mot (le débordement des np.uint64 est voulu)"""
+    x = x.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def position_keys(nb: int, first: int = 0) -> np.ndarray:
+    """Clés des positions first à first+nb-1 pour fingerprint"""
+    return mix64(np.arange(first, first + nb, dtype=np.uint64) ^ np.uint64(0x6A09E667F3BCC909))
+
+
+def fingerprint(words: np.ndarray, keys: np.ndarray, axis=None):
+    """
+    Empreinte de 64 bits de mots np.uint64 : somme modulo 2^64 des mix64(mot ^ clé de sa position).
+    Chaque mot est mélangé avec sa position avant la somme : deux grilles différentes n'ont la même
+    empreinte qu'avec une probabilité de l'ordre de 2^-64, et les empreintes de morceaux disjoints
+    (tranches MPI) s'additionnent.
+    """
+    return mix64(words ^ keys).sum(axis=axis, dtype=np.uint64)
+
+
+def _shift_west(rows: np.ndarray, width: int) -> np.ndarray:
+    """
+    Retourne les lignes décalées de sorte que le bit j contienne la cellule j-1 (voisin de gauche),
+    la colonne 0 recevant la dernière colonne (tore)
+    """
+    out = rows << np.uint64(1)
+    out[:, 1:] |= rows[:, :-1] >> np.uint64(WORD_BITS - 1)
+    out[:, 0] |= (rows[:, -1] >> np.uint64((width - 1) % WORD_BITS)) & np.uint64(1)
+    return out
+
+
+def _shift_east(rows: np.ndarray, width: int) -> np.ndarray:
+    """
+    Retourne les lignes décalées de sorte que le bit j contienne la cellule j+1 (voisin de droite),
+    la dernière colonne recevant la colonne 0 (tore). Suppose les bits de bourrage nuls.
+    """
+    out = rows >> np.uint64(1)
+    out[:, :-1] |= rows[:, 1:] << np.uint64(WORD_BITS - 1)
+    out[:, -1] |= (rows[:, 0] & np.uint64(1)) << np.uint64((width - 1) % WORD_BITS)
+    return out
+
+
+def _full_adder(a, b, c):
+    """Additionneur complet bit à bit : retourne (somme, retenue)"""
+    t = a ^ b
+    return t ^ c, (a & b) | (t & c)
+
+
+def count_neighbours(ext: np.ndarray, width: int):
+    """
+    Compte les voisins vivants des lignes ext[1:-1] d'une grille compressée étendue d'une ligne
+    fantôme en haut et en bas. Le résultat est retourné sous la forme de quatre tableaux de bits
+    (b0, b1, b2, b3) tels que nombre de voisins = b0 + 2*b1 + 4*b2 + 8*b3.
+    """
+    west = _shift_west(ext, width)
+    east = _shift_east(ext, width)
+    # Les huit voisins : ligne du dessus, ligne du dessous et gauche/droite de la ligne courante
+    s1, c1 = _full_adder(west[:-2], ext[:-2], east[:-2])
+    s2, c2 = _full_adder(west[2:], ext[2:], east[2:])
+    w, e = west[1:-1], east[1:-1]
+    s3, c3 = w ^ e, w & e
+    b0, c4 = _full_adder(s1, s2, s3)
+    # Somme des quatre retenues de poids 2
+    t, c5 = _full_adder(c1, c2, c3)
+    b1, c6 = t ^ c4, t & c4
+    # Retenues de poids 4
+    b2, b3 = c5 ^ c6, c5 & c6
+    return b0, b1, b2, b3
+
+
+def _count_equals(counts, n: int) -> np.ndarray:
+    """Masque des cellules dont le nombre de voisins (b0 + 2*b1 + 4*b2 + 8*b3) vaut n"""
+    mask = None
+    for k, b in enumerate(counts):
+        term = b if (n >> k) & 1 else ~b
+        mask = term if mask is None else mask & term
+    return mask
+
+
+def step_extended(ext: np.ndarray, width: int, rule=None) -> np.ndarray:
+    """
+    Calcule la génération suivante des lignes ext[1:-1] à partir de la grille compressée étendue ext
+    (les lignes ext[0] et ext[-1] sont les lignes fantômes). rule est une rules.Rule (Conway si None).
+    """
+    b0, b1, b2, b3 = count_neighbours(ext, width)
+    alive = ext[1:-1]
+    if rule is None or rule.is_conway:
+        # Une cellule est vivante si elle a 3 voisins, ou 2 voisins et qu'elle était vivante
+        next_bits = b1 & ~(b2 | b3) & (b0 | alive)
+    else:
+        counts = (b0, b1, b2, b3)
+        equals = {n: _count_equals(counts, n) for n in rule.birth | rule.survival}
+        next_bits = np.zeros_like(alive)
+        for n in rule.birth:
+            next_bits |= equals[n] & ~alive
+        for n in rule.survival:
+            next_bits |= equals[n] & alive
+    next_bits[:, -1] &= padding_mask(width)
+    return next_bits
+
+
+def step_torus(bits: np.ndarray, width: int, chunk_rows: int = 1024, rule=None) -> np.ndarray:
+    """
+    Calcule la génération suivante d'une grille compressée torique complète.
+    Le calcul est fait par blocs de chunk_rows lignes afin de borner la taille des tableaux temporaires.
+    """
+    ny = bits.shape[0]
+    next_bits = np.empty_like(bits)
+    for r0 in range(0, ny, chunk_rows):
+        r1 = min(r0 + chunk_rows, ny)
+        ext = bits.take(np.arange(r0 - 1, r1 + 1) % ny, axis=0)
+        next_bits[r0:r1] = step_extended(ext, width, rule)
+    return next_bits
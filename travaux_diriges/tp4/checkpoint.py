@@ -0,0 +1,133 @@
+"""
+checkpoint.py
+Sauvegarde et reprise parallèles de la grille (MPI-IO)
+######################################################
+La grille globale (ny,nx) est écrite dans un seul fichier .npy (np.uint8, ordre C) : un en-tête
+standard suivi des cellules. Le fichier se relit donc directement avec np.load(path, mmap_mode='r').
+
+Chaque processus écrit seulement son bloc (une tranche de lignes ou un bloc 2D) à sa place dans le
+fichier grâce à une vue MPI-IO (type dérivé subarray). Aucun processus ne rassemble la grille complète.
+L'écriture est non bloquante : le bloc est copié dans un buffer dédié, puis la simulation continue
+pendant que les données sont écrites. L'écriture se termine à la sauvegarde suivante ou à l'appel de
+wait(). Le fichier est d'abord écrit sous un nom temporaire, puis renommé une fois complet : une
+sauvegarde interrompue n'écrase jamais la précédente.
+
+Les métadonnées (génération, règle, motif...) sont dans un petit fichier JSON à côté (path + '.json').
+À la reprise, chaque processus lit seulement son bloc (lecture collective). Le nombre de processus
+peut être différent de celui de la sauvegarde.
+"""
+import io
+import json
+import os
+import numpy as np
+from mpi4py import MPI
+
+
+def npy_header(shape) -> bytes:
+    """En-tête .npy (version 1.0) d'un tableau np.uint8 en ordre C de forme shape"""
+    buffer = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buffer, {'descr': '|u1', 'fortran_order': False, 'shape': tuple(shape)})
+    return buffer.getvalue()
+
+
+def read_header(path):
+    """Forme de la grille sauvegardée et position (en octets) de la première cellule dans le fichier"""
+    with open(path, 'rb') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        if fortran_order or dtype != np.uint8 or len(shape) != 2:
+            raise ValueError(f"{path} : grille np.uint8 2D en ordre C attendue")
+        return shape, f.tell()
+
+
+def read_metadata(path):
+    """Métadonnées de la sauvegarde (dictionnaire vide si le fichier JSON est absent)"""
+    try:
+        with open(path + '.json') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _block_view(fh, offset, global_shape, block_shape, start):
+    """Vue du fichier limitée au bloc [start, start+block_shape) de la grille globale"""
+    filetype = MPI.UNSIGNED_CHAR.Create_subarray(list(global_shape), list(block_shape), list(start)).Commit()
+    fh.Set_view(offset, MPI.UNSIGNED_CHAR, filetype)
+    return filetype
+
+
+def read_block(comm, path, start, block_shape):
+    """
+    Lecture collective du bloc [start, start+block_shape) de la grille sauvegardée dans path.
+    Chaque processus ne lit que son bloc.
+    """
+    global_shape, offset = read_header(path)
+    block = np.empty(block_shape, dtype=np.uint8)
+    fh = MPI.File.Open(comm, path, MPI.MODE_RDONLY)
+    filetype = _block_view(fh, offset, global_shape, block_shape, start)
+    fh.Read_all(block)
+    fh.Close()
+    filetype.Free()
+    return block
+
+
+class Checkpointer:
+    """
+    Sauvegardes périodiques non bloquantes de la grille répartie sur les processus de comm.
+    Toutes les méthodes sont collectives : tous les processus de comm doivent les appeler dans le même ordre.
+    Exemple :
+        ckpt = Checkpointer(comm)
+        ckpt.save(cells, (row_start, 0), global_dim, "etat.npy", {'generation': g})
+        ... itérations ...
+        ckpt.wait()
+    """
+    def __init__(self, comm):
+        self.comm = comm
+        self.buffer = None
+        self.file = None
+        self.filetype = None
+        self.request = None
+        self.pending = None     # (nom temporaire, nom final, métadonnées) de la sauvegarde en cours
+
+    def save(self, block, start, global_shape, path, metadata=None):
+        """
+        Lance l'écriture non bloquante du bloc local (np.uint8) placé en start dans la grille global_shape.
+        Le bloc est copié : la simulation peut le modifier dès le retour de save.
+        """
+        self.wait()
+        if self.buffer is None or self.buffer.shape != block.shape:
+            self.buffer = np.empty(block.shape, dtype=np.uint8)
+        self.buffer[...] = block
+
+        header = npy_header(global_shape)
+        tmp_path = path + '.tmp'
+        self.file = MPI.File.Open(self.comm, tmp_path, MPI.MODE_WRONLY | MPI.MODE_CREATE)
+        self.file.Set_size(len(header) + int(np.prod(global_shape)))
+        if self.comm.Get_rank() == 0:
+            self.file.Write_at(0, header)
+        self.filetype = _block_view(self.file, len(header), global_shape, block.shape, start)
+        self.request = self.file.Iwrite_at(0, self.buffer)
+        self.pending = (tmp_path, path, metadata or {})
+
+    def busy(self):
+        """Indique (sans bloquer) si l'écriture locale est encore en cours"""
+        return self.request is not None and not self.request.Test()
+
+    def wait(self):
+        """Termine la sauvegarde en cours : fin des écritures, fermeture et renommage du fichier"""
+        if self.pending is None:
+            return
+        self.request.Wait()
+        self.file.Close()
+        self.filetype.Free()
+        tmp_path, path, metadata = self.pending
+        if self.comm.Get_rank() == 0:
+            with open(path + '.json.tmp', 'w') as f:
+                json.dump(metadata, f)
+            os.replace(tmp_path, path)
+            os.replace(path + '.json.tmp', path + '.json')
+        self.comm.Barrier()
+        self.file = self.filetype = self.request = self.pending = None
@@ -0,0 +1,261 @@
+"""
+Jeu de la vie - Décomposition de domaine 2D (grille cartésienne MPI)
+La grille torique est découpée en blocs sur une topologie cartésienne périodique (MPI.Cart_create).
+Chaque processus échange avec ses huit voisins : les deux lignes de bord, les deux colonnes de bord
+et les quatre cellules de coin. Les blocs peuvent être de tailles inégales : la hauteur et la largeur
+de la grille n'ont pas besoin d'être divisibles par le nombre de processus.
+
+Le volume de halo par processus est proportionnel à (h_loc + w_loc), soit en O(N/sqrt(P)) au lieu de
+O(N) pour le découpage en tranches de game_of_life_final.py.
+"""
+from mpi4py import MPI
+import numpy as np
+import os
+import sys
+import time
+from scipy.signal import convolve2d
+from rules import CONWAY, Rule, rule_from_argv
+from timing import PhaseTimer
+import checkpoint
+import patterns
+
+# --- Configuration MPI ---
+comm = MPI.COMM_WORLD
+rank = comm.Get_rank()
+size = comm.Get_size()
+
+# Directions (di, dj) des huit voisins. Le tag d'un message est l'indice de la direction
+# dans laquelle il est envoyé ; il est reçu avec le tag de la direction opposée.
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def block_range(n, nb_blocks, i):
+    """Début et fin du i-ème bloc quand n éléments sont répartis en nb_blocks blocs (les premiers ont un élément de plus)"""
+    q, r = divmod(n, nb_blocks)
+    start = i * q + min(i, r)
+    return start, start + q + (1 if i < r else 0)
+
+
+class Grille:
+    """
+    Bloc local de la grille torique, entouré d'une couronne de cellules fantômes :
+    self.ext a pour dimension (h+2, w+2) et les cellules du bloc sont self.ext[1:-1, 1:-1].
+    """
+    def __init__(self, dim, init_pattern=None, dims=None, rule=CONWAY, restart=None):
+        self.global_dim = dim
+        self.rule = rule
+        if dims is None:
+            dims = MPI.Compute_dims(size, 2)
+        if dims[0] > dim[0] or dims[1] > dim[1]:
+            if rank == 0: print(f"Erreur : grille de processus {dims} trop grande pour la grille {dim}.")
+            sys.exit(1)
+        self.cart = comm.Create_cart(dims, periods=[True, True], reorder=True)
+        self.dims = dims
+        self.coords = self.cart.Get_coords(self.cart.Get_rank())
+
+        # Bloc local (tailles éventuellement inégales)
+        self.row_start, self.row_end = block_range(dim[0], dims[0], self.coords[0])
+        self.col_start, self.col_end = block_range(dim[1], dims[1], self.coords[1])
+        self.local_h = self.row_end - self.row_start
+        self.local_w = self.col_end - self.col_start
+
+        # Initialisation locale : chaque processus ne garde que les cellules de son bloc (pas de Scatter)
+        self.ext = np.zeros((self.local_h + 2, self.local_w + 2), dtype=np.uint8)
+        if restart is not None:
+            # Reprise : lecture du seul bloc local dans le fichier de sauvegarde (voir checkpoint.py)
+            self.ext[1:-1, 1:-1] = checkpoint.read_block(self.cart, restart, (self.row_start, self.col_start),
+                                                         (self.local_h, self.local_w))
+        elif init_pattern is not None:
+            self.ext[1:-1, 1:-1] = patterns.fill_block(init_pattern, (self.local_h, self.local_w),
+                                                       (self.row_start, self.col_start))
+        else:
+            self.ext[1:-1, 1:-1] = np.random.randint(2, size=(self.local_h, self.local_w), dtype=np.uint8)
+
+        # Rangs des huit voisins (topologie périodique)
+        self.neighbours = [self.cart.Get_cart_rank([(self.coords[0] + di) % dims[0], (self.coords[1] + dj) % dims[1]])
+                           for (di, dj) in DIRECTIONS]
+
+        # Types dérivés : une ligne intérieure (contiguë), une colonne intérieure (vecteur de pas w+2), un coin
+        self.row_type = MPI.UNSIGNED_CHAR.Create_contiguous(self.local_w).Commit()
+        self.col_type = MPI.UNSIGNED_CHAR.Create_vector(self.local_h, 1, self.local_w + 2).Commit()
+        # Octets envoyés à d'autres processus (pas les échanges avec soi-même d'une grille dégénérée (P, 1))
+        self.halo_bytes = sum(self._halo_length(di, dj) for d, (di, dj) in enumerate(DIRECTIONS)
+                              if self.neighbours[d] != self.cart.rank)
+
+        self.next_ext = np.zeros_like(self.ext)
+        # Temps cumulés des phases de compute_next_iteration (voir timing.py et bench_life.py)
+        self.timer = PhaseTimer()
+
+    @property
+    def cells(self):
+        return self.ext[1:-1, 1:-1]
+
+    def _send_offset(self, di, dj):
+        """Position (i,j) dans self.ext du premier élément envoyé dans la direction (di,dj)"""
+        i = {-1: 1, 0: 1, 1: self.local_h}[di]
+        j = {-1: 1, 0: 1, 1: self.local_w}[dj]
+        return i, j
+
+    def _recv_offset(self, di, dj):
+        """Position (i,j) dans self.ext de la cellule fantôme qui reçoit depuis la direction (di,dj)"""
+        i = {-1: 0, 0: 1, 1: self.local_h + 1}[di]
+        j = {-1: 0, 0: 1, 1: self.local_w + 1}[dj]
+        return i, j
+
+    def _halo_length(self, di, dj):
+        """Nombre de cellules envoyées dans la direction (di,dj) : une colonne, une ligne ou un coin"""
+        if di == 0:
+            return self.local_h
+        if dj == 0:
+            return self.local_w
+        return 1
+
+    def _datatype(self, di, dj):
+        if di == 0:
+            return self.col_type
+        if dj == 0:
+            return self.row_type
+        return MPI.UNSIGNED_CHAR
+
+    def exchange_halo(self):
+        """Échange non bloquant des lignes, colonnes et coins avec les huit voisins"""
+        flat = self.ext.reshape(-1)
+        stride = self.local_w + 2
+        reqs = []
+        for d, (di, dj) in enumerate(DIRECTIONS):
+            opposite = DIRECTIONS.index((-di, -dj))
+            i, j = self._recv_offset(di, dj)
+            reqs.append(self.cart.Irecv([flat[i * stride + j:], 1, self._datatype(di, dj)],
+                                        source=self.neighbours[d], tag=opposite))
+        for d, (di, dj) in enumerate(DIRECTIONS):
+            i, j = self._send_offset(di, dj)
+            reqs.append(self.cart.Isend([flat[i * stride + j:], 1, self._datatype(di, dj)],
+                                        dest=self.neighbours[d], tag=d))
+        MPI.Request.Waitall(reqs)
+
+    def compute_next_iteration(self):
+        """
+        Échange de halo puis convolution sur le bloc étendu : le mode 'valid' donne directement
+        le nombre de voisins des cellules du bloc, la périodicité étant assurée par les halos.
+        """
+        self.timer.start()
+        self.exchange_halo()
+        self.timer.lap('halo')
+
+        C = np.ones((3, 3), dtype=np.uint8)
+        C[1, 1] = 0
+        voisins = convolve2d(self.ext, C, mode='valid')
+        self.timer.lap('stencil')
+        self.next_ext[1:-1, 1:-1] = self.rule.apply(self.ext[1:-1, 1:-1], voisins)
+        self.ext, self.next_ext = self.next_ext, self.ext
+        self.timer.lap('rule')
+
+    def save_checkpoint(self, checkpointer, path, metadata):
+        """Lance l'écriture non bloquante du bloc local dans le fichier de sauvegarde (voir checkpoint.py)"""
+        checkpointer.save(self.cells, (self.row_start, self.col_start), self.global_dim, path, metadata)
+
+    def get_population_count(self):
+        """Population globale (réduction sur le rang 0)"""
+        local_count = np.array(np.sum(self.cells), dtype='i')
+        global_count = np.array(0, dtype='i') if rank == 0 else None
+        comm.Reduce(local_count, global_count, op=MPI.SUM, root=0)
+        return global_count
+
+    def report(self, nb_iterations):
+        """
+        Rassemble sur le rang 0 les statistiques par processus : taille du bloc, octets de halo envoyés
+        par itération, temps moyens d'échange et de calcul par itération
+        """
+        t = self.timer.totals
+        stats = comm.gather((rank, self.coords, (self.local_h, self.local_w), self.halo_bytes,
+                             t.get('halo', 0.) / nb_iterations,
+                             (t.get('stencil', 0.) + t.get('rule', 0.)) / nb_iterations), root=0)
+        if rank == 0:
+            # Découpage en tranches sur le même nombre de processus : deux lignes complètes, sauf seul
+            slab_bytes = sum(self.global_dim[1] for d in (-1, 1) if (rank + d) % size != rank)
+            print(f"Grille de processus : {self.dims[0]} x {self.dims[1]}")
+            print("Rang | Coords | Bloc      | Halo (octets/it) | Halo 1D (octets/it) | Échange (s/it) | Calcul (s/it)")
+            for (r, coords, shape, nbytes, th, tc) in sorted(stats):
+                print(f"{r:4d} | {str(tuple(coords)):6s} | {str(shape):9s} | {nbytes:16d} | {slab_bytes:19d} | {th:.3e}      | {tc:.3e}")
+        return stats
+
+    def free(self):
+        """Libère les types dérivés des halos et le communicateur cartésien (fin du calcul)"""
+        self.row_type.Free()
+        self.col_type.Free()
+        self.cart.Free()
+
+
+if __name__ == '__main__':
+    # Configuration par défaut
+    pattern_name = 'glider_gun'
+    args = [a for a in sys.argv if not a.startswith('--')]
+    if len(args) > 1: pattern_name = args[1]
+    # Options --checkpoint-every=N, --checkpoint=fichier.npy et --restart=fichier.npy (voir checkpoint.py)
+    checkpoint_every = 0
+    checkpoint_path = None
+    restart_path = None
+    for a in sys.argv:
+        if a.startswith('--checkpoint-every='): checkpoint_every = int(a.split('=')[1])
+        if a.startswith('--checkpoint='): checkpoint_path = a.split('=', 1)[1]
+        if a.startswith('--restart='): restart_path = a.split('=', 1)[1]
+
+    # Motif : nom d'un motif prédéfini ou fichier .rle/.cells (voir patterns.py),
+    # options --dim=NYxNX (taille de la grille) et --offset=I,J (position du motif)
+    if not patterns.exists(pattern_name):
+        if rank==0: print("Motif inconnu. Utilisation de die_hard."); pattern_name="die_hard"
+    board = patterns.board(pattern_name, *patterns.options_from_argv(sys.argv))
+    pattern_name = os.path.splitext(os.path.basename(pattern_name))[0]
+    # Option --rule=B36/S23 (ou nom de règle, voir rules.py) : règle de l'automate, sinon celle du fichier RLE
+    rule = rule_from_argv(sys.argv, default=Rule(board[2]) if board[2] else CONWAY)
+    board = board[:2]
+
+    start_generation = 0
+    if restart_path is not None:
+        metadata = checkpoint.read_metadata(restart_path)
+        start_generation = metadata.get('generation', 0)
+        pattern_name = metadata.get('pattern', pattern_name)
+        rule = rule_from_argv(sys.argv, default=Rule(metadata.get('rule', 'B3/S23')))
+        grid = Grille(checkpoint.read_header(restart_path)[0], rule=rule, restart=restart_path)
+    else:
+        grid = Grille(*board, rule=rule)
+    checkpointer = checkpoint.Checkpointer(grid.cart) if checkpoint_every > 0 else None
+    if checkpoint_path is None:
+        checkpoint_path = f"checkpoint_{pattern_name}.npy"
+
+    ITERATIONS = 500
+    if rank == 0:
+        print(f"--- Analyse de : {pattern_name} (décomposition 2D) ---")
+        print(f"Dimension : {grid.global_dim}")
+        if restart_path is not None:
+            print(f"Reprise de {restart_path} à la génération {start_generation}")
+        print("Itération | Population | Temps (s)")
+
+    start_time = time.time()
+
+    for i in range(ITERATIONS):
+        t_iter_start = time.time()
+
+        grid.compute_next_iteration()
+        pop = grid.get_population_count()
+
+        t_iter_end = time.time()
+
+        if rank == 0 and i % 10 == 0:
+            print(f"{start_generation + i:4d}     | {pop:5d}     | {t_iter_end - t_iter_start:.5f}")
+
+        generation = start_generation + i + 1
+        if checkpointer is not None and generation % checkpoint_every == 0:
+            # Écriture non bloquante : la simulation continue pendant l'écriture du bloc
+            grid.save_checkpoint(checkpointer, checkpoint_path,
+                                 {'generation': generation, 'rule': rule.notation, 'pattern': pattern_name})
+
+    if checkpointer is not None:
+        checkpointer.wait()
+    total_time = time.time() - start_time
+    grid.report(ITERATIONS)
+    grid.free()
+    if rank == 0:
+        print(f"--- Fin de la simulation ---")
+        print(f"Temps total pour {ITERATIONS} itérations : {total_time:.4f}s")
+        print(f"Moyenne par itération : {total_time/ITERATIONS:.5f}s")
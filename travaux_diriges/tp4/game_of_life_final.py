@@ -4,9 +4,16 @@ Versão otimizada usando convolve2d da scipy para cálculos vetorizados.
 """
 from mpi4py import MPI
 import numpy as np
+import os
 import sys
 import time
 from scipy.signal import convolve2d
+import bitlife
+import checkpoint
+import patterns
+from hashlife import HashLifeGrille
+from rules import CONWAY, Rule, rule_from_argv
+from timing import PhaseTimer
 
 # --- Configuração MPI ---
 comm = MPI.COMM_WORLD
@@ -14,8 +21,12 @@ rank = comm.Get_rank()
 size = comm.Get_size()
 
 class Grille:
-    def __init__(self, dim, init_pattern=None):
+    def __init__(self, dim, init_pattern=None, packed=False, overlap=False, rule=CONWAY, restart=None):
         self.global_dim = dim
+        # Regra do autômato (rules.Rule, B3/S23 por padrão)
+        self.rule = rule
+        self.packed = packed
+        self.overlap = overlap
         
         if dim[0] % size != 0:
             if rank == 0: print("Erro: A altura deve ser divisível pelo número de processos.")
@@ -25,39 +36,51 @@ class Grille:
         self.local_w = dim[1]
         self.local_dim = (self.local_h, self.local_w)
         
-        # Inicialização Global (Apenas Rank 0)
-        self.global_cells = None
-        if rank == 0:
+        if restart is not None:
+            # Retomada: cada rank lê apenas a sua fatia do arquivo de checkpoint (ver checkpoint.py)
+            slab = checkpoint.read_block(comm, restart, (rank * self.local_h, 0), self.local_dim)
+            if packed:
+                self.local_nw = bitlife.nb_words(self.local_w)
+                self.bits = bitlife.pack(slab)
+            else:
+                self.cells = slab
+        # Modo compactado: 64 células por palavra np.uint64 (ver bitlife.py)
+        # Inicialização local: cada rank constrói a sua fatia diretamente a partir das coordenadas
+        # do padrão (ver patterns.py), sem grelha global nem Scatter
+        elif packed:
+            self.local_nw = bitlife.nb_words(self.local_w)
+            if init_pattern is not None:
+                self.bits = bitlife.pack(patterns.fill_block(init_pattern, self.local_dim, (rank * self.local_h, 0)))
+            else:
+                self.bits = bitlife.random_bits(self.local_dim)
+        else:
             if init_pattern is not None:
-                self.global_cells = np.zeros(dim, dtype=np.uint8)
-                indices_i = [v[0] for v in init_pattern]
-                indices_j = [v[1] for v in init_pattern]
-                self.global_cells[indices_i, indices_j] = 1
+                self.cells = patterns.fill_block(init_pattern, self.local_dim, (rank * self.local_h, 0))
             else:
-                self.global_cells = np.random.randint(2, size=dim, dtype=np.uint8)
+                self.cells = np.random.randint(2, size=self.local_dim, dtype=np.uint8)
 
-        # Distribuição
-        self.cells = np.zeros(self.local_dim, dtype=np.uint8)
-        comm.Scatter(self.global_cells, self.cells, root=0)
+        # Modo com sobreposição: buffers persistentes (linhas fantasmas e fatia seguinte),
+        # reutilizados a cada iteração
+        if overlap:
+            local = self.bits if packed else self.cells
+            self.ghost_top = np.empty(local.shape[1], dtype=local.dtype)
+            self.ghost_bottom = np.empty(local.shape[1], dtype=local.dtype)
+            self.next_local = np.empty_like(local)
 
-    @staticmethod        
-    def h(x):
-        """
-        Aplica as regras do jogo de la vida usando operações vetorizadas.
-        Entrada: x é a matriz contendo o número de vizinhos vivos de cada célula.
-        Saída: Matriz de mudanças a aplicar (combinada com estado atual da célula).
-        """
-        x[x <= 1] = -1    # Morre por subpopulação
-        x[x >= 4] = -1    # Morre por superpopulação
-        x[x == 2] = 0     # Mantém estado (para células vivas)
-        x[x == 3] = 1     # Nasce ou permanece viva
-        return x
+        # Tempos acumulados das fases de compute_next_iteration (ver timing.py e bench_life.py)
+        self.timer = PhaseTimer()
 
     def compute_next_iteration(self):
         """
         Versão vetorizada com MPI usando Ghost Cells (Halo Exchange)
         Aplicação das regras do Game of Life através de convolução.
         """
+        self.timer.start()
+        if self.overlap:
+            return self._compute_next_iteration_overlap()
+        if self.packed:
+            return self._compute_next_iteration_packed()
+
         # 1. Halo Exchange - Troca de linhas nas bordas
         up_neighbor = (rank - 1) % size
         down_neighbor = (rank + 1) % size
@@ -73,20 +96,93 @@ class Grille:
         
         # 2. Expandir matriz com ghost cells (simula toro vertical)
         expanded = np.vstack([ghost_top, self.cells, ghost_bottom])
+        self.timer.lap('halo')
         
-        # 3. Convolução para contar vizinhos (otimização vetorizada)
-        C = np.ones((3, 3))
+        # 3. Convolução inteira para contar vizinhos (otimização vetorizada)
+        C = np.ones((3, 3), dtype=np.uint8)
         C[1, 1] = 0  # Não contamos a célula central
         voisins = convolve2d(expanded, C, mode='same', boundary='wrap')[1:-1, :]
+        self.timer.lap('stencil')
         
-        # 4. Aplicar regras do Game of Life de forma vetorizada
-        # Uma célula viva sobrevive com 2 ou 3 vizinhos vivos
-        # Uma célula morta nasce com exatamente 3 vizinhos vivos
-        next_cells = np.zeros_like(self.cells)
-        next_cells[(self.cells == 1) & ((voisins == 2) | (voisins == 3))] = 1
-        next_cells[(self.cells == 0) & (voisins == 3)] = 1
-        
-        self.cells = next_cells
+        # 4. Aplicar a regra de forma vetorizada: um único acesso à tabela (estado, vizinhos) -> próximo estado
+        self.cells = self.rule.apply(self.cells, voisins)
+        self.timer.lap('rule')
+
+    def _compute_next_iteration_packed(self):
+        """
+        Mesma troca de linhas fantasmas, mas sobre a fatia compactada (linhas de palavras np.uint64).
+        A regra é aplicada com lógica bit a bit (bitlife.step_extended), sem convolução.
+        """
+        up_neighbor = (rank - 1) % size
+        down_neighbor = (rank + 1) % size
+        ghost_top = np.empty(self.local_nw, dtype=np.uint64)
+        ghost_bottom = np.empty(self.local_nw, dtype=np.uint64)
+
+        req1 = comm.Isend(self.bits[0, :], dest=up_neighbor, tag=11)
+        req2 = comm.Irecv(ghost_bottom, source=down_neighbor, tag=11)
+        req3 = comm.Isend(self.bits[-1, :], dest=down_neighbor, tag=22)
+        req4 = comm.Irecv(ghost_top, source=up_neighbor, tag=22)
+        MPI.Request.Waitall([req1, req2, req3, req4])
+
+        expanded = np.vstack([ghost_top, self.bits, ghost_bottom])
+        self.timer.lap('halo')
+        # Contagem dos vizinhos e regra fundidas na lógica bit a bit: uma só fase
+        self.bits = bitlife.step_extended(expanded, self.local_w, self.rule)
+        self.timer.lap('step')
+
+    def _step_extended(self, ext):
+        """
+        Calcula a próxima geração das linhas ext[1:-1] de um bloco cujas linhas ext[0] e ext[-1]
+        servem de vizinhas (linhas fantasmas ou linhas locais). O toro horizontal é tratado pelo
+        boundary='wrap' (ou pelos deslocamentos de bits no modo compactado).
+        """
+        if self.packed:
+            return bitlife.step_extended(ext, self.local_w, self.rule)
+        C = np.ones((3, 3), dtype=np.uint8)
+        C[1, 1] = 0
+        voisins = convolve2d(ext, C, mode='same', boundary='wrap')[1:-1, :]
+        return self.rule.apply(ext[1:-1], voisins)
+
+    def _compute_next_iteration_overlap(self):
+        """
+        Versão com sobreposição comunicação/cálculo:
+        1. posta os Irecv nas linhas fantasmas persistentes e os Isend das linhas de borda;
+        2. calcula as linhas interiores (1 .. local_h-2), que só dependem de dados locais,
+           enquanto as linhas fantasmas estão em trânsito;
+        3. espera as comunicações e calcula apenas as duas linhas de borda.
+        Nenhuma cópia da fatia inteira é feita (sem np.vstack): a nova geração é escrita no
+        buffer next_local, que é trocado com a fatia corrente no fim.
+        """
+        up_neighbor = (rank - 1) % size
+        down_neighbor = (rank + 1) % size
+        local = self.bits if self.packed else self.cells
+        h = local.shape[0]
+
+        reqs = [comm.Irecv(self.ghost_bottom, source=down_neighbor, tag=11),
+                comm.Irecv(self.ghost_top, source=up_neighbor, tag=22),
+                comm.Isend(local[0, :], dest=up_neighbor, tag=11),
+                comm.Isend(local[-1, :], dest=down_neighbor, tag=22)]
+
+        # Linhas interiores: a própria fatia serve de bloco estendido
+        if h > 2:
+            self.next_local[1:-1] = self._step_extended(local)
+        self.timer.lap('interior')
+
+        # Fase 'halo': apenas a espera que resta após o cálculo das linhas interiores
+        MPI.Request.Waitall(reqs)
+        self.timer.lap('halo')
+
+        # Linhas de borda: blocos de três linhas com as linhas fantasmas
+        below_first = local[1] if h > 1 else self.ghost_bottom
+        above_last = local[-2] if h > 1 else self.ghost_top
+        self.next_local[0] = self._step_extended(np.stack([self.ghost_top, local[0], below_first]))[0]
+        self.next_local[-1] = self._step_extended(np.stack([above_last, local[-1], self.ghost_bottom]))[0]
+        self.timer.lap('border')
+
+        if self.packed:
+            self.bits, self.next_local = self.next_local, self.bits
+        else:
+            self.cells, self.next_local = self.next_local, self.cells
 
     def get_population_count(self):
         """ 
@@ -94,7 +190,10 @@ class Grille:
         Realiza uma redução MPI para somar as populações locais.
         """
         # 1. Conta localmente
-        local_count = np.sum(self.cells)
+        if self.packed:
+            local_count = bitlife.population(self.bits)
+        else:
+            local_count = np.sum(self.cells)
         
         # 2. Prepara variável para receber a soma total (apenas no rank 0)
         global_count = np.array(0, dtype='i') if rank == 0 else None
@@ -105,45 +204,227 @@ class Grille:
         
         return global_count
 
+    def local_cells(self):
+        """Fatia local como grelha de np.uint8 (descompactada no modo --packed)"""
+        if self.packed:
+            return bitlife.unpack(self.bits, self.local_w)
+        return self.cells
+
+    def save_checkpoint(self, checkpointer, path, metadata):
+        """Lança a escrita não bloqueante da fatia local no arquivo de checkpoint (ver checkpoint.py)"""
+        checkpointer.save(self.local_cells(), (rank * self.local_h, 0), self.global_dim, path, metadata)
+
+    def get_local_hash(self):
+        """
+        Impressão digital de 64 bits da fatia local: soma (módulo 2^64) das palavras de 64 células
+        misturadas com a sua posição global (bitlife.fingerprint). A impressão da grelha global é a
+        soma das impressões locais (redução MPI.SUM).
+        """
+        if self.packed:
+            words = self.bits.reshape(-1)
+        else:
+            octets = np.packbits(self.cells.reshape(-1), bitorder='little')
+            padded = np.zeros(8 * ((len(octets) + 7) // 8), dtype=np.uint8)
+            padded[:len(octets)] = octets
+            words = padded.view('<u8')
+        if getattr(self, '_hash_keys', None) is None:
+            self._hash_keys = bitlife.position_keys(len(words), rank * len(words))
+        return bitlife.fingerprint(words, self._hash_keys)
+
+    def same_local_cells(self, snapshot):
+        """Compara exatamente a fatia local com uma cópia guardada (np.array(local_cells()))"""
+        return np.array_equal(self.local_cells(), snapshot)
+
+
+class CycleDetector:
+    """
+    Detecção de configurações estáveis e de ciclos curtos (blinker, pulsar, beacon...).
+    A cada geração, cada rank guarda a impressão digital da sua fatia (Grille.get_local_hash);
+    a cada check_every gerações, as impressões locais acumuladas são combinadas com um único
+    Allreduce (MPI.SUM). Todos os ranks obtêm assim as mesmas impressões globais e tomam a mesma
+    decisão de parada.
+    Duas impressões iguais são apenas um candidato: a grelha corrente é copiada e o ciclo só é
+    confirmado se, period gerações depois, a grelha for exatamente igual à cópia (comparação
+    local e redução MPI.LAND). Um ciclo de período p <= max_period que começa na geração s é
+    detectado no máximo check_every + p gerações depois da geração s + p.
+    """
+    def __init__(self, grid, check_every=10, max_period=64):
+        self.grid = grid
+        self.check_every = check_every
+        self.max_period = max_period
+        self.local_hashes = []
+        self.history = {}     # impressão global -> última geração em que apareceu
+        self.generation = 0   # geração da próxima impressão registrada
+        self.period = None
+        self.start = None
+        # Candidato em verificação: cópia da fatia local e geração em que ela deve se repetir
+        self.snapshot = None
+        self.confirm_at = None
+        self.candidate = None
+
+    def record(self):
+        """
+        Registra a impressão da geração corrente. Retorna True se um ciclo foi detectado e
+        confirmado (atributos period e start), e então todos os ranks retornam True na mesma geração.
+        """
+        if self.snapshot is not None:
+            return self._confirm()
+        self.local_hashes.append(self.grid.get_local_hash())
+        if len(self.local_hashes) < self.check_every:
+            return False
+        local = np.array(self.local_hashes, dtype=np.uint64)
+        global_hashes = np.empty_like(local)
+        comm.Allreduce(local, global_hashes, op=MPI.SUM)
+        self.local_hashes = []
+        candidate = None
+        for h in global_hashes.tolist():
+            g = self.generation
+            self.generation += 1
+            previous = self.history.get(h)
+            if candidate is None and previous is not None and g - previous <= self.max_period:
+                candidate = (g - previous, previous)
+            self.history[h] = g
+        # Esquece as impressões antigas demais para formar um ciclo detectável
+        oldest = self.generation - self.max_period
+        self.history = {h: g for h, g in self.history.items() if g >= oldest}
+        if candidate is not None:
+            # A grelha corrente (geração self.generation - 1) deve se repetir period gerações depois
+            self.candidate = candidate
+            self.snapshot = np.array(self.grid.local_cells())
+            self.confirm_at = self.generation - 1 + candidate[0]
+        return False
+
+    def _confirm(self):
+        """Verificação exata do candidato quando a geração confirm_at é atingida"""
+        if self.generation < self.confirm_at:
+            self.generation += 1
+            return False
+        same = comm.allreduce(self.grid.same_local_cells(self.snapshot), op=MPI.LAND)
+        self.snapshot = None
+        if same:
+            self.period, self.start = self.candidate
+            self.generation += 1
+            return True
+        # Colisão de impressões: recomeça a detecção a partir da geração corrente
+        self.candidate = None
+        self.history = {}
+        self.local_hashes = [self.grid.get_local_hash()]
+        return False
+
 if __name__ == '__main__':
     # Configuração Padrão
+    # Opção --packed: armazenamento compactado (64 células por palavra)
+    packed = '--packed' in sys.argv
+    # Opção --overlap: sobreposição da troca de halos com o cálculo das linhas interiores
+    overlap = '--overlap' in sys.argv
+    # Opção --hashlife: saltos de --generations=N gerações com HashLife (sequencial, no rank 0)
+    hashlife_mode = '--hashlife' in sys.argv
+    generations = 1_000_000
+    # Opções --check-every=k (0 desativa) e --max-period=P: detecção de ciclos com parada antecipada
+    check_every = 10
+    max_period = 64
+    for a in sys.argv:
+        if a.startswith('--generations='): generations = int(a.split('=')[1])
+        if a.startswith('--check-every='): check_every = int(a.split('=')[1])
+        if a.startswith('--max-period='): max_period = int(a.split('=')[1])
+    # Opções --checkpoint-every=N (0 desativa), --checkpoint=arquivo.npy e --restart=arquivo.npy:
+    # checkpoints paralelos (MPI-IO, ver checkpoint.py) e retomada, eventualmente com outro número de ranks
+    checkpoint_every = 0
+    checkpoint_path = None
+    restart_path = None
+    for a in sys.argv:
+        if a.startswith('--checkpoint-every='): checkpoint_every = int(a.split('=')[1])
+        if a.startswith('--checkpoint='): checkpoint_path = a.split('=', 1)[1]
+        if a.startswith('--restart='): restart_path = a.split('=', 1)[1]
+    args = [a for a in sys.argv if not a.startswith('--')]
     pattern_name = 'glider_gun'
-    if len(sys.argv) > 1: pattern_name = sys.argv[1]
-    
-    # Dicionário de padrões
-    dico_patterns = {
-        'glider_gun': ((200,200),[(51,76),(52,74),(52,76),(53,64),(53,65),(53,72),(53,73),(53,86),(53,87),(54,63),(54,67),(54,72),(54,73),(54,86),(54,87),(55,52),(55,53),(55,62),(55,68),(55,72),(55,73),(56,52),(56,53),(56,62),(56,66),(56,68),(56,69),(56,74),(56,76),(57,62),(57,68),(57,76),(58,63),(58,67),(59,64),(59,65)]),
-        "acorn"   : ((100,100), [(51,52),(52,54),(53,51),(53,52),(53,55),(53,56),(53,57)]),
-        "die_hard" : ((100,100), [(51,57),(52,51),(52,52),(53,52),(53,56),(53,57),(53,58)])
-    }
-
-    if pattern_name not in dico_patterns:
+    if len(args) > 1: pattern_name = args[1]
+    # Padrão: nome de um padrão predefinido ou arquivo .rle/.cells (ver patterns.py),
+    # opções --dim=NYxNX (tamanho da grelha) e --offset=I,J (posição do padrão)
+    if not patterns.exists(pattern_name):
         if rank==0: print("Pattern desconhecido. Usando die_hard."); pattern_name="die_hard"
-    
+    board = patterns.board(pattern_name, *patterns.options_from_argv(sys.argv))
+    pattern_name = os.path.splitext(os.path.basename(pattern_name))[0]
+    # Opção --rule=B36/S23 (ou nome de regra, ver rules.py): regra do autômato, senão a do arquivo RLE
+    rule = rule_from_argv(sys.argv, default=Rule(board[2]) if board[2] else CONWAY)
+    board = board[:2]
+
+    if hashlife_mode:
+        # HashLife: o resultado de cada salto é mostrado, sem passar por todas as gerações
+        if rank == 0:
+            hgrid = HashLifeGrille(*board, rule=rule)
+            print(f"--- HashLife: {pattern_name}, {generations} gerações ---")
+            print(f"Dimensão: {board[0]}")
+            print("Geração    | População | Tempo (s)")
+            step = max(1, generations // 10)
+            while hgrid.generation < generations:
+                t0 = time.time()
+                hgrid.jump(min(step, generations - hgrid.generation))
+                print(f"{hgrid.generation:10d} | {hgrid.population():5d}     | {time.time() - t0:.5f}")
+            print(f"Nós na tabela: {len(hgrid.universe.table)}, esvaziamentos: {hgrid.universe.collections}")
+        sys.exit(0)
+
     # Inicializa sem PyGame
-    grid = Grille(*dico_patterns[pattern_name])
+    start_generation = 0
+    if restart_path is not None:
+        # Retomada: dimensão, geração e regra vêm do checkpoint (a opção --rule tem prioridade)
+        metadata = checkpoint.read_metadata(restart_path)
+        start_generation = metadata.get('generation', 0)
+        pattern_name = metadata.get('pattern', pattern_name)
+        rule = rule_from_argv(sys.argv, default=Rule(metadata.get('rule', 'B3/S23')))
+        dim = checkpoint.read_header(restart_path)[0]
+        grid = Grille(dim, packed=packed, overlap=overlap, rule=rule, restart=restart_path)
+    else:
+        grid = Grille(*board, packed=packed, overlap=overlap, rule=rule)
+    checkpointer = checkpoint.Checkpointer(comm) if checkpoint_every > 0 else None
+    if checkpoint_path is None:
+        checkpoint_path = f"checkpoint_{pattern_name}.npy"
 
     ITERATIONS = 500
     if rank == 0:
-        print(f"--- Iniciando Análise de: {pattern_name} ---")
-        print(f"Dimensão: {dico_patterns[pattern_name][0]}")
+        print(f"--- Iniciando Análise de: {pattern_name} ({rule.notation}) ---")
+        print(f"Dimensão: {grid.global_dim}")
+        if restart_path is not None:
+            print(f"Retomada de {restart_path} na geração {start_generation}")
         print("Iteração | População | Tempo (s)")
 
+    detector = CycleDetector(grid, check_every, max_period) if check_every > 0 else None
+    if detector is not None:
+        detector.generation = start_generation
+        detector.record()   # geração inicial
+
     start_time = time.time()
     
+    nb_iterations = ITERATIONS
     for i in range(ITERATIONS):
         t_iter_start = time.time()
         
         grid.compute_next_iteration()
-        pop = grid.get_population_count()
+        # A população só é reduzida quando é impressa
+        pop = grid.get_population_count() if i % 10 == 0 else None
         
         t_iter_end = time.time()
         
         if rank == 0 and i % 10 == 0: # Imprime a cada 10 iterações
-            print(f"{i:4d}     | {pop:5d}     | {t_iter_end - t_iter_start:.5f}")
+            print(f"{start_generation + i:4d}     | {pop:5d}     | {t_iter_end - t_iter_start:.5f}")
+
+        generation = start_generation + i + 1
+        if checkpointer is not None and generation % checkpoint_every == 0:
+            # Escrita não bloqueante: a simulação continua enquanto a fatia é gravada
+            grid.save_checkpoint(checkpointer, checkpoint_path,
+                                 {'generation': generation, 'rule': rule.notation, 'pattern': pattern_name})
+
+        if detector is not None and detector.record():
+            nb_iterations = i + 1
+            if rank == 0:
+                kind = "Configuração estável" if detector.period == 1 else f"Ciclo de período {detector.period}"
+                print(f"{kind} a partir da geração {detector.start} (detectado na iteração {i})")
+            break
 
+    if checkpointer is not None:
+        checkpointer.wait()
     total_time = time.time() - start_time
     if rank == 0:
         print(f"--- Fim da Simulação ---")
-        print(f"Tempo Total para {ITERATIONS} iterações: {total_time:.4f}s")
-        print(f"Média por iteração: {total_time/ITERATIONS:.5f}s")
+        print(f"Tempo Total para {nb_iterations} iterações: {total_time:.4f}s")
+        print(f"Média por iteração: {total_time/nb_iterations:.5f}s")
@@ -24,6 +24,12 @@ On itère ensuite pour étudier la façon dont évolue la population des cellule
 """
 import pygame  as pg
 import numpy   as np
+import bitlife
+from sparse_life import TiledGrille
+from renderer import GridRenderer
+from rules import CONWAY, Rule, rule_from_argv
+from timing import PhaseTimer
+import patterns
 
 
 class Grille:
@@ -34,14 +40,25 @@ class Grille:
         - init_pattern est une liste de cellules initialement vivantes sur cette grille (les autres sont considérées comme mortes)
         - color_life est la couleur dans laquelle on affiche une cellule vivante
         - color_dead est la couleur dans laquelle on affiche une cellule morte
+        - packed indique si la grille est stockée compressée (64 cellules par mot np.uint64, voir bitlife.py)
+        - rule est la règle de l'automate (rules.Rule, B3/S23 par défaut)
     Si aucun pattern n'est donné, on tire au hasard quels sont les cellules vivantes et les cellules mortes
     Exemple :
        grid = Grille( (10,10), init_pattern=[(2,2),(0,2),(4,2),(2,0),(2,4)], color_life=pg.Color("red"), color_dead=pg.Color("black"))
     """
-    def __init__(self, dim, init_pattern=None, color_life=pg.Color("black"), color_dead=pg.Color("white")):
+    def __init__(self, dim, init_pattern=None, color_life=pg.Color("black"), color_dead=pg.Color("white"), packed=False, rule=CONWAY):
         import random
         self.dimensions = dim
-        if init_pattern is not None:
+        self.packed = packed
+        self.rule = rule
+        if packed:
+            # On construit directement la grille compressée, sans passer par la grille de np.uint8
+            if init_pattern is not None:
+                self.bits = bitlife.from_pattern(dim, init_pattern)
+            else:
+                self.bits = bitlife.random_bits(dim)
+            self._unpacked = None
+        elif init_pattern is not None:
             self.cells = np.zeros(self.dimensions, dtype=np.uint8) #uint8
             indices_i = [v[0] for v in init_pattern]
             indices_j = [v[1] for v in init_pattern]
@@ -50,15 +67,29 @@ class Grille:
             self.cells = np.random.randint(2, size=dim, dtype=np.uint8)
         self.col_life = color_life
         self.col_dead = color_dead
-    
-    @staticmethod        
-    def h(x):
-        x[x<=1]=-1
-        x[x>=4]=-1
-        x[x==2]=0
-        x[x==3]=1
-
-    
+        # Temps cumulés des phases de compute_next_iteration (voir timing.py et bench_life.py)
+        self.timer = PhaseTimer()
+
+    @property
+    def cells(self):
+        """
+        Grille de np.uint8. En mode compressé, elle n'est reconstruite qu'à la demande (affichage), une seule
+        fois par génération : la modifier sur place ne change pas la grille, il faut la réaffecter.
+        """
+        if not self.packed:
+            return self._cells
+        if self._unpacked is None:
+            self._unpacked = bitlife.unpack(self.bits, self.dimensions[1])
+        return self._unpacked
+
+    @cells.setter
+    def cells(self, cells):
+        if not self.packed:
+            self._cells = cells
+        else:
+            self.bits = bitlife.pack(cells)
+            self._unpacked = None
+
     def compute_next_iteration(self):
         """
         Calcule la prochaine génération de cellules en suivant les règles du jeu de la vie
@@ -68,26 +99,22 @@ class Grille:
         #             à gauche de la grille !
         ny = self.dimensions[0]
         nx = self.dimensions[1]
-        next_cells = np.zeros(self.dimensions, dtype=np.uint8)
         diff_cells = []
-        # Convolution de base 2.
+        self.timer.start()
+        if self.packed:
+            self.bits = bitlife.step_torus(self.bits, nx, rule=self.rule)
+            self._unpacked = None
+            self.timer.lap('step')
+            return diff_cells
+        # Convolution de base 2, en entiers (np.uint8) : le nombre de voisins sert directement d'indice
         from scipy.signal import convolve2d
-        C = np.ones((3,3))
+        C = np.ones((3,3), dtype=np.uint8)
         C[1,1]=0
         voisins = convolve2d(self.cells, C, mode='same', boundary='wrap') # si on met boundary en commentaire on a pas la propriété de tor
-        Grille.h(voisins)
-        # Point de vue continue
-        temp = self.cells + voisins
-        next_cells = np.clip(temp, 0, 1)          
-
-        # Point de vue discontinue
-        #next_cells[voisins == 3] = 1 # les cellules entourés de 3 cellules vivantes sont vivantes 
-        #print(f"next cells 1 : {next_cells}")
-        #next_cells[(self.cells == 1) & (voisins == 2)] = 1 # les cellules entourés de deux restent vivantes
-        #print(f"next cells 2 : {next_cells}")
-
-       
-        self.cells = next_cells
+        self.timer.lap('stencil')
+        # Règle appliquée par un seul accès à la table (état, nombre de voisins) -> état suivant
+        self.cells = self.rule.apply(self.cells, voisins)
+        self.timer.lap('rule')
         return diff_cells
 
 
@@ -113,6 +140,9 @@ class App:
         self.screen = pg.display.set_mode((self.width,self.height))
         #
         self.canvas_cells = []
+        # Affichage vectorisé (voir renderer.py) : la ligne 0 de la grille est en bas de la fenêtre
+        self.renderer = GridRenderer(self.screen, grid.dimensions, self.size_x, self.size_y,
+                                     grid.col_life, grid.col_dead, flip=True, line_color=self.draw_color)
 
     def compute_rectangle(self, i: int, j: int):
         """
@@ -126,12 +156,13 @@ class App:
         else:
             return self.grid.col_life
 
-    def draw(self):
-        [self.screen.fill(self.compute_color(i,j),self.compute_rectangle(i,j)) for i in range(self.grid.dimensions[0]) for j in range(self.grid.dimensions[1])]
-        if (self.draw_color is not None):
-            [pg.draw.line(self.screen, self.draw_color, (0,i*self.size_y), (self.width,i*self.size_y)) for i in range(self.grid.dimensions[0])]
-            [pg.draw.line(self.screen, self.draw_color, (j*self.size_x,0), (j*self.size_x,self.height)) for j in range(self.grid.dimensions[1])]
-        pg.display.update()
+    def draw(self, diff=None):
+        """
+        Dessine la grille en une passe vectorisée. Si diff (indices linéaires i*nx+j des cellules qui ont
+        changé) est donné, il sert à déterminer les zones de l'écran à mettre à jour ; sinon elles sont
+        obtenues par comparaison avec l'image précédente.
+        """
+        self.renderer.draw(self.grid.cells, diff)
 
 
 if __name__ == '__main__':
@@ -139,38 +170,35 @@ if __name__ == '__main__':
     import sys
 
     pg.init()
-    dico_patterns = { # Dimension et pattern dans un tuple
-        'blinker' : ((5,5),[(2,1),(2,2),(2,3)]),
-        'toad'    : ((6,6),[(2,2),(2,3),(2,4),(3,3),(3,4),(3,5)]),
-        "acorn"   : ((100,100), [(51,52),(52,54),(53,51),(53,52),(53,55),(53,56),(53,57)]),
-        "beacon"  : ((6,6), [(1,3),(1,4),(2,3),(2,4),(3,1),(3,2),(4,1),(4,2)]),
-        "boat" : ((5,5),[(1,1),(1,2),(2,1),(2,3),(3,2)]),
-        "glider": ((100,90),[(1,1),(2,2),(2,3),(3,1),(3,2)]),
-        "glider_gun": ((400,400),[(51,76),(52,74),(52,76),(53,64),(53,65),(53,72),(53,73),(53,86),(53,87),(54,63),(54,67),(54,72),(54,73),(54,86),(54,87),(55,52),(55,53),(55,62),(55,68),(55,72),(55,73),(56,52),(56,53),(56,62),(56,66),(56,68),(56,69),(56,74),(56,76),(57,62),(57,68),(57,76),(58,63),(58,67),(59,64),(59,65)]),
-        "space_ship": ((25,25),[(11,13),(11,14),(12,11),(12,12),(12,14),(12,15),(13,11),(13,12),(13,13),(13,14),(14,12),(14,13)]),
-        "die_hard" : ((100,100), [(51,57),(52,51),(52,52),(53,52),(53,56),(53,57),(53,58)]),
-        "pulsar": ((17,17),[(2,4),(2,5),(2,6),(7,4),(7,5),(7,6),(9,4),(9,5),(9,6),(14,4),(14,5),(14,6),(2,10),(2,11),(2,12),(7,10),(7,11),(7,12),(9,10),(9,11),(9,12),(14,10),(14,11),(14,12),(4,2),(5,2),(6,2),(4,7),(5,7),(6,7),(4,9),(5,9),(6,9),(4,14),(5,14),(6,14),(10,2),(11,2),(12,2),(10,7),(11,7),(12,7),(10,9),(11,9),(12,9),(10,14),(11,14),(12,14)]),
-        "floraison" : ((40,40), [(19,18),(19,19),(19,20),(20,17),(20,19),(20,21),(21,18),(21,19),(21,20)]),
-        "block_switch_engine" : ((400,400), [(201,202),(201,203),(202,202),(202,203),(211,203),(212,204),(212,202),(214,204),(214,201),(215,201),(215,202),(216,201)]),
-        "u" : ((200,200), [(101,101),(102,102),(103,102),(103,101),(104,103),(105,103),(105,102),(105,101),(105,105),(103,105),(102,105),(101,105),(101,104)]),
-        "flat" : ((200,400), [(80,200),(81,200),(82,200),(83,200),(84,200),(85,200),(86,200),(87,200), (89,200),(90,200),(91,200),(92,200),(93,200),(97,200),(98,200),(99,200),(106,200),(107,200),(108,200),(109,200),(110,200),(111,200),(112,200),(114,200),(115,200),(116,200),(117,200),(118,200)])
-    }
+    # Option --packed : stockage compressé 64 cellules par mot (voir bitlife.py)
+    packed = '--packed' in sys.argv
+    # Option --sparse : calcul par tuiles actives et affichage des seules cellules modifiées (voir sparse_life.py)
+    sparse = '--sparse' in sys.argv
+    args = [a for a in sys.argv if not a.startswith('--')]
     choice = 'glider'
-    if len(sys.argv) > 1 :
-        choice = sys.argv[1]
+    if len(args) > 1 :
+        choice = args[1]
     resx = 800
     resy = 800
-    if len(sys.argv) > 3 :
-        resx = int(sys.argv[2])
-        resy = int(sys.argv[3])
+    if len(args) > 3 :
+        resx = int(args[2])
+        resy = int(args[3])
     print(f"Pattern initial choisi : {choice}")
     print(f"resolution ecran : {resx,resy}")
+    # Motif : nom d'un motif prédéfini ou fichier .rle/.cells (voir patterns.py),
+    # options --dim=NYxNX (taille de la grille) et --offset=I,J (position du motif)
     try:
-        init_pattern = dico_patterns[choice]
+        init_pattern = patterns.board(choice, *patterns.options_from_argv(sys.argv))
     except KeyError:
-        print("No such pattern. Available ones are:", dico_patterns.keys())
+        print("No such pattern. Available ones are:", patterns.available())
         exit(1)
-    grid = Grille(*init_pattern)
+    # Option --rule=B36/S23 (ou nom de règle, voir rules.py) : règle de l'automate, sinon celle du fichier RLE
+    rule = rule_from_argv(sys.argv, default=Rule(init_pattern[2]) if init_pattern[2] else CONWAY)
+    init_pattern = init_pattern[:2]
+    if sparse:
+        grid = TiledGrille(*init_pattern, color_life=pg.Color("black"), color_dead=pg.Color("white"), rule=rule)
+    else:
+        grid = Grille(*init_pattern, packed=packed, rule=rule)
     appli = App((resx, resy), grid)
 
     mustContinue = True
@@ -179,7 +207,7 @@ if __name__ == '__main__':
         diff = grid.compute_next_iteration()
         t2 = time.time()
         #time.sleep(500) # A régler ou commenter pour vitesse maxi
-        appli.draw()
+        appli.draw(diff if sparse else None)
         t3 = time.time()
         for event in pg.event.get():
             if event.type == pg.QUIT:
@@ -8,6 +8,10 @@ import numpy as np
 import sys
 import time
 from scipy.signal import convolve2d
+from renderer import GridRenderer
+from rules import CONWAY, Rule, rule_from_argv
+from timing import PhaseTimer
+import patterns
 
 # --- Configuration MPI ---
 comm = MPI.COMM_WORLD
@@ -15,67 +19,61 @@ rank = comm.Get_rank()
 size = comm.Get_size()
 
 class Grille:
-    def __init__(self, dim, init_pattern=None, color_life=pg.Color("black"), color_dead=pg.Color("white")):
+    def __init__(self, dim, init_pattern=None, color_life=pg.Color("black"), color_dead=pg.Color("white"), overlap=False, comm=None, rule=CONWAY, track_changes=False):
         self.global_dim = dim
+        # Règle de l'automate (rules.Rule, B3/S23 par défaut)
+        self.rule = rule
+        # Communicateur des processus de calcul (tous les processus par défaut)
+        self.comm = comm if comm is not None else MPI.COMM_WORLD
+        self.rank = self.comm.Get_rank()
+        self.size = self.comm.Get_size()
+        self.overlap = overlap
+        # Les cellules modifiées ne sont calculées que si un consommateur en a besoin (--diff) :
+        # sinon compute_next_iteration retourne None
+        self.track_changes = track_changes
         self.col_life = color_life
         self.col_dead = color_dead
         
         # 1. Décomposition du domaine
-        if dim[0] % size != 0:
-            if rank == 0: print("Erreur : la hauteur doit être divisible par le nombre de processus.")
+        if dim[0] % self.size != 0:
+            if self.rank == 0: print("Erreur : la hauteur doit être divisible par le nombre de processus.")
             sys.exit(1)
             
-        self.local_h = dim[0] // size
+        self.local_h = dim[0] // self.size
         self.local_w = dim[1]
         self.local_dim = (self.local_h, self.local_w)
         
-        # 2. Initialisation globale (seulement sur le rang 0)
-        self.global_cells = None # Garante que existe em todos os ranks
-        if rank == 0:
-            if init_pattern is not None:
-                self.global_cells = np.zeros(dim, dtype=np.uint8)
-                indices_i = [v[0] for v in init_pattern]
-                indices_j = [v[1] for v in init_pattern]
-                self.global_cells[indices_i, indices_j] = 1
-            else:
-                self.global_cells = np.random.randint(2, size=dim, dtype=np.uint8)
-
-        # 3. Distribution (Scatter)
-        # Prépare le buffer local
-        self.cells = np.zeros(self.local_dim, dtype=np.uint8)
-        
-        # CORRECTION ICI : Nous passons la matrice entière. Le Scatter la divise lui-même.
-        # Sendbuf: (buffer, count, type) ou simplement le buffer si la division est égale
-        # mpi4py divise automatiquement le premier axe (lignes).
-        comm.Scatter(self.global_cells, self.cells, root=0)
+        # 2. Initialisation locale : chaque processus construit sa tranche directement à partir des
+        # coordonnées du motif (voir patterns.py), sans grille globale ni Scatter
+        self.global_cells = None # Grille globale du rang 0, remplie par get_global_grid pour l'affichage
+        if init_pattern is not None:
+            self.cells = patterns.fill_block(init_pattern, self.local_dim, (self.rank * self.local_h, 0))
+        else:
+            self.cells = np.random.randint(2, size=self.local_dim, dtype=np.uint8)
 
-    @staticmethod        
-    def h(x):
-        """
-        Applique les règles du Jeu de la vie en utilisant des opérations vectorisées.
-        Entrée: x est la matrice contenant le nombre de voisins vivants de chaque cellule.
-        Sortie: Matrice des changements à appliquer.
-        Règles:
-        - Cellules avec <=1 voisin : meurent par sous-population
-        - Cellules avec >=4 voisins : meurent par sur-population
-        - Cellules avec 2 voisins : conservent leur état
-        - Cellules avec 3 voisins : naissent ou restent vivantes
-        """
-        x[x <= 1] = -1   # Meurt par sous-population
-        x[x >= 4] = -1   # Meurt par sur-population
-        x[x == 2] = 0    # Conserve l'état
-        x[x == 3] = 1    # Naît
-        return x
+        # 4. Mode avec recouvrement : buffers persistants (lignes fantômes et tranche suivante)
+        # réutilisés d'une itération à l'autre
+        if overlap:
+            self.ghost_top = np.empty(self.local_w, dtype=np.uint8)
+            self.ghost_bottom = np.empty(self.local_w, dtype=np.uint8)
+            self.next_cells = np.empty(self.local_dim, dtype=np.uint8)
+
+        # Temps cumulés des phases de compute_next_iteration (voir timing.py et bench_life.py)
+        self.timer = PhaseTimer()
 
     def compute_next_iteration(self):
         """
         Version MPI avec cellules fantômes (échange halo) et convolution vectorisée.
         Implémente la décomposition du domaine avec échanges asynchrones de bords.
         """
+        self.timer.start()
+        if self.overlap:
+            return self.compute_next_iteration_overlap()
+
         # --- ÉTAPE 1 : Échange des cellules fantômes (Halo Exchange) ---
         # Voisins dans l'anneau toroïdal (tore vertical)
-        up_neighbor = (rank - 1) % size
-        down_neighbor = (rank + 1) % size
+        up_neighbor = (self.rank - 1) % self.size
+        down_neighbor = (self.rank + 1) % self.size
 
         # Buffers pour recevoir les lignes fantômes des voisins
         ghost_top = np.empty(self.local_w, dtype=np.uint8)
@@ -84,20 +82,21 @@ class Grille:
         # Échanges non bloquants (Isend/Irecv) pour de meilleures performances
         # Chaque processus envoie sa bordure supérieure au voisin supérieur et reçoit la bordure inférieure
         # Simultanément, envoie la bordure inférieure au voisin inférieur et reçoit la bordure supérieure
-        req1 = comm.Isend(self.cells[0, :], dest=up_neighbor, tag=11)
-        req2 = comm.Irecv(ghost_bottom, source=down_neighbor, tag=11)
-        req3 = comm.Isend(self.cells[-1, :], dest=down_neighbor, tag=22)
-        req4 = comm.Irecv(ghost_top, source=up_neighbor, tag=22)
+        req1 = self.comm.Isend(self.cells[0, :], dest=up_neighbor, tag=11)
+        req2 = self.comm.Irecv(ghost_bottom, source=down_neighbor, tag=11)
+        req3 = self.comm.Isend(self.cells[-1, :], dest=down_neighbor, tag=22)
+        req4 = self.comm.Irecv(ghost_top, source=up_neighbor, tag=22)
 
         MPI.Request.Waitall([req1, req2, req3, req4])
         
         # --- ÉTAPE 2 : Construire la matrice étendue (avec cellules fantômes) ---
         # On combine : ligne fantôme supérieure + données locales + ligne fantôme inférieure
         expanded_cells = np.vstack([ghost_top, self.cells, ghost_bottom])
+        self.timer.lap('halo')
         
         # --- ÉTAPE 3 : Calcul vectorisé (convolution 2D) ---
-        # Noyau 3x3 de uns (convolution pour compter les voisins)
-        C = np.ones((3, 3))
+        # Noyau 3x3 de uns (convolution entière pour compter les voisins)
+        C = np.ones((3, 3), dtype=np.uint8)
         C[1, 1] = 0  # On ne compte pas la cellule centrale
 
         # La convolution avec 'boundary=wrap' crée un tore sur les côtés (droite-gauche)
@@ -106,16 +105,78 @@ class Grille:
         
         # Retirer les lignes de cellules fantômes du résultat pour revenir à la taille locale
         voisins = voisins[1:-1, :]
+        self.timer.lap('stencil')
         
-        # --- ÉTAPE 4 : Appliquer les règles du Jeu de la vie (vectorisé) ---
-        # Une cellule vivante (1) survit si elle a 2 ou 3 voisins
-        # Une cellule morte (0) naît si elle a exactement 3 voisins
-        next_cells = np.zeros(self.cells.shape, dtype=np.uint8)
-        next_cells[(self.cells == 1) & ((voisins == 2) | (voisins == 3))] = 1
-        next_cells[(self.cells == 0) & (voisins == 3)] = 1
+        # --- ÉTAPE 4 : Appliquer la règle (vectorisé) ---
+        # Un seul accès à la table (état, nombre de voisins) -> état suivant (B3/S23 pour Conway)
+        next_cells = self.rule.apply(self.cells, voisins)
+        self.timer.lap('rule')
         
+        diff_cells = None
+        if self.track_changes:
+            diff_cells = self.changed_cells(self.cells, next_cells)
+            self.timer.lap('diff')
         self.cells = next_cells
-        return []
+        return diff_cells
+
+    def changed_cells(self, old_cells, new_cells):
+        """
+        Ensemble des cellules de la tranche locale qui ont changé d'état, en indices linéaires
+        globaux i*nx+j (même convention que diff_cells dans game_of_life.py)
+        """
+        return np.flatnonzero(old_cells != new_cells) + self.rank * self.local_h * self.local_w
+
+    def step_extended(self, ext):
+        """
+        Calcule la génération suivante des lignes ext[1:-1] d'un bloc dont les lignes ext[0] et ext[-1]
+        servent de voisines (lignes fantômes ou lignes locales). Le tore horizontal est géré par boundary='wrap'.
+        """
+        C = np.ones((3, 3), dtype=np.uint8)
+        C[1, 1] = 0
+        voisins = convolve2d(ext, C, mode='same', boundary='wrap')[1:-1, :]
+        return self.rule.apply(ext[1:-1], voisins)
+
+    def compute_next_iteration_overlap(self):
+        """
+        Version avec recouvrement communication/calcul :
+        1. on poste les Irecv dans les lignes fantômes persistantes et les Isend des lignes de bord ;
+        2. on calcule les lignes intérieures (1 .. local_h-2), qui ne dépendent que des données locales,
+           pendant que les lignes fantômes transitent ;
+        3. on attend les communications puis on ne calcule que les deux lignes de bord.
+        Aucune copie de la tranche complète n'est faite (pas de np.vstack) : la nouvelle génération est
+        écrite dans le buffer next_cells, échangé avec la tranche courante à la fin.
+        """
+        up_neighbor = (self.rank - 1) % self.size
+        down_neighbor = (self.rank + 1) % self.size
+        h = self.local_h
+
+        reqs = [self.comm.Irecv(self.ghost_bottom, source=down_neighbor, tag=11),
+                self.comm.Irecv(self.ghost_top, source=up_neighbor, tag=22),
+                self.comm.Isend(self.cells[0, :], dest=up_neighbor, tag=11),
+                self.comm.Isend(self.cells[-1, :], dest=down_neighbor, tag=22)]
+
+        # Lignes intérieures : la tranche elle-même sert de bloc étendu
+        if h > 2:
+            self.next_cells[1:-1] = self.step_extended(self.cells)
+        self.timer.lap('interior')
+
+        # Phase 'halo' : seulement l'attente restante après le calcul des lignes intérieures
+        MPI.Request.Waitall(reqs)
+        self.timer.lap('halo')
+
+        # Lignes de bord : blocs de trois lignes avec les lignes fantômes
+        below_first = self.cells[1] if h > 1 else self.ghost_bottom
+        above_last = self.cells[-2] if h > 1 else self.ghost_top
+        self.next_cells[0] = self.step_extended(np.stack([self.ghost_top, self.cells[0], below_first]))[0]
+        self.next_cells[-1] = self.step_extended(np.stack([above_last, self.cells[-1], self.ghost_bottom]))[0]
+        self.timer.lap('border')
+
+        diff_cells = None
+        if self.track_changes:
+            diff_cells = self.changed_cells(self.cells, self.next_cells)
+            self.timer.lap('diff')
+        self.cells, self.next_cells = self.next_cells, self.cells
+        return diff_cells
 
     def get_global_grid(self):
         """
@@ -125,16 +186,39 @@ class Grille:
         """
         # Utiliser gather pour rassembler les données de tous les processus sur le rang 0
         # mpi4py avec numpy renvoie une liste de tableaux sur le rang 0
-        recv_list = comm.gather(self.cells, root=0)
+        self.timer.start()
+        recv_list = self.comm.gather(self.cells, root=0)
         
-        if rank == 0:
+        if self.rank == 0:
             # Concaténer verticalement les parties de chaque processus
             full_grid = np.vstack(recv_list)
             self.global_cells = full_grid
+            self.timer.lap('gather')
             return full_grid
         else:
+            self.timer.lap('gather')
             return None
 
+    def gather_changes(self, diff_cells):
+        """
+        Variante de get_global_grid qui ne rassemble sur le rang 0 que les cellules modifiées
+        (retour de compute_next_iteration) au lieu des tranches complètes. Le rang 0 met à jour sa
+        grille globale en inversant l'état de ces cellules et retourne l'ensemble global des changements.
+        """
+        self.timer.start()
+        diff_cells = np.ascontiguousarray(diff_cells, dtype=np.int64)
+        counts = self.comm.gather(len(diff_cells), root=0)
+        all_diff = None
+        recvbuf = None
+        if self.rank == 0:
+            all_diff = np.empty(sum(counts), dtype=np.int64)
+            recvbuf = [all_diff, counts]
+        self.comm.Gatherv(diff_cells, recvbuf, root=0)
+        if self.rank == 0:
+            self.global_cells.flat[all_diff] ^= 1
+        self.timer.lap('gather')
+        return all_diff
+
 class App:
     """J'ai gardé la classe App presque identique, mais j'ai optimisé le dessin."""
     def __init__(self, geometry, grid):
@@ -146,76 +230,192 @@ class App:
         self.screen = pg.display.set_mode((self.width,self.height))
         self.col_dead = grid.col_dead
         self.col_life = grid.col_life
+        # Affichage vectorisé (voir renderer.py) : une passe numpy -> surface, puis mise à jour des seules zones modifiées
+        self.renderer = GridRenderer(self.screen, grid.global_dim, self.size_x, self.size_y, self.col_life, self.col_dead)
 
-    def draw(self):
-        # OPTIMISATION CRITIQUE : Si on n'utilise pas cela, l'affichage sera le goulot d'étranglement, pas le calcul.
-        # Nous convertissons la matrice numpy directement en surface de pixels
-        # Mappage simple : 0 -> couleur morte, 1 -> couleur vivante
-
+    def draw(self, diff=None):
         # Récupérer la grille globale mise à jour
-        matrix = self.grid.global_cells
+        # diff (optionnel) : indices linéaires des cellules modifiées, rassemblés par gather_changes
+        self.renderer.draw(self.grid.global_cells, diff)
 
-        # Créer un tableau de couleurs (transposée car Pygame utilise (x, y) et numpy utilise (ligne, colonne))
-        # Si matrix est (lignes, colonnes), pygame veut (largeur, hauteur) = (colonnes, lignes)
-        matrix_T = matrix.T
+# Tags des messages entre processus de calcul et processus d'affichage (mode --async)
+TAG_FRAME = 31
+TAG_GEN = 32
+TAG_QUIT = 33
+TAG_DONE = 34
 
-        # Construire la surface RGB (optionnel si on dessine par blocs)
-        surf_array = np.zeros((self.width, self.height, 3), dtype=np.uint8)
 
-        # Méthode hybride rapide : dessiner uniquement les cellules vivantes
-        self.screen.fill(self.col_dead)
-        # Obtenir les coordonnées des cellules vivantes
-        rows, cols = np.where(matrix == 1)
+class AsyncDisplay:
+    """
+    Processus d'affichage dédié (mode --async). Il reçoit de façon non bloquante les tranches envoyées
+    par les processus de calcul, dessine chaque image complète reçue et, quand la fenêtre est fermée,
+    envoie l'ordre d'arrêt aux processus de calcul puis attend leur confirmation.
+    Il expose global_dim, col_life, col_dead et global_cells comme une Grille pour pouvoir utiliser App.
+    """
+    def __init__(self, dim, nb_compute, geometry, color_life=pg.Color("black"), color_dead=pg.Color("white")):
+        self.global_dim = dim
+        self.col_life = color_life
+        self.col_dead = color_dead
+        self.nb_compute = nb_compute
+        self.local_h = dim[0] // nb_compute
+        # Double buffer : on reçoit l'image suivante pendant qu'on affiche la courante
+        self.global_cells = np.zeros(dim, dtype=np.uint8)
+        self.recv_cells = np.zeros(dim, dtype=np.uint8)
+        self.generation = np.zeros(1, dtype=np.int64)
+        self.recv_generation = np.zeros(1, dtype=np.int64)
+        self.quit_flag = np.ones(1, dtype='i')
+        self.done_flags = np.zeros(nb_compute, dtype='i')
+        self.app = App(geometry, self)
+
+    def post_receives(self):
+        h = self.local_h
+        reqs = [comm.Irecv(self.recv_cells[r*h:(r+1)*h], source=r, tag=TAG_FRAME) for r in range(self.nb_compute)]
+        reqs.append(comm.Irecv(self.recv_generation, source=0, tag=TAG_GEN))
+        return reqs
+
+    def run(self):
+        frame_reqs = self.post_receives()
+        quit_reqs = None
+        done_reqs = None
+        nb_frames = 0
+        while True:
+            if MPI.Request.Testall(frame_reqs):
+                self.global_cells, self.recv_cells = self.recv_cells, self.global_cells
+                self.generation[:] = self.recv_generation
+                frame_reqs = self.post_receives()
+                t1 = time.time()
+                self.app.draw()
+                t2 = time.time()
+                nb_frames += 1
+                print(f"Génération : {self.generation[0]:8d} | Images : {nb_frames:6d} | Affichage: {t2-t1:2.2e}s\r", end='')
+
+            for event in pg.event.get():
+                if event.type == pg.QUIT and quit_reqs is None:
+                    quit_reqs = [comm.Isend(self.quit_flag, dest=r, tag=TAG_QUIT) for r in range(self.nb_compute)]
+                    done_reqs = [comm.Irecv(self.done_flags[r:r+1], source=r, tag=TAG_DONE) for r in range(self.nb_compute)]
 
-        # Dessiner uniquement les vivantes (beaucoup plus rapide que dessiner toutes)
-        for r, c in zip(rows, cols):
-            rect = (c * self.size_x, r * self.size_y, self.size_x, self.size_y)
-            pg.draw.rect(self.screen, self.col_life, rect)
+            # On continue à recevoir les images en transit tant que tous les processus n'ont pas terminé
+            if done_reqs is not None and MPI.Request.Testall(done_reqs):
+                break
+            time.sleep(1.e-3)
+
+        MPI.Request.Waitall(quit_reqs)
+        for req in frame_reqs:
+            req.Cancel()
+        MPI.Request.Waitall(frame_reqs)
+
+
+def run_compute_async(grid, display_rank, fps, sync_every):
+    """
+    Boucle des processus de calcul en mode --async. Aucune opération bloquante avec l'affichage :
+        - toutes les sync_every itérations, un Iallreduce non bloquant (lancé sync_every itérations plus tôt)
+          donne une décision commune : envoyer ou non une image, s'arrêter ou non ;
+        - un processus vote pour une image si son envoi précédent est terminé et si 1/fps secondes se sont
+          écoulées depuis le dernier envoi : si l'affichage prend du retard, les images intermédiaires
+          sont simplement sautées ;
+        - l'ordre d'arrêt est reçu par un Irecv posté dès le départ et testé au moment du vote.
+    Chaque processus envoie sa tranche (copiée dans un buffer dédié) au processus d'affichage par Isend.
+    """
+    vote = np.zeros(2, dtype='i')
+    decision = np.zeros(2, dtype='i')
+    vote_req = grid.comm.Iallreduce(vote, decision, op=MPI.MAX)
+    quit_flag = np.zeros(1, dtype='i')
+    quit_req = comm.Irecv(quit_flag, source=display_rank, tag=TAG_QUIT)
+    snapshot = np.empty_like(grid.cells)
+    generation = np.zeros(1, dtype=np.int64)
+    snap_reqs = []
+    last_snapshot = 0.
+    iteration = 0
+    deb = time.time()
+    while True:
+        grid.compute_next_iteration()
+        iteration += 1
+        if iteration % sync_every != 0:
+            continue
+        vote_req.Wait()
+        if decision[1]:
+            break
+        if decision[0] == 0:
+            snapshot[:] = grid.cells
+            generation[0] = iteration
+            snap_reqs = [comm.Isend(snapshot, dest=display_rank, tag=TAG_FRAME)]
+            if grid.rank == 0:
+                snap_reqs.append(comm.Isend(generation, dest=display_rank, tag=TAG_GEN))
+            last_snapshot = time.time()
+        busy = not MPI.Request.Testall(snap_reqs) or time.time() - last_snapshot < 1./fps
+        vote[0] = 1 if busy else 0
+        vote[1] = 1 if quit_req.Test() else 0
+        vote_req = grid.comm.Iallreduce(vote, decision, op=MPI.MAX)
+    fin = time.time()
+    MPI.Request.Waitall(snap_reqs)
+    quit_req.Wait()
+    comm.Send(np.ones(1, dtype='i'), dest=display_rank, tag=TAG_DONE)
+    if grid.rank == 0:
+        print(f"\n{iteration} générations calculées en {fin-deb:.3f}s ({(fin-deb)/iteration:2.2e}s par génération)")
 
-        pg.display.update()
 
 if __name__ == '__main__':
-    # Configuração igual ao seu original
-    dico_patterns = {
-        'blinker' : ((5,5),[(2,1),(2,2),(2,3)]),
-        'toad'    : ((6,6),[(2,2),(2,3),(2,4),(3,3),(3,4),(3,5)]),
-        "acorn"   : ((100,100), [(51,52),(52,54),(53,51),(53,52),(53,55),(53,56),(53,57)]),
-        "beacon"  : ((6,6), [(1,3),(1,4),(2,3),(2,4),(3,1),(3,2),(4,1),(4,2)]),
-        "boat" : ((5,5),[(1,1),(1,2),(2,1),(2,3),(3,2)]),
-        "glider": ((100,90),[(1,1),(2,2),(2,3),(3,1),(3,2)]),
-        "glider_gun": ((200,200),[(51,76),(52,74),(52,76),(53,64),(53,65),(53,72),(53,73),(53,86),(53,87),(54,63),(54,67),(54,72),(54,73),(54,86),(54,87),(55,52),(55,53),(55,62),(55,68),(55,72),(55,73),(56,52),(56,53),(56,62),(56,66),(56,68),(56,69),(56,74),(56,76),(57,62),(57,68),(57,76),(58,63),(58,67),(59,64),(59,65)]),
-        "space_ship": ((25,25),[(11,13),(11,14),(12,11),(12,12),(12,14),(12,15),(13,11),(13,12),(13,13),(13,14),(14,12),(14,13)]),
-        "die_hard" : ((100,100), [(51,57),(52,51),(52,52),(53,52),(53,56),(53,57),(53,58)]),
-        "pulsar": ((17,17),[(2,4),(2,5),(2,6),(7,4),(7,5),(7,6),(9,4),(9,5),(9,6),(14,4),(14,5),(14,6),(2,10),(2,11),(2,12),(7,10),(7,11),(7,12),(9,10),(9,11),(9,12),(14,10),(14,11),(14,12),(4,2),(5,2),(6,2),(4,7),(5,7),(6,7),(4,9),(5,9),(6,9),(4,14),(5,14),(6,14),(10,2),(11,2),(12,2),(10,7),(11,7),(12,7),(10,9),(11,9),(12,9),(10,14),(11,14),(12,14)]),
-        "floraison" : ((40,40), [(19,18),(19,19),(19,20),(20,17),(20,19),(20,21),(21,18),(21,19),(21,20)]),
-        "block_switch_engine" : ((400,400), [(201,202),(201,203),(202,202),(202,203),(211,203),(212,204),(212,202),(214,204),(214,201),(215,201),(215,202),(216,201)]),
-        "u" : ((200,200), [(101,101),(102,102),(103,102),(103,101),(104,103),(105,103),(105,102),(105,101),(105,105),(103,105),(102,105),(101,105),(101,104)]),
-        "flat" : ((200,400), [(80,200),(81,200),(82,200),(83,200),(84,200),(85,200),(86,200),(87,200), (89,200),(90,200),(91,200),(92,200),(93,200),(97,200),(98,200),(99,200),(106,200),(107,200),(108,200),(109,200),(110,200),(111,200),(112,200),(114,200),(115,200),(116,200),(117,200),(118,200)])
-    }
     
     # Argumentos
+    # Motif : nom d'un motif prédéfini ou fichier .rle/.cells (voir patterns.py),
+    # options --dim=NYxNX (taille de la grille) et --offset=I,J (position du motif)
+    # Option --overlap : recouvrement de l'échange des halos par le calcul des lignes intérieures
+    overlap = '--overlap' in sys.argv
+    # Option --diff : on ne rassemble et ne redessine que les cellules modifiées
+    use_diff = '--diff' in sys.argv
+    # Option --async : processus d'affichage dédié (le dernier), envois non bloquants limités à --fps images/s,
+    # décision commune d'envoi/arrêt toutes les --sync-every itérations
+    async_display = '--async' in sys.argv
+    fps = 30.
+    sync_every = 10
+    for a in sys.argv:
+        if a.startswith('--fps='): fps = float(a.split('=')[1])
+        if a.startswith('--sync-every='): sync_every = int(a.split('=')[1])
+    args = [a for a in sys.argv if not a.startswith('--')]
     choice = 'glider'
-    if len(sys.argv) > 1 : choice = sys.argv[1]
+    if len(args) > 1 : choice = args[1]
     resx = 800
     resy = 800
-    if len(sys.argv) > 3 :
-        resx = int(sys.argv[2])
-        resy = int(sys.argv[3])
+    if len(args) > 3 :
+        resx = int(args[2])
+        resy = int(args[3])
 
     # Apenas Rank 0 imprime infos
     if rank == 0:
         print(f"Motif initial choisi : {choice}")
         print(f"résolution écran : {resx,resy}")
-        pg.init() # Initialiser pygame seulement sur le maître
+        if not async_display:
+            pg.init() # Initialiser pygame seulement sur le maître
     
     try:
-        init_pattern = dico_patterns[choice]
+        init_pattern = patterns.board(choice, *patterns.options_from_argv(sys.argv))
     except KeyError:
-        if rank == 0: print("Motif inconnu. Les motifs disponibles sont :", dico_patterns.keys())
+        if rank == 0: print("Motif inconnu. Les motifs disponibles sont :", patterns.available())
         sys.exit(1)
+    # Option --rule=B36/S23 (ou nom de règle, voir rules.py) : règle de l'automate, sinon celle du fichier RLE
+    rule = rule_from_argv(sys.argv, default=Rule(init_pattern[2]) if init_pattern[2] else CONWAY)
+    init_pattern = init_pattern[:2]
+
+    if async_display:
+        if size < 2 or init_pattern[0][0] % (size - 1) != 0:
+            if rank == 0: print("Le mode --async demande au moins 2 processus (calcul + affichage) et une hauteur divisible par le nombre de processus de calcul.")
+            sys.exit(1)
+        display_rank = size - 1
+        compute_comm = comm.Split(MPI.UNDEFINED if rank == display_rank else 0, rank)
+        if rank == display_rank:
+            pg.init()
+            AsyncDisplay(init_pattern[0], size - 1, (resx, resy)).run()
+            pg.quit()
+        else:
+            grid = Grille(*init_pattern, overlap=overlap, comm=compute_comm, rule=rule)
+            run_compute_async(grid, display_rank, fps, sync_every)
+        sys.exit(0)
 
     # 1. Créer la grille (tous les processus créent leur partie locale)
-    grid = Grille(*init_pattern)
+    grid = Grille(*init_pattern, overlap=overlap, rule=rule, track_changes=use_diff)
+
+    # État initial rassemblé une fois sur le rang 0 (point de départ de l'affichage et de --diff)
+    grid.get_global_grid()
 
     # 2. Créer l'application (seulement sur le rang 0)
     appli = None
@@ -229,14 +429,18 @@ if __name__ == '__main__':
         t1 = time.time()
         
         # A. CALCULO (Todos trabalham)
-        grid.compute_next_iteration()
+        diff = grid.compute_next_iteration()
         t2 = time.time()
         
         # B. VISUALIZAÇÃO (Gather -> Desenho no Rank 0)
-        grid.get_global_grid() # Reúne dados no rank 0
+        if use_diff:
+            diff = grid.gather_changes(diff) # Reúne apenas as mudanças no rank 0
+        else:
+            grid.get_global_grid() # Reúne dados no rank 0
+            diff = None
         
         if rank == 0:
-            appli.draw()
+            appli.draw(diff)
             t3 = time.time()
 
             # Événements Pygame
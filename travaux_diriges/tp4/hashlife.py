@@ -0,0 +1,254 @@
+"""
+hashlife.py
+Algorithme HashLife (Gosper) pour le jeu de la vie sur tore
+###########################################################
+La grille est représentée par un arbre quaternaire canonique : deux nœuds de même contenu sont le même
+objet (table de hachage des nœuds). Chaque nœud de niveau k (2^k x 2^k cellules) mémorise son résultat
+RESULT : le carré central de niveau k-1 avancé de 2^j générations (0 <= j <= k-2). Comme les régions
+identiques dans l'espace et dans le temps ne sont calculées qu'une fois, on peut sauter 10^6 générations
+et plus pour les motifs réguliers (canons, moteurs, oscillateurs).
+
+Tore : le jeu de la vie sur un tore (ny,nx) est le jeu de la vie sur le plan infini pavé périodiquement
+par la grille. Pour avancer de 2^j générations, on construit le nœud de niveau L (2^(L-1) >= max(ny,nx),
+L-2 >= j) couvrant une fenêtre de ce pavage, on calcule son RESULT et on en extrait la grille (ny,nx).
+La construction de la fenêtre est mémoïsée par position modulo (ny,nx) : son coût ne dépend pas de L.
+Un saut de N générations se fait en autant d'étapes que de bits à 1 dans N.
+
+Mémoire : quand le nombre de nœuds dépasse max_nodes, la table est nettoyée entre deux sauts (jamais
+pendant un calcul de RESULT, dont les appels en cours dépendent des nœuds et résultats mémorisés) : on ne
+garde que les nœuds accessibles depuis la dernière racine, par les fils et par les résultats mémorisés,
+avec leurs résultats. Si cela reste trop gros, les résultats sont oubliés et seul l'arbre de la racine
+est gardé.
+"""
+import numpy as np
+from rules import CONWAY
+
+
+class Node:
+    """Nœud de l'arbre quaternaire (feuille si level == 0)"""
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population', 'result')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+        self.result = {}
+
+
+class HashLife:
+    """
+    Univers HashLife : table des nœuds canoniques et résultats mémorisés.
+        - max_nodes est le nombre maximal de nœuds conservés avant un vidage de la table
+        - rule est la règle de l'automate (rules.Rule, B3/S23 par défaut)
+    """
+    def __init__(self, max_nodes=4_000_000, rule=CONWAY):
+        if 0 in rule.birth:
+            # Avec B0 le vide n'est pas stable : un nœud vide n'a plus un résultat vide
+            raise ValueError(f"Règle {rule.notation} non supportée par HashLife (B0)")
+        self.max_nodes = max_nodes
+        self.rule = rule
+        self.off = Node(None, None, None, None, 0, 0)
+        self.on = Node(None, None, None, None, 0, 1)
+        self.table = {}
+        self.collections = 0
+
+    def join(self, nw, ne, sw, se):
+        """Nœud canonique de fils nw, ne, sw, se"""
+        key = (nw, ne, sw, se)
+        node = self.table.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level + 1,
+                        nw.population + ne.population + sw.population + se.population)
+            self.table[key] = node
+        return node
+
+    def reachable(self, roots, results=True):
+        """Ensemble des nœuds accessibles depuis roots par les fils (et les résultats mémorisés si results)"""
+        seen = set()
+        stack = [n for n in roots if n is not None]
+        while stack:
+            node = stack.pop()
+            if node in seen or node.level == 0:
+                continue
+            seen.add(node)
+            stack.extend((node.nw, node.ne, node.sw, node.se))
+            if results:
+                stack.extend(node.result.values())
+        return seen
+
+    def collect(self, roots=()):
+        """
+        Ramasse-miettes (entre deux sauts) : ne garde que les nœuds accessibles depuis roots, avec leurs
+        résultats ; si ceux-ci font plus de max_nodes/2 nœuds, les résultats sont oubliés et seuls les
+        arbres de roots sont gardés
+        """
+        keep = self.reachable(roots)
+        if len(keep) > self.max_nodes // 2:
+            for node in self.table.values():
+                node.result = {}
+            keep = self.reachable(roots, results=False)
+        self.table = {(n.nw, n.ne, n.sw, n.se): n for n in keep}
+        self.collections += 1
+
+    def center(self, node):
+        """Carré central (niveau k-1) d'un nœud de niveau k, sans avancer dans le temps"""
+        return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def _base(self, node):
+        """Nœud de niveau 2 (4x4) : carré central 2x2 après une génération"""
+        bits = [[node.nw.nw, node.nw.ne, node.ne.nw, node.ne.ne],
+                [node.nw.sw, node.nw.se, node.ne.sw, node.ne.se],
+                [node.sw.nw, node.sw.ne, node.se.nw, node.se.ne],
+                [node.sw.sw, node.sw.se, node.se.sw, node.se.se]]
+        cells = [[b.population for b in row] for row in bits]
+        out = []
+        for i in (1, 2):
+            for j in (1, 2):
+                n = sum(cells[i + di][j + dj] for di in (-1, 0, 1) for dj in (-1, 0, 1)) - cells[i][j]
+                out.append(self.on if self.rule.table[cells[i][j], n] else self.off)
+        return self.join(*out)
+
+    def successor(self, node, j):
+        """
+        RESULT du nœud : carré central (niveau k-1) avancé de 2^j générations, 0 <= j <= k-2
+        """
+        if node.population == 0:
+            return node.nw
+        res = node.result.get(j)
+        if res is not None:
+            return res
+        k = node.level
+        if k == 2:
+            res = self._base(node)
+        else:
+            a, b, c, d = node.nw, node.ne, node.sw, node.se
+            n00 = a
+            n01 = self.join(a.ne, b.nw, a.se, b.sw)
+            n02 = b
+            n10 = self.join(a.sw, a.se, c.nw, c.ne)
+            n11 = self.join(a.se, b.sw, c.ne, d.nw)
+            n12 = self.join(b.sw, b.se, d.nw, d.ne)
+            n20 = c
+            n21 = self.join(c.ne, d.nw, c.se, d.sw)
+            n22 = d
+            if j == k - 2:
+                # Pas complet : deux demi-pas de 2^(k-3) générations
+                r = [self.successor(n, k - 3) for n in (n00, n01, n02, n10, n11, n12, n20, n21, n22)]
+                jj = k - 3
+            else:
+                # Pas réduit : on ne prend que les centres, puis un pas de 2^j générations
+                r = [self.center(n) for n in (n00, n01, n02, n10, n11, n12, n20, n21, n22)]
+                jj = j
+            res = self.join(self.successor(self.join(r[0], r[1], r[3], r[4]), jj),
+                            self.successor(self.join(r[1], r[2], r[4], r[5]), jj),
+                            self.successor(self.join(r[3], r[4], r[6], r[7]), jj),
+                            self.successor(self.join(r[4], r[5], r[7], r[8]), jj))
+        node.result[j] = res
+        return res
+
+    def from_periodic(self, cells, y0, x0, level):
+        """
+        Nœud de niveau level couvrant la fenêtre [y0, y0+2^level) x [x0, x0+2^level) du plan pavé
+        périodiquement par cells. Les sous-nœuds sont mémoïsés par position modulo cells.shape.
+        """
+        ny, nx = cells.shape
+        memo = {}
+
+        def build(y, x, k):
+            key = (y % ny, x % nx, k)
+            node = memo.get(key)
+            if node is not None:
+                return node
+            if k == 0:
+                node = self.on if cells[y % ny, x % nx] else self.off
+            else:
+                h = 1 << (k - 1)
+                node = self.join(build(y, x, k - 1), build(y, x + h, k - 1),
+                                 build(y + h, x, k - 1), build(y + h, x + h, k - 1))
+            memo[key] = node
+            return node
+
+        return build(y0, x0, level)
+
+    def to_array(self, node, shape):
+        """Extrait le coin supérieur gauche (shape) d'un nœud sous forme de grille de np.uint8"""
+        out = np.zeros(shape, dtype=np.uint8)
+
+        def fill(n, y, x):
+            if n.population == 0 or y >= shape[0] or x >= shape[1]:
+                return
+            if n.level == 0:
+                out[y, x] = 1
+                return
+            h = 1 << (n.level - 1)
+            fill(n.nw, y, x)
+            fill(n.ne, y, x + h)
+            fill(n.sw, y + h, x)
+            fill(n.se, y + h, x + h)
+
+        fill(node, 0, 0)
+        return out
+
+
+class HashLifeGrille:
+    """
+    Grille torique avancée par HashLife, avec la même interface que Grille :
+        - dim est un tuple (nombre lignes, nombre colonnes)
+        - init_pattern est une liste de cellules initialement vivantes (grille aléatoire si None)
+        - max_nodes est le nombre maximal de nœuds mémorisés (voir HashLife)
+        - rule est la règle de l'automate (rules.Rule, B3/S23 par défaut)
+    L'état entre deux sauts est la grille dense self.cells (np.uint8), que l'on peut lire ou remplacer.
+    """
+    def __init__(self, dim, init_pattern=None, color_life=None, color_dead=None, max_nodes=4_000_000, rule=CONWAY):
+        self.dimensions = dim
+        if init_pattern is not None:
+            self.cells = np.zeros(dim, dtype=np.uint8)
+            indices_i = [v[0] for v in init_pattern]
+            indices_j = [v[1] for v in init_pattern]
+            self.cells[indices_i, indices_j] = 1
+        else:
+            self.cells = np.random.randint(2, size=dim, dtype=np.uint8)
+        self.col_life = color_life
+        self.col_dead = color_dead
+        self.universe = HashLife(max_nodes, rule)
+        self.generation = 0
+        # Plus petit niveau L tel que le carré central 2^(L-1) contienne la grille
+        self.min_level = max(2, int(np.ceil(np.log2(max(dim)))) + 1)
+
+    @classmethod
+    def from_array(cls, cells, **kwargs):
+        """Construit la grille HashLife à partir d'une grille dense de np.uint8"""
+        grid = cls(cells.shape, init_pattern=[], **kwargs)
+        grid.cells = np.array(cells, dtype=np.uint8)
+        return grid
+
+    def _advance(self, j):
+        """Avance le tore de 2^j générations"""
+        level = max(self.min_level, j + 2)
+        # Fenêtre dont le carré central commence en (0,0)
+        origin = -(1 << (level - 2))
+        root = self.universe.from_periodic(self.cells, origin, origin, level)
+        result = self.universe.successor(root, j)
+        self.cells = self.universe.to_array(result, self.dimensions)
+        if len(self.universe.table) > self.universe.max_nodes:
+            self.universe.collect((root,))
+
+    def jump(self, nb_generations):
+        """Avance de nb_generations générations (une étape HashLife par bit à 1)"""
+        self.generation += nb_generations
+        j = 0
+        while nb_generations > 0:
+            if nb_generations & 1:
+                self._advance(j)
+            nb_generations >>= 1
+            j += 1
+
+    def compute_next_iteration(self):
+        self.jump(1)
+        return []
+
+    def population(self):
+        return int(self.cells.sum(dtype=np.int64))
@@ -0,0 +1,212 @@
+"""
+patterns.py
+Bibliothèque de motifs du jeu de la vie
+#######################################
+Motifs prédéfinis (PATTERNS, partagés par tous les scripts du TP) et lecture des formats standard :
+    - RLE (.rle) : en-tête « x = 36, y = 9, rule = B3/S23 » puis lignes codées par plages,
+      b = cellule morte, o = cellule vivante, $ = fin de ligne, ! = fin du motif ;
+    - texte (.cells) : lignes de '.' (morte) et 'O' (vivante), commentaires commençant par '!'.
+La lecture est en temps linéaire et produit directement le tableau (k,2) des coordonnées des cellules
+vivantes, sans construire de grille dense.
+
+Un motif est placé sur une grille de taille quelconque avec un décalage (sinon il est centré). La grille
+est un tore, donc les coordonnées sont prises modulo la taille de la grille. Chaque processus MPI
+construit son bloc local directement à partir des coordonnées (fill_block), sans grille globale ni Scatter.
+"""
+import os
+import re
+import numpy as np
+
+# Dimension de la grille et cellules vivantes de chaque motif prédéfini
+PATTERNS = {
+    'blinker' : ((5,5),[(2,1),(2,2),(2,3)]),
+    'toad'    : ((6,6),[(2,2),(2,3),(2,4),(3,3),(3,4),(3,5)]),
+    "acorn"   : ((100,100), [(51,52),(52,54),(53,51),(53,52),(53,55),(53,56),(53,57)]),
+    "beacon"  : ((6,6), [(1,3),(1,4),(2,3),(2,4),(3,1),(3,2),(4,1),(4,2)]),
+    "boat" : ((5,5),[(1,1),(1,2),(2,1),(2,3),(3,2)]),
+    "glider": ((100,90),[(1,1),(2,2),(2,3),(3,1),(3,2)]),
+    "glider_gun": ((200,200),[(51,76),(52,74),(52,76),(53,64),(53,65),(53,72),(53,73),(53,86),(53,87),(54,63),(54,67),(54,72),(54,73),(54,86),(54,87),(55,52),(55,53),(55,62),(55,68),(55,72),(55,73),(56,52),(56,53),(56,62),(56,66),(56,68),(56,69),(56,74),(56,76),(57,62),(57,68),(57,76),(58,63),(58,67),(59,64),(59,65)]),
+    "space_ship": ((25,25),[(11,13),(11,14),(12,11),(12,12),(12,14),(12,15),(13,11),(13,12),(13,13),(13,14),(14,12),(14,13)]),
+    "die_hard" : ((100,100), [(51,57),(52,51),(52,52),(53,52),(53,56),(53,57),(53,58)]),
+    "pulsar": ((17,17),[(2,4),(2,5),(2,6),(7,4),(7,5),(7,6),(9,4),(9,5),(9,6),(14,4),(14,5),(14,6),(2,10),(2,11),(2,12),(7,10),(7,11),(7,12),(9,10),(9,11),(9,12),(14,10),(14,11),(14,12),(4,2),(5,2),(6,2),(4,7),(5,7),(6,7),(4,9),(5,9),(6,9),(4,14),(5,14),(6,14),(10,2),(11,2),(12,2),(10,7),(11,7),(12,7),(10,9),(11,9),(12,9),(10,14),(11,14),(12,14)]),
+    "floraison" : ((40,40), [(19,18),(19,19),(19,20),(20,17),(20,19),(20,21),(21,18),(21,19),(21,20)]),
+    "block_switch_engine" : ((400,400), [(201,202),(201,203),(202,202),(202,203),(211,203),(212,204),(212,202),(214,204),(214,201),(215,201),(215,202),(216,201)]),
+    "u" : ((200,200), [(101,101),(102,102),(103,102),(103,101),(104,103),(105,103),(105,102),(105,101),(105,105),(103,105),(102,105),(101,105),(101,104)]),
+    "flat" : ((200,400), [(80,200),(81,200),(82,200),(83,200),(84,200),(85,200),(86,200),(87,200), (89,200),(90,200),(91,200),(92,200),(93,200),(97,200),(98,200),(99,200),(106,200),(107,200),(108,200),(109,200),(110,200),(111,200),(112,200),(114,200),(115,200),(116,200),(117,200),(118,200)])
+}
+
+# Répertoire des motifs fournis sous forme de fichiers (cherchés par nom si ce n'est pas un motif prédéfini)
+PATTERN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns')
+
+
+class Pattern:
+    """
+    Motif : coordonnées (k,2) des cellules vivantes relatives au coin haut-gauche du motif.
+        - shape est la taille (lignes, colonnes) du motif
+        - rule est la règle indiquée dans le fichier (notation B/S) ou None
+    """
+    def __init__(self, cells, shape=None, name='', rule=None):
+        self.cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        if shape is None:
+            shape = tuple(int(v) + 1 for v in self.cells.max(axis=0)) if len(self.cells) else (0, 0)
+        self.shape = tuple(shape)
+        self.name = name
+        self.rule = rule
+
+    def place(self, dim, offset=None):
+        """Coordonnées des cellules sur une grille torique dim, le motif étant décalé de offset (centré si None)"""
+        if offset is None:
+            offset = ((dim[0] - self.shape[0]) // 2, (dim[1] - self.shape[1]) // 2)
+        return (self.cells + np.asarray(offset, dtype=np.int64)) % np.asarray(dim, dtype=np.int64)
+
+
+_RLE_TOKEN = re.compile(r'(\d*)([^\d\s])')
+
+
+def parse_rle(text, name=''):
+    """Lit un motif au format RLE (temps linéaire en la taille du texte et le nombre de cellules vivantes)"""
+    shape = None
+    rule = None
+    body = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            if line.startswith('#N') and not name:
+                name = line[2:].strip()
+            continue
+        if shape is None and line.startswith('x'):
+            header = dict(item.split('=', 1) for item in line.replace(' ', '').split(','))
+            shape = (int(header['y']), int(header['x']))
+            rule = header.get('rule')
+            continue
+        body.append(line)
+        if '!' in line:
+            break
+
+    # Plages de cellules vivantes (ligne, colonne de début, longueur), développées en une fois par np.repeat
+    rows, starts, lengths = [], [], []
+    i = j = 0
+    for count, tag in _RLE_TOKEN.findall(''.join(body)):
+        n = int(count) if count else 1
+        if tag == '!':
+            break
+        if tag == '$':
+            i += n
+            j = 0
+        elif tag == 'b' or tag == '.':
+            j += n
+        else:
+            rows.append(i)
+            starts.append(j)
+            lengths.append(n)
+            j += n
+    lengths = np.array(lengths, dtype=np.int64)
+    total = int(lengths.sum())
+    run_of_cell = np.repeat(np.arange(len(lengths)), lengths)
+    first_of_run = np.cumsum(lengths) - lengths
+    cells = np.empty((total, 2), dtype=np.int64)
+    cells[:, 0] = np.array(rows, dtype=np.int64)[run_of_cell]
+    cells[:, 1] = np.array(starts, dtype=np.int64)[run_of_cell] + np.arange(total) - first_of_run[run_of_cell]
+    return Pattern(cells, shape, name, rule)
+
+
+def parse_plaintext(text, name=''):
+    """Lit un motif au format texte (.cells)"""
+    lines = []
+    for line in text.splitlines():
+        if line.startswith('!'):
+            if line.startswith('!Name:') and not name:
+                name = line[6:].strip()
+            continue
+        lines.append(line.rstrip())
+    width = max((len(line) for line in lines), default=0)
+    grid = np.zeros((len(lines), width), dtype=bool)
+    for i, line in enumerate(lines):
+        row = np.frombuffer(line.encode(), dtype=np.uint8)
+        grid[i, :len(row)] = (row == ord('O')) | (row == ord('*'))
+    return Pattern(np.argwhere(grid), grid.shape, name)
+
+
+def load(path):
+    """Lit un fichier .rle ou .cells"""
+    with open(path) as f:
+        text = f.read()
+    name = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith('.rle'):
+        return parse_rle(text, name)
+    if path.endswith('.cells') or path.endswith('.txt'):
+        return parse_plaintext(text, name)
+    raise ValueError(f"Format de motif inconnu : {path} (.rle ou .cells attendu)")
+
+
+def _find_file(spec):
+    if os.path.isfile(spec):
+        return spec
+    for ext in ('.rle', '.cells'):
+        path = os.path.join(PATTERN_DIR, spec + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def available():
+    """Noms des motifs prédéfinis et des fichiers de PATTERN_DIR"""
+    names = list(PATTERNS)
+    if os.path.isdir(PATTERN_DIR):
+        names += sorted(os.path.splitext(f)[0] for f in os.listdir(PATTERN_DIR) if f.endswith(('.rle', '.cells')))
+    return names
+
+
+def exists(spec):
+    return spec in PATTERNS or _find_file(spec) is not None
+
+
+def board(spec, dim=None, offset=None):
+    """
+    Grille initiale (dim, coordonnées (k,2) des cellules vivantes, règle du fichier ou None) pour un motif
+    prédéfini ou un fichier (.rle, .cells, chemin ou nom dans PATTERN_DIR).
+        - dim : taille de la grille (taille par défaut du motif prédéfini, ou motif et une marge autour)
+        - offset : décalage (lignes, colonnes) du motif ; un motif prédéfini garde sinon sa position,
+          un motif lu dans un fichier est centré
+    Lève KeyError si le motif est inconnu.
+    """
+    if spec in PATTERNS:
+        default_dim, cells = PATTERNS[spec]
+        pattern = Pattern(cells, name=spec)
+        if dim is None:
+            dim = default_dim
+        if offset is None:
+            offset = (0, 0)
+    else:
+        path = _find_file(spec)
+        if path is None:
+            raise KeyError(spec)
+        pattern = load(path)
+        if dim is None:
+            dim = (max(100, 2 * pattern.shape[0]), max(100, 2 * pattern.shape[1]))
+    return tuple(dim), pattern.place(dim, offset), pattern.rule
+
+
+def fill_block(init_pattern, block_shape, start=(0, 0)):
+    """
+    Bloc np.uint8 de forme block_shape dont le coin haut-gauche est la cellule start de la grille,
+    contenant les cellules vivantes de init_pattern (liste de couples ou tableau (k,2)) qui y tombent.
+    Coût linéaire en le nombre de cellules du motif : aucune grille globale n'est construite.
+    """
+    block = np.zeros(block_shape, dtype=np.uint8)
+    cells = np.asarray(init_pattern, dtype=np.int64).reshape(-1, 2) - np.asarray(start, dtype=np.int64)
+    inside = ((cells[:, 0] >= 0) & (cells[:, 0] < block_shape[0]) &
+              (cells[:, 1] >= 0) & (cells[:, 1] < block_shape[1]))
+    block[cells[inside, 0], cells[inside, 1]] = 1
+    return block
+
+
+def options_from_argv(argv):
+    """Options --dim=NYxNX et --offset=I,J de la ligne de commande (None si absentes)"""
+    dim = offset = None
+    for a in argv:
+        if a.startswith('--dim='):
+            dim = tuple(int(v) for v in a.split('=', 1)[1].lower().split('x'))
+        if a.startswith('--offset='):
+            offset = tuple(int(v) for v in a.split('=', 1)[1].split(','))
+    return dim, offset
@@ -0,0 +1,103 @@
+"""
+renderer.py
+Affichage vectorisé de la grille du jeu de la vie
+#################################################
+Au lieu de remplir un rectangle par cellule (screen.fill ou pg.draw.rect dans une boucle Python),
+l'image est construite en une seule passe :
+    1. la grille (np.uint8, 0 ou 1) est copiée telle quelle dans une surface 8 bits d'un pixel par cellule
+       dont la palette associe 0 -> couleur morte et 1 -> couleur vivante (pg.surfarray.blit_array) ;
+    2. cette surface est agrandie à la taille de la fenêtre (pg.transform.scale) ;
+    3. seules les zones de l'écran contenant des cellules modifiées depuis l'image précédente sont
+       recopiées dans la fenêtre et envoyées à l'écran (pg.display.update avec une liste de rectangles).
+Les cellules modifiées sont regroupées par tuiles de tile x tile cellules afin de limiter le nombre de
+rectangles. Elles sont soit données par l'appelant (indices linéaires i*nx+j, cf. diff_cells), soit
+obtenues par comparaison avec la grille de l'image précédente.
+"""
+import numpy as np
+import pygame as pg
+
+
+class GridRenderer:
+    """
+    Dessine une grille (ny,nx) dans la surface screen, chaque cellule occupant size_x x size_y pixels.
+        - flip indique si la ligne 0 de la grille est en bas de la fenêtre (game_of_life.py) plutôt qu'en haut
+        - line_color est la couleur du quadrillage (None pour ne pas le dessiner)
+    """
+    def __init__(self, screen, dimensions, size_x, size_y, col_life, col_dead, flip=False, line_color=None, tile=16):
+        self.screen = screen
+        self.dimensions = dimensions
+        self.size_x = size_x
+        self.size_y = size_y
+        self.flip = flip
+        self.tile = tile
+        ny, nx = dimensions
+        self.width = nx * size_x
+        self.height = ny * size_y
+        # Surface 8 bits, un pixel par cellule : la valeur de la cellule est l'indice dans la palette
+        self.cell_surface = pg.Surface((nx, ny), depth=8)
+        self.cell_surface.set_palette([pg.Color(col_dead), pg.Color(col_life)])
+        self.scaled_surface = pg.Surface((self.width, self.height), depth=8)
+        self.scaled_surface.set_palette([pg.Color(col_dead), pg.Color(col_life)])
+        # Quadrillage pré-dessiné une fois pour toutes (fond transparent)
+        self.lines = None
+        if line_color is not None:
+            self.lines = pg.Surface((self.width, self.height))
+            self.lines.fill((255, 0, 255))
+            self.lines.set_colorkey((255, 0, 255))
+            for i in range(ny):
+                pg.draw.line(self.lines, line_color, (0, i*size_y), (self.width, i*size_y))
+            for j in range(nx):
+                pg.draw.line(self.lines, line_color, (j*size_x, 0), (j*size_x, self.height))
+        self.previous = None
+
+    def _dirty_tiles(self, cells, changed):
+        """Tableau booléen (tuiles en lignes, tuiles en colonnes) des tuiles contenant une cellule modifiée"""
+        ny, nx = self.dimensions
+        t = self.tile
+        nb_tiles = ((ny + t - 1) // t, (nx + t - 1) // t)
+        dirty = np.zeros(nb_tiles, dtype=bool)
+        if changed is not None:
+            i, j = np.divmod(np.asarray(changed, dtype=np.int64), nx)
+            dirty[i // t, j // t] = True
+        else:
+            mask = cells != self.previous
+            mask = np.logical_or.reduceat(mask, np.arange(0, ny, t), axis=0)
+            dirty = np.logical_or.reduceat(mask, np.arange(0, nx, t), axis=1)
+        return dirty
+
+    def _tile_rects(self, dirty):
+        """Rectangles écran des tuiles modifiées, les tuiles voisines d'une même ligne étant fusionnées"""
+        ny, nx = self.dimensions
+        t = self.tile
+        rects = []
+        for ti in np.flatnonzero(dirty.any(axis=1)):
+            row = np.concatenate(([False], dirty[ti], [False]))
+            edges = np.flatnonzero(row[1:] != row[:-1])
+            i0, i1 = ti * t, min((ti + 1) * t, ny)
+            y = self.height - i1 * self.size_y if self.flip else i0 * self.size_y
+            for start, end in zip(edges[::2], edges[1::2]):
+                j0, j1 = start * t, min(end * t, nx)
+                rects.append(pg.Rect(j0 * self.size_x, y, (j1 - j0) * self.size_x, (i1 - i0) * self.size_y))
+        return rects
+
+    def draw(self, cells, changed=None):
+        """
+        Dessine la grille cells. changed (optionnel) contient les indices linéaires des cellules modifiées
+        depuis l'image précédente ; sinon ils sont déterminés par comparaison.
+        """
+        cells = np.asarray(cells, dtype=np.uint8)
+        if self.previous is None:
+            rects = [pg.Rect(0, 0, self.width, self.height)]
+        else:
+            dirty = self._dirty_tiles(cells, changed)
+            if not dirty.any():
+                return
+            rects = self._tile_rects(dirty)
+        pg.surfarray.blit_array(self.cell_surface, (cells[::-1] if self.flip else cells).T)
+        pg.transform.scale(self.cell_surface, (self.width, self.height), self.scaled_surface)
+        for rect in rects:
+            self.screen.blit(self.scaled_surface, rect, area=rect)
+            if self.lines is not None:
+                self.screen.blit(self.lines, rect, area=rect)
+        pg.display.update(rects)
+        self.previous = cells.copy()
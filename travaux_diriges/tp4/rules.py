@@ -0,0 +1,100 @@
+"""
+rules.py
+Règles des automates de type « jeu de la vie » (notation B/S)
+#############################################################
+Une règle de type jeu de la vie est entièrement décrite par deux ensembles de nombres de voisins :
+    - B (birth) : une cellule morte ayant un nombre de voisins vivants dans B devient vivante ;
+    - S (survival) : une cellule vivante ayant un nombre de voisins vivants dans S reste vivante.
+Le jeu de la vie de Conway s'écrit B3/S23, HighLife B36/S23, Day & Night B3678/S34678.
+
+La règle est compilée en une table (2,9) : table[état, nombre de voisins] donne l'état suivant.
+Elle s'applique en un seul accès indexé (np.take) sur l'indice 9*état + voisins, calculé en np.uint8,
+au lieu de plusieurs écritures masquées.
+"""
+import numpy as np
+
+# Règles nommées utilisables à la place de la notation B/S
+NAMED_RULES = {
+    'conway': 'B3/S23',
+    'highlife': 'B36/S23',
+    'day_and_night': 'B3678/S34678',
+    'seeds': 'B2/S',
+    'life_without_death': 'B3/S012345678',
+    'maze': 'B3/S12345',
+    '2x2': 'B36/S125',
+}
+
+
+def parse_rule(notation: str):
+    """
+    Retourne les ensembles (birth, survival) d'une règle donnée en notation B3/S23 (ou S23/B3),
+    en notation S/B « 23/3 », ou par son nom (voir NAMED_RULES)
+    """
+    text = NAMED_RULES.get(notation.lower(), notation).upper().replace(' ', '')
+    parts = text.split('/')
+    if len(parts) != 2:
+        raise ValueError(f"Règle invalide : {notation!r} (attendu par exemple B3/S23)")
+    if any(p[:1] in ('B', 'S') for p in parts):
+        births = [p for p in parts if p.startswith('B')]
+        survivals = [p for p in parts if p.startswith('S')]
+        if len(births) != 1 or len(survivals) != 1:
+            raise ValueError(f"Règle invalide : {notation!r} (attendu par exemple B3/S23)")
+        birth_digits, survival_digits = births[0][1:], survivals[0][1:]
+    else:
+        # Notation S/B sans lettres : survie / naissance
+        survival_digits, birth_digits = parts
+    digits = birth_digits + survival_digits
+    if not all(d in '012345678' for d in digits):
+        raise ValueError(f"Règle invalide : {notation!r} (nombres de voisins entre 0 et 8)")
+    return frozenset(int(d) for d in birth_digits), frozenset(int(d) for d in survival_digits)
+
+
+class Rule:
+    """
+    Règle de type jeu de la vie compilée en table de transition.
+        - notation est la règle en notation B/S (ex : "B36/S23") ou un nom de NAMED_RULES
+    Exemple :
+        rule = Rule("highlife")
+        next_cells = rule.apply(cells, voisins)
+    """
+    def __init__(self, notation='B3/S23'):
+        self.birth, self.survival = parse_rule(notation)
+        self.table = np.zeros((2, 9), dtype=np.uint8)
+        self.table[0, sorted(self.birth)] = 1
+        self.table[1, sorted(self.survival)] = 1
+        self._flat = self.table.reshape(-1)
+
+    @property
+    def notation(self):
+        return "B" + "".join(map(str, sorted(self.birth))) + "/S" + "".join(map(str, sorted(self.survival)))
+
+    @property
+    def is_conway(self):
+        return self.birth == {3} and self.survival == {2, 3}
+
+    def __repr__(self):
+        return f"Rule({self.notation!r})"
+
+    def next_state(self, alive: int, nb_voisins: int) -> int:
+        """État suivant d'une seule cellule (version scalaire)"""
+        return int(self.table[alive, nb_voisins])
+
+    def apply(self, cells: np.ndarray, voisins: np.ndarray) -> np.ndarray:
+        """
+        État suivant (np.uint8) de cellules d'états cells (0 ou 1) ayant voisins voisins vivants.
+        voisins peut être entier ou flottant (résultat de convolve2d) ; cells et voisins doivent avoir
+        la même forme.
+        """
+        index = voisins.astype(np.uint8, copy=False) + 9 * cells.astype(np.uint8, copy=False)
+        return np.take(self._flat, index)
+
+
+CONWAY = Rule('B3/S23')
+
+
+def rule_from_argv(argv, default=CONWAY):
+    """Règle donnée par l'option --rule=... de la ligne de commande (default si absente)"""
+    for a in argv:
+        if a.startswith('--rule='):
+            return Rule(a.split('=', 1)[1])
+    return default
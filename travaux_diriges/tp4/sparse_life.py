@@ -0,0 +1,96 @@
+"""
+sparse_life.py
+Jeu de la vie par tuiles actives
+################################
+La grille torique est découpée en tuiles de tile x tile cellules. À chaque génération, on ne recalcule
+que les tuiles actives, c'est à dire les tuiles qui ont changé à la génération précédente ou qui
+touchent une tuile ayant changé : une tuile dont ni le contenu ni celui de ses huit voisines n'a changé
+ne peut pas changer à son tour. Le coût d'une itération est donc proportionnel à l'activité de la
+population plutôt qu'à la surface de la grille (motifs glider, acorn, die_hard sur grande grille...).
+
+Les tuiles actives sont extraites en une seule fois dans un tableau 3D (nb_tuiles, tile+2, tile+2)
+(tuile plus une couronne d'une cellule, indices pris modulo la taille du tore) et calculées en un
+seul appel vectorisé.
+
+compute_next_iteration retourne l'ensemble des cellules modifiées (indices linéaires i*nx+j, comme
+diff_cells dans game_of_life.py) sous forme de np.ndarray : l'affichage et le rassemblement MPI peuvent
+ne traiter que ces cellules.
+"""
+import numpy as np
+from rules import CONWAY
+
+
+class TiledGrille:
+    """
+    Grille torique calculée par tuiles actives.
+        - dim est un tuple (nombre lignes, nombre colonnes)
+        - init_pattern est une liste de cellules initialement vivantes (grille aléatoire si None)
+        - tile est la taille (en cellules) du côté d'une tuile
+        - rule est la règle de l'automate (rules.Rule, B3/S23 par défaut)
+    Les attributs dimensions, cells, col_life et col_dead sont les mêmes que ceux de Grille.
+    """
+    def __init__(self, dim, init_pattern=None, color_life=None, color_dead=None, tile=32, rule=CONWAY):
+        self.dimensions = dim
+        self.rule = rule
+        if init_pattern is not None:
+            self.cells = np.zeros(dim, dtype=np.uint8)
+            indices_i = [v[0] for v in init_pattern]
+            indices_j = [v[1] for v in init_pattern]
+            self.cells[indices_i, indices_j] = 1
+        else:
+            self.cells = np.random.randint(2, size=dim, dtype=np.uint8)
+        self.col_life = color_life
+        self.col_dead = color_dead
+        self.tile = tile
+        self.nb_tiles = ((dim[0] + tile - 1) // tile, (dim[1] + tile - 1) // tile)
+        # Au départ, toutes les tuiles sont à calculer
+        self.active = np.ones(self.nb_tiles, dtype=bool)
+
+    def active_count(self):
+        """Nombre de tuiles qui seront recalculées à la prochaine itération"""
+        return int(np.count_nonzero(self.active))
+
+    def compute_next_iteration(self):
+        """
+        Calcule la génération suivante sur les tuiles actives et retourne les indices linéaires
+        des cellules qui ont changé d'état
+        """
+        ny, nx = self.dimensions
+        t = self.tile
+        tiles = np.argwhere(self.active)
+        if len(tiles) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # Indices (globaux, modulo le tore) des lignes et colonnes de chaque tuile étendue
+        offsets = np.arange(-1, t + 1)
+        rows = (tiles[:, 0:1] * t + offsets) % ny         # (k, t+2)
+        cols = (tiles[:, 1:2] * t + offsets) % nx         # (k, t+2)
+        blocks = self.cells[rows[:, :, None], cols[:, None, :]]    # (k, t+2, t+2)
+
+        # Nombre de voisins par somme des huit blocs décalés
+        voisins = (blocks[:, :-2, :-2] + blocks[:, :-2, 1:-1] + blocks[:, :-2, 2:] +
+                   blocks[:, 1:-1, :-2] + blocks[:, 1:-1, 2:] +
+                   blocks[:, 2:, :-2] + blocks[:, 2:, 1:-1] + blocks[:, 2:, 2:])
+        alive = blocks[:, 1:-1, 1:-1]
+        next_blocks = self.rule.apply(alive, voisins)
+
+        # Les tuiles du bord droit/bas peuvent déborder de la grille : on ne garde que les cellules valides
+        global_i = tiles[:, 0:1] * t + np.arange(t)       # (k, t)
+        global_j = tiles[:, 1:2] * t + np.arange(t)       # (k, t)
+        valid = (global_i < ny)[:, :, None] & (global_j < nx)[:, None, :]
+        changed = (next_blocks != alive) & valid
+
+        flat = global_i[:, :, None] * nx + global_j[:, None, :]
+        diff_cells = flat[changed]
+        self.cells.flat[diff_cells] = next_blocks[changed]
+
+        # Tuiles actives à la prochaine génération : tuiles modifiées et leurs huit voisines (tore)
+        changed_tiles = np.zeros(self.nb_tiles, dtype=bool)
+        changed_tiles[tiles[:, 0], tiles[:, 1]] = changed.any(axis=(1, 2))
+        active = changed_tiles.copy()
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                if di != 0 or dj != 0:
+                    active |= np.roll(changed_tiles, (di, dj), axis=(0, 1))
+        self.active = active
+        return diff_cells
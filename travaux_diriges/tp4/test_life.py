@@ -0,0 +1,70 @@
+"""
+test_life.py
+Tests de non-régression des moteurs du jeu de la vie (python -m pytest test_life.py)
+"""
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+import patterns
+from batch_life import BatchGrille, PERIODIC
+from hashlife import HashLifeGrille
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_mpi(nb_procs, *args):
+    """Lance game_of_life_final.py sur nb_procs processus MPI et retourne sa sortie"""
+    mpirun = shutil.which('mpirun') or shutil.which('mpiexec')
+    if mpirun is None:
+        pytest.skip("mpirun introuvable")
+    command = [mpirun, '-n', str(nb_procs)]
+    if os.geteuid() == 0:
+        command += ['--allow-run-as-root', '--oversubscribe']
+    command += [sys.executable, 'game_of_life_final.py', *args]
+    result = subprocess.run(command, cwd=HERE, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+@pytest.mark.parametrize('nb_procs', [1, 2])
+def test_die_hard_packed_stops_at_extinction(nb_procs):
+    # die_hard s'éteint à la génération 130 : pas d'arrêt anticipé sur une collision d'empreintes
+    output = run_mpi(nb_procs, 'die_hard', '--packed')
+    assert "Configuração estável a partir da geração 130" in output
+
+
+def test_batch_periods_are_exact():
+    # Chaque grille déclarée périodique revient exactement à son état period générations plus tard
+    rng = np.random.default_rng(7)
+    cells = rng.integers(0, 2, size=(300, 16, 16), dtype=np.uint8)
+    batch = BatchGrille(len(cells), (16, 16), cells=cells.copy(), max_period=8)
+    batch.run(300)
+    for b in np.flatnonzero(batch.status == PERIODIC):
+        history = [cells[b]]
+        for _ in range(batch.end_generation[b] + batch.period[b]):
+            c = history[-1]
+            v = sum(np.roll(c, (i, j), axis=(0, 1)) for i in (-1, 0, 1) for j in (-1, 0, 1) if (i, j) != (0, 0))
+            history.append(((v == 3) | ((c == 1) & (v == 2))).astype(np.uint8))
+        assert np.array_equal(history[batch.end_generation[b]], history[-1])
+
+
+def test_hashlife_capped_table():
+    # Une table limitée est nettoyée entre deux sauts : même population, temps comparable
+    dim, pattern = patterns.board('glider_gun')[:2]
+    results = []
+    for max_nodes in (4_000_000, 5_000):
+        grid = HashLifeGrille(dim, pattern, max_nodes=max_nodes)
+        t0 = time.time()
+        for _ in range(5):
+            grid.jump(300)
+        results.append((grid.population(), grid.universe.collections, time.time() - t0))
+    (population, _, uncapped), (capped_population, collections, capped) = results
+    assert capped_population == population
+    assert collections > 0
+    assert capped < 2 * uncapped + 1.
@@ -0,0 +1,44 @@
+"""
+timing.py
+Mesure du temps passé dans chaque phase d'une itération
+#######################################################
+Les grilles accumulent le temps de chaque phase de compute_next_iteration (échange des halos, comptage
+des voisins, application de la règle...) dans un PhaseTimer. Une mesure coûte un appel à
+time.perf_counter, ce qui est négligeable devant une phase vectorisée : le chronométrage reste donc
+toujours actif. Les temps sont relevés par bench_life.py.
+Exemple :
+    timer = PhaseTimer()
+    timer.start()
+    ... échange des halos ...
+    timer.lap('halo')
+    ... convolution ...
+    timer.lap('stencil')
+"""
+import time
+
+
+class PhaseTimer:
+    """
+    Temps cumulés par phase (dictionnaire totals, en secondes).
+    lap(phase) ajoute à phase le temps écoulé depuis le dernier appel de start ou de lap.
+    """
+    def __init__(self):
+        self.totals = {}
+        self._last = time.perf_counter()
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0.) + now - self._last
+        self._last = now
+
+    def reset(self):
+        """Remet les temps cumulés à zéro (par exemple après les itérations de chauffe)"""
+        self.totals = {}
+        self._last = time.perf_counter()
+
+    def per_iteration(self, nb_iterations):
+        """Temps moyen de chaque phase par itération"""
+        return {phase: total / nb_iterations for phase, total in self.totals.items()}